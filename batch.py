@@ -0,0 +1,81 @@
+import argparse
+import json
+import sys
+
+from src.puzzles import PUZZLE_NAME
+from src.runner import BatchSolver, collect_puzzles
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve many puzzles on a pool of worker processes",
+        epilog='example: python batch.py ./data -w 4 -o results.jsonl, cat puzzles.jsonl | python batch.py --stream -',
+        usage='python batch.py [S ...] [-p P] [-w W] [-o O] [--stream F [--ordered] [--window N]]'
+    )
+    parser.add_argument(
+        'sources', type=str, nargs='*',
+        help='puzzle data files, folders, glob patterns or manifest files'
+    )
+    parser.add_argument(
+        '-p', type=str, choices=PUZZLE_NAME.keys(),
+        help='puzzle short name for all puzzles, inferred from ./data/<type>/ folder if omitted'
+    )
+    parser.add_argument('-w', type=int, default=None, help='number of worker processes, default: cpu count')
+    parser.add_argument('-o', type=str, default=None, help='path to write JSON lines results, default: stdout')
+    parser.add_argument(
+        '--stream', type=str, default=None,
+        help='JSON lines file of {"puzzle": P, "data": {...}} records, - for stdin, instead of sources'
+    )
+    parser.add_argument('--ordered', action='store_true', help='write stream results in input order instead of as they end')
+    parser.add_argument('--window', type=int, default=None, help='max stream records read and not written yet, default: 2 * workers')
+    parser.add_argument('--cache', type=str, default=None, help='folder of the solution cache, disabled if omitted')
+    parser.add_argument('--cache-size', type=int, default=64, help='max size of the solution cache in MB')
+    parser.add_argument('--presolve', action='store_true', help='fix cells by logical rules before building the model')
+    parser.add_argument(
+        '--engine', type=str, action='append', default=[],
+        help='native solving engine of a puzzle as [P]=[E], e.g. S=dlx, can be repeated'
+    )
+    parser.add_argument('--cuts', type=str, default='loop', choices=['lazy', 'loop'], help='add loop cuts (Slitherlink) between solver runs (loop) or inside one CBC run (lazy), default: loop')
+    parser.add_argument('--no-names', action='store_true', help='do not name the variables, names are only read when debugging a model')
+    parser.add_argument('--warm-start', action='store_true', help='start the solver from the values decided by propagation (Binox, Star Battle, Sudoku, Troix)')
+    parser.add_argument('--backend', type=str, default=None, choices=['cbc', 'highs', 'cp-sat', 'sat'], help='solver of the mip engine, default: the one of the puzzle (see README)')
+    parser.add_argument('--threads', type=int, default=1, help='search threads of every solve (cp-sat, highs), default: 1, the pool runs a process per worker')
+    parser.add_argument('--templates', action='store_true', help='reuse the model of a puzzle shape in a worker, only givens change (Binox, Sudoku, Troix)')
+    parser.add_argument('--stats', action='store_true', help='add timings of every phase, model size, solver status and counters to results')
+    opt = parser.parse_args()
+    if (opt.stream is None) == (len(opt.sources) == 0):
+        parser.error('give either sources or --stream')
+    if opt.window is not None and opt.window < 1:
+        parser.error('--window must be positive')
+    if opt.threads < 1:
+        parser.error('--threads must be positive')
+    if opt.templates and opt.presolve:
+        parser.error('--templates can not be used with --presolve')
+    engines = {}
+    for engine in opt.engine:
+        puzzle_short_name, engine_name = engine.split('=', 1)
+        engines[PUZZLE_NAME[puzzle_short_name]] = engine_name
+    solver = BatchSolver(
+        opt.w, opt.cache, opt.cache_size * 1024 * 1024,
+        engines=engines, stats=opt.stats, templates=opt.templates, presolve=opt.presolve, cuts=opt.cuts,
+        names=not opt.no_names, warm_start=opt.warm_start, backend=opt.backend, threads=opt.threads
+    )
+    output = open(opt.o, 'w') if opt.o else sys.stdout
+    try:
+        if opt.stream is not None:
+            lines = sys.stdin if opt.stream == '-' else open(opt.stream)
+            try:
+                summary = solver.stream(lines, output, ordered=opt.ordered, window=opt.window)
+            finally:
+                if opt.stream != '-':
+                    lines.close()
+        else:
+            puzzles = collect_puzzles(opt.sources, PUZZLE_NAME[opt.p] if opt.p else None)
+            summary = solver.run(puzzles, output)
+    finally:
+        if opt.o:
+            output.close()
+    print(json.dumps(summary), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
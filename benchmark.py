@@ -0,0 +1,87 @@
+import argparse
+import json
+import sys
+
+from src.puzzles import PUZZLE_NAME
+from src.runner import Benchmark, collect_puzzles, compare_results, measure_imports
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time every solving phase of many puzzles and compare with a baseline",
+        epilog='example: python benchmark.py ./data --synthetic -n 5 -o bench.json --baseline baseline.json',
+        usage='python benchmark.py [S ...] [-p P] [-n N] [-o O] [--baseline B] [--imports [--import-budget T]]'
+    )
+    parser.add_argument(
+        'sources', type=str, nargs='*', default=['./data'],
+        help='puzzle data files, folders, glob patterns or manifest files, default: ./data'
+    )
+    parser.add_argument(
+        '-p', type=str, choices=PUZZLE_NAME.keys(),
+        help='puzzle short name for all puzzles, inferred from ./data/<type>/ folder if omitted'
+    )
+    parser.add_argument('-n', type=int, default=3, help='number of repetitions of every puzzle')
+    parser.add_argument('-o', type=str, default=None, help='path to write JSON results, default: stdout')
+    parser.add_argument('--synthetic', action='store_true', help='also run generated Binox, Troix and Sudoku puzzles')
+    parser.add_argument('--baseline', type=str, default=None, help='JSON results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown of a phase over the baseline, default: 0.2 (20%%)')
+    parser.add_argument('--imports', action='store_true', help='only time the import of every puzzle class (-p or all) in a new process')
+    parser.add_argument('--import-budget', type=float, default=0.5, help='max seconds of an import with --imports, exit 1 if a puzzle is over it, default: 0.5')
+    parser.add_argument('--presolve', action='store_true', help='fix cells by logical rules before building the model')
+    parser.add_argument(
+        '--engine', type=str, action='append', default=[],
+        help='native solving engine of a puzzle as [P]=[E], e.g. S=dlx, can be repeated'
+    )
+    parser.add_argument('--cuts', type=str, default='loop', choices=['lazy', 'loop'], help='add loop cuts (Slitherlink) between solver runs (loop) or inside one CBC run (lazy), default: loop')
+    parser.add_argument('--templates', action='store_true', help='reuse the model of a puzzle shape between repetitions, only givens change (Binox, Sudoku, Troix)')
+    parser.add_argument('--no-names', action='store_true', help='do not name the variables, names are only read when debugging a model')
+    parser.add_argument('--warm-start', action='store_true', help='start the solver from the values decided by propagation (Binox, Star Battle, Sudoku, Troix)')
+    parser.add_argument('--backend', type=str, default=None, choices=['cbc', 'highs', 'cp-sat', 'sat'], help='solver of the mip engine, default: the one of the puzzle (see README)')
+    opt = parser.parse_args()
+    if opt.templates and opt.presolve:
+        parser.error('--templates can not be used with --presolve')
+    if opt.imports:
+        results = measure_imports([PUZZLE_NAME[opt.p]] if opt.p else list(PUZZLE_NAME.values()), opt.n, opt.import_budget)
+        if opt.o:
+            with open(opt.o, 'w') as f:
+                json.dump(results, f, indent=2)
+        else:
+            print(json.dumps(results, indent=2))
+        for puzzle_name in results['over_budget']:
+            print(f'over budget {puzzle_name}: import over {opt.import_budget}s', file=sys.stderr)
+        sys.exit(1 if len(results['over_budget']) else 0)
+    engines = {}
+    for engine in opt.engine:
+        puzzle_short_name, engine_name = engine.split('=', 1)
+        engines[PUZZLE_NAME[puzzle_short_name]] = engine_name
+    puzzles = collect_puzzles(opt.sources, PUZZLE_NAME[opt.p] if opt.p else None)
+
+    def progress(result):
+        total = result.get('timings', {}).get('total', {}).get('min')
+        print(f"{result['status']:7} {result['path']} {total if total is not None else result.get('error', '')}", file=sys.stderr)
+
+    results = Benchmark(
+        opt.n, engines=engines, templates=opt.templates, presolve=opt.presolve, cuts=opt.cuts, names=not opt.no_names,
+        warm_start=opt.warm_start, backend=opt.backend
+    ).run(puzzles, synthetic=opt.synthetic, progress=progress)
+    regressions = []
+    if opt.baseline:
+        with open(opt.baseline, 'r') as f:
+            regressions = compare_results(results, json.load(f), opt.threshold)
+        results['regressions'] = regressions
+    if opt.o:
+        with open(opt.o, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    for regression in regressions:
+        print(
+            f"regression {regression['path']} {regression['phase']}: "
+            f"{regression['baseline']}s -> {regression['current']}s",
+            file=sys.stderr
+        )
+    if len(regressions):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,13 @@
 import argparse
+import contextlib
 import importlib
+import json
 import sys
-from rich.console import Console
+import time
 
 from pathlib import Path
 
 
-PUZZLE_NAME = {
-    'B': 'Binox',
-    'G': 'Galaxies',
-    'S': 'Sudoku',
-    'SB': 'StarBattle',
-    'T': 'Troix',
-    'SL': 'Slitherlink',
-    'HMM': 'HauntedMirrorMaze'
-}
-
 class PythonPath():
     def __init__(self, path: Path):
         self.path = path
@@ -34,15 +26,94 @@ def main():
     )
     parser.add_argument('-p', type=str, nargs='?', help='puzzle name, include: Binox, Galaxies, StarBattle, Troix')
     parser.add_argument('-d', type=str, nargs='?', help='path to data of problem')
+    parser.add_argument('--cache', type=str, default=None, help='folder of the solution cache, disabled if omitted')
+    parser.add_argument('--cache-size', type=int, default=64, help='max size of the solution cache in MB')
+    parser.add_argument('--presolve', action='store_true', help='fix cells by logical rules before building the model')
+    parser.add_argument('--engine', type=str, default='mip', help='solving engine, mip or a native engine: dlx (Sudoku), bitboard (Binox, mip over 26x26), bitmask (StarBattle), search (Troix)')
+    parser.add_argument('--cuts', type=str, default='loop', choices=['lazy', 'loop'], help='add loop cuts (Slitherlink) between solver runs (loop) or inside one CBC run (lazy), default: loop')
+    parser.add_argument('--no-names', action='store_true', help='do not name the variables, names are only read when debugging a model')
+    parser.add_argument('--warm-start', action='store_true', help='start the solver from the values decided by propagation (Binox, Star Battle, Sudoku, Troix)')
+    parser.add_argument('--backend', type=str, default=None, choices=['cbc', 'highs', 'cp-sat', 'sat'], help='solver of the mip engine, default: the one of the puzzle (see README)')
+    parser.add_argument('--threads', type=int, default=None, help='search threads of the solver (cp-sat, highs), default: the solver\'s, one per core with cp-sat')
+    parser.add_argument('--write-model', type=str, default=None, help='write the model before solving to a file: DIMACS CNF with --backend sat, .lp or .mps with cbc and highs, CpModel proto with cp-sat')
+    parser.add_argument('--connectivity', type=str, default=None, choices=['paths', 'flow'], help='galaxy shape connectivity encoding of Galaxies, default: paths')
+    parser.add_argument('--uniqueness', type=str, default=None, choices=['aux', 'lazy'], help='unique rows and columns of Binox with auxiliary variables (aux) or cuts on duplicate lines (lazy), default: aux')
+    parser.add_argument('--render', type=str, default='ansi', choices=['ansi', 'plain', 'none'], help='board in ANSI colors, plain text or not at all, default: ansi')
+    parser.add_argument('--check-unique', type=float, nargs='?', const=10.0, default=None, metavar='S', help='check that no other solution exists within S seconds, default: 10')
+    parser.add_argument('--stats', type=str, default=None, choices=['json'], help='print timings of every phase, model size, solver status and counters to stderr')
+    parser.add_argument('--profile', type=str, default=None, help='folder to write cProfile stats of init_model, solve and visualize, disabled if omitted')
+    parser.add_argument('--profile-memory', action='store_true', help='also trace memory of the profiled phases with tracemalloc')
     opt = parser.parse_args()
     with PythonPath(Path(__file__).absolute().parents[2]):
         puzzle = importlib.import_module(f'src.puzzles')
-        model = getattr(puzzle, PUZZLE_NAME[opt.p])(Path(opt.d))
-        console = Console()
-        with console.status("[bold green] Solving...") as status:
+        utils = importlib.import_module(f'src.utils')
+        cache = None
+        if opt.cache:
+            cache = utils.SolutionCache(Path(opt.cache), opt.cache_size * 1024 * 1024)
+        options = {}
+        if opt.connectivity:
+            if opt.p != 'G':
+                parser.error('--connectivity is only supported by Galaxies (G)')
+            options['connectivity'] = opt.connectivity
+        if opt.uniqueness:
+            if opt.p != 'B':
+                parser.error('--uniqueness is only supported by Binox (B)')
+            options['uniqueness'] = opt.uniqueness
+        if opt.check_unique is not None and opt.engine != 'mip':
+            parser.error('--check-unique needs the mip engine')
+        if opt.check_unique is not None and opt.cache:
+            parser.error('--check-unique needs a model, a --cache hit has none')
+        if opt.profile:
+            options['profiler'] = utils.Profiler(Path(opt.profile), memory=opt.profile_memory)
+        elif opt.profile_memory:
+            parser.error('--profile-memory needs a --profile folder')
+        model = getattr(puzzle, puzzle.PUZZLE_NAME[opt.p])(
+            Path(opt.d), cache=cache, presolve=opt.presolve, engine=opt.engine, cuts=opt.cuts,
+            names=not opt.no_names, warm_start=opt.warm_start, backend=opt.backend, threads=opt.threads, **options
+        )
+        if model.engine != opt.engine:
+            print(f'Engine {opt.engine} does not fit this puzzle, solved with {model.engine}', file=sys.stderr)
+        if model.separates() and model.cuts != opt.cuts:
+            print(f'Cuts {opt.cuts} do not fit this model, solved with {model.cuts} cuts', file=sys.stderr)
+        if sys.stdout.isatty():
+            # rich is only imported for the spinner of a terminal
+            from rich.console import Console
+
+            solving = Console().status("[bold green] Solving...")
+        else:
+            solving = contextlib.nullcontext()
+        with solving:
             model.init_model()
+            if opt.write_model:
+                model.write_model(Path(opt.write_model))
             model.solve()
-        model.visualize()
+            if opt.check_unique is not None:
+                unique_check = model.check_unique(opt.check_unique)
+        phase_start = time.perf_counter()
+        model.visualize(opt.render)
+        model.record_timing('visualize', phase_start)
+        if opt.check_unique is not None:
+            # The result line is printed whatever the render mode, the other
+            # board only if boards are
+            renderer = utils.GridRenderer(model.get_styles(), 'plain' if opt.render == 'none' else opt.render)
+            if unique_check['status'] == 'multiple' and opt.render == 'none':
+                renderer.write([renderer.paint('Not unique!', utils.Colors.BOLD + utils.Colors.RED)])
+            elif unique_check['status'] == 'multiple':
+                renderer.write(
+                    [renderer.paint('Not unique! Another solution:', utils.Colors.BOLD + utils.Colors.RED)]
+                    + model.render_board(renderer, unique_check['solution'])
+                )
+            elif unique_check['status'] == 'unique':
+                renderer.write([renderer.paint('Unique solution', utils.Colors.BOLD + utils.Colors.GREEN)])
+            else:
+                renderer.write([renderer.paint(
+                    f'No other solution found within {opt.check_unique}s', utils.Colors.BOLD + utils.Colors.YELLOW
+                )])
+        if opt.stats == 'json':
+            print(json.dumps(model.stats.to_dict()), file=sys.stderr)
+        if opt.profile:
+            for output in options['profiler'].outputs:
+                print(f'Profile written to {output}', file=sys.stderr)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+
+from src.puzzles import PUZZLE_NAME
+from src.runner import SolveService
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve puzzle solving over HTTP on a pool of warmed up worker processes",
+        epilog='example: python service.py --port 8000 -w 4, then curl --data @./data/sudoku/puzzle_1.json localhost:8000/solve/S',
+        usage='python service.py [--host H] [--port N | --unix U] [-w W] [-q Q] [-t T]'
+    )
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='address to listen on, default: 127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help='TCP port to listen on, default: 8000')
+    parser.add_argument('--unix', type=str, default=None, help='path of a Unix socket to listen on instead of TCP')
+    parser.add_argument('-w', type=int, default=None, help='number of worker processes, default: cpu count')
+    parser.add_argument('-q', type=int, default=64, help='solves waiting for a worker before requests get 503, default: 64')
+    parser.add_argument('-t', type=float, default=30.0, help='default deadline of a request in seconds, ?timeout= overrides it, default: 30')
+    parser.add_argument('--cache', type=str, default=None, help='folder of the solution cache, disabled if omitted')
+    parser.add_argument('--cache-size', type=int, default=64, help='max size of the solution cache in MB')
+    parser.add_argument('--presolve', action='store_true', help='fix cells by logical rules before building the model')
+    parser.add_argument(
+        '--engine', type=str, action='append', default=[],
+        help='native solving engine of a puzzle as [P]=[E], e.g. S=dlx, can be repeated'
+    )
+    parser.add_argument('--cuts', type=str, default='loop', choices=['lazy', 'loop'], help='add loop cuts (Slitherlink) between solver runs (loop) or inside one CBC run (lazy), default: loop')
+    parser.add_argument('--no-names', action='store_true', help='do not name the variables, names are only read when debugging a model')
+    parser.add_argument('--warm-start', action='store_true', help='start the solver from the values decided by propagation (Binox, Star Battle, Sudoku, Troix)')
+    parser.add_argument('--backend', type=str, default=None, choices=['cbc', 'highs', 'cp-sat', 'sat'], help='solver of the mip engine, default: the one of the puzzle (see README)')
+    parser.add_argument('--threads', type=int, default=1, help='search threads of every solve (cp-sat, highs), default: 1, the pool runs a process per worker')
+    parser.add_argument('--templates', action='store_true', help='reuse the model of a puzzle shape in a worker, only givens change (Binox, Sudoku, Troix)')
+    parser.add_argument('--stats', action='store_true', help='add timings of every phase, model size, solver status and counters to results')
+    opt = parser.parse_args()
+    if opt.threads < 1:
+        parser.error('--threads must be positive')
+    if opt.templates and opt.presolve:
+        parser.error('--templates can not be used with --presolve')
+    engines = {}
+    for engine in opt.engine:
+        puzzle_short_name, engine_name = engine.split('=', 1)
+        engines[PUZZLE_NAME[puzzle_short_name]] = engine_name
+    service = SolveService(
+        opt.w, opt.q, opt.t, opt.cache, opt.cache_size * 1024 * 1024,
+        engines=engines, stats=opt.stats, templates=opt.templates, presolve=opt.presolve, cuts=opt.cuts,
+        names=not opt.no_names, warm_start=opt.warm_start, backend=opt.backend, threads=opt.threads
+    )
+    try:
+        asyncio.run(service.serve(opt.host, opt.port, opt.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
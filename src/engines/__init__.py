@@ -0,0 +1,5 @@
+from .binox_bitboard import BinoxBitboard
+from .cdcl_solver import CdclSolver
+from .dancing_links import DancingLinks
+from .star_battle_bitmask import StarBattleBitmask
+from .troix_search import TroixSearch
@@ -0,0 +1,262 @@
+import functools
+import operator
+
+
+class BinoxBitboard:
+    # Backtracking search where every row and column is a pair of bitmasks:
+    # bit i of x_masks[line] (o_masks[line]) is set when cell i of the line
+    # holds X (O). Rows are lines 0..n_rows-1, columns follow.
+    # Lines short enough to enumerate also keep the X masks of their valid
+    # patterns, which are filtered as cells get fixed. Longer lines branch
+    # on single cells, which takes minutes on empty grids from 28x28 on
+    # (see can_enumerate()).
+    PATTERN_LIMIT = 150000
+
+    def __init__(self, shape: list[int], symbol_number: int, fixed_cells: dict[tuple, str]) -> None:
+        self.n_rows, self.n_cols = shape
+        self.symbol_number = symbol_number
+        self.line_number = self.n_rows + self.n_cols
+        self.x_masks = [0] * self.line_number
+        self.o_masks = [0] * self.line_number
+        self.fixed_cells = fixed_cells
+        # Masks of every symbol_number + 1 consecutive cells, by line length
+        self.windows = {
+            length: [
+                ((1 << (symbol_number + 1)) - 1) << start
+                for start in range(length - symbol_number)
+            ]
+            for length in set(shape)
+        }
+        self.patterns = {length: self.get_line_patterns(length) for length in set(shape)}
+        return None
+
+    def get_line_patterns(self, length: int) -> list[int] | None:
+        # X masks of all balanced lines without a run longer than symbol_number,
+        # None if there are more than PATTERN_LIMIT of them.
+        half = length // 2
+        patterns = []
+        stack = [(0, 0, 0, -1, 0)]
+        while len(stack):
+            index, mask, x_count, last, run = stack.pop()
+            if index == length:
+                patterns.append(mask)
+                if len(patterns) > self.PATTERN_LIMIT:
+                    return None
+                continue
+            for symbol in [0, 1]:
+                next_run = run + 1 if symbol == last else 1
+                next_x_count = x_count + symbol
+                if (
+                    next_run > self.symbol_number
+                    or next_x_count > half or index + 1 - next_x_count > half
+                ):
+                    continue
+                stack.append((index + 1, mask | (symbol << index), next_x_count, symbol, next_run))
+        return patterns
+
+    @staticmethod
+    def count_line_patterns(length: int, symbol_number: int) -> int:
+        # Number of lines get_line_patterns() would enumerate, counted by X
+        # count, last symbol and run length without building them
+        half = length // 2
+        counts = {(0, -1, 0): 1}
+        for index in range(length):
+            next_counts = {}
+            for (x_count, last, run), number in counts.items():
+                for symbol in [0, 1]:
+                    next_run = run + 1 if symbol == last else 1
+                    next_x_count = x_count + symbol
+                    if (
+                        next_run > symbol_number
+                        or next_x_count > half or index + 1 - next_x_count > half
+                    ):
+                        continue
+                    key = (next_x_count, symbol, next_run)
+                    next_counts[key] = next_counts.get(key, 0) + number
+            counts = next_counts
+        return sum(counts.values())
+
+    @classmethod
+    def can_enumerate(cls, shape: list[int], symbol_number: int) -> bool:
+        # True if every line keeps its patterns, i.e. the search never falls
+        # back to branching on single cells
+        return all(cls.count_line_patterns(length, symbol_number) <= cls.PATTERN_LIMIT for length in set(shape))
+
+    def get_line_length(self, line: int) -> int:
+        return self.n_cols if line < self.n_rows else self.n_rows
+
+    def set_cell(self, x_masks: list[int], o_masks: list[int], line: int, bit: int, is_x: bool) -> None:
+        # Sets the cell in both its row and its column
+        index = bit.bit_length() - 1
+        if line < self.n_rows:
+            row, col = line, index
+        else:
+            row, col = index, line - self.n_rows
+        masks = x_masks if is_x else o_masks
+        masks[row] |= 1 << col
+        masks[self.n_rows + col] |= 1 << row
+        return None
+
+    def set_cells(self, x_masks: list[int], o_masks: list[int], line: int, bits: int, is_x: bool) -> None:
+        while bits:
+            bit = bits & -bits
+            self.set_cell(x_masks, o_masks, line, bit, is_x)
+            bits ^= bit
+        return None
+
+    def propagate(self, x_masks: list[int], o_masks: list[int], candidates: list) -> bool:
+        # Applies the balance, run and uniqueness rules until nothing changes.
+        # Returns False on a contradiction.
+        changed = True
+        while changed:
+            changed = False
+            completed = [set(), set()]
+            for line in range(self.line_number):
+                x, o = x_masks[line], o_masks[line]
+                if x & o:
+                    return False
+                length = self.get_line_length(line)
+                half = length // 2
+                unknown = ((1 << length) - 1) & ~(x | o)
+                x_count, o_count = x.bit_count(), o.bit_count()
+                if x_count > half or o_count > half:
+                    return False
+                for window in self.windows[length]:
+                    if (x & window).bit_count() > self.symbol_number or (o & window).bit_count() > self.symbol_number:
+                        return False
+                orientation = 0 if line < self.n_rows else 1
+                if unknown == 0:
+                    # Uniqueness: a completed line must not appear twice
+                    if x in completed[orientation]:
+                        return False
+                    completed[orientation].add(x)
+                    continue
+                # Balance rule
+                if x_count == half:
+                    self.set_cells(x_masks, o_masks, line, unknown, False)
+                    changed = True
+                    continue
+                if o_count == half:
+                    self.set_cells(x_masks, o_masks, line, unknown, True)
+                    changed = True
+                    continue
+                # Run rule: a window with symbol_number same symbols and one
+                # empty cell gets the other symbol there
+                for window in self.windows[length]:
+                    empty = unknown & window
+                    if empty == 0 or empty & (empty - 1):
+                        continue
+                    if (x & window).bit_count() == self.symbol_number:
+                        self.set_cells(x_masks, o_masks, line, empty, False)
+                        changed = True
+                        break
+                    if (o & window).bit_count() == self.symbol_number:
+                        self.set_cells(x_masks, o_masks, line, empty, True)
+                        changed = True
+                        break
+            if changed:
+                continue
+            # Uniqueness rule: a line with one X and one O left must not be
+            # completed into a line that already exists
+            for line in range(self.line_number):
+                x, o = x_masks[line], o_masks[line]
+                length = self.get_line_length(line)
+                unknown = ((1 << length) - 1) & ~(x | o)
+                if unknown.bit_count() != 2 or x.bit_count() != length // 2 - 1:
+                    continue
+                orientation = 0 if line < self.n_rows else 1
+                first = unknown & -unknown
+                second = unknown ^ first
+                if x | first in completed[orientation]:
+                    self.set_cell(x_masks, o_masks, line, first, False)
+                    self.set_cell(x_masks, o_masks, line, second, True)
+                    changed = True
+                elif x | second in completed[orientation]:
+                    self.set_cell(x_masks, o_masks, line, first, True)
+                    self.set_cell(x_masks, o_masks, line, second, False)
+                    changed = True
+            if changed:
+                continue
+            # Line patterns: keep the patterns matching the fixed cells and not
+            # equal to a completed line, cells shared by all of them are fixed
+            for line in range(self.line_number):
+                if candidates[line] is None:
+                    continue
+                x, o = x_masks[line], o_masks[line]
+                unknown = ((1 << self.get_line_length(line)) - 1) & ~(x | o)
+                if unknown == 0:
+                    continue
+                orientation = 0 if line < self.n_rows else 1
+                patterns = [
+                    pattern for pattern in candidates[line]
+                    if pattern & x == x and pattern & o == 0 and pattern not in completed[orientation]
+                ]
+                if len(patterns) == 0:
+                    return False
+                candidates[line] = patterns
+                forced_x = functools.reduce(operator.and_, patterns) & unknown
+                forced_o = unknown & ~functools.reduce(operator.or_, patterns)
+                if forced_x:
+                    self.set_cells(x_masks, o_masks, line, forced_x, True)
+                    changed = True
+                if forced_o:
+                    self.set_cells(x_masks, o_masks, line, forced_o, False)
+                    changed = True
+        return True
+
+    def choose_branches(self, x_masks: list[int], o_masks: list[int], candidates: list) -> list[tuple[int, int, int]]:
+        # Branches as (line, X cells, O cells) to set: every pattern of the
+        # incomplete line with the fewest patterns, otherwise both symbols for
+        # the first empty cell of the line with the fewest empty cells.
+        best_line, best_count = None, None
+        for line in range(self.line_number):
+            unknown = ((1 << self.get_line_length(line)) - 1) & ~(x_masks[line] | o_masks[line])
+            if unknown and candidates[line] is not None and (
+                best_count is None or len(candidates[line]) < best_count
+            ):
+                best_line, best_count = line, len(candidates[line])
+        if best_line is not None:
+            full = (1 << self.get_line_length(best_line)) - 1
+            unknown = full & ~(x_masks[best_line] | o_masks[best_line])
+            return [
+                (best_line, pattern & unknown, ~pattern & unknown)
+                for pattern in candidates[best_line]
+            ]
+        best_unknown = 0
+        for line in range(self.line_number):
+            unknown = ((1 << self.get_line_length(line)) - 1) & ~(x_masks[line] | o_masks[line])
+            count = unknown.bit_count()
+            if count and (best_count is None or count < best_count):
+                best_line, best_unknown, best_count = line, unknown, count
+        if best_line is None:
+            return []
+        bit = best_unknown & -best_unknown
+        return [(best_line, bit, 0), (best_line, 0, bit)]
+
+    def search(self, x_masks: list[int], o_masks: list[int], candidates: list) -> list[int] | None:
+        if not self.propagate(x_masks, o_masks, candidates):
+            return None
+        branches = self.choose_branches(x_masks, o_masks, candidates)
+        if len(branches) == 0:
+            return x_masks
+        for line, x_bits, o_bits in branches:
+            next_x_masks, next_o_masks = x_masks.copy(), o_masks.copy()
+            self.set_cells(next_x_masks, next_o_masks, line, x_bits, True)
+            self.set_cells(next_x_masks, next_o_masks, line, o_bits, False)
+            solution = self.search(next_x_masks, next_o_masks, candidates.copy())
+            if solution is not None:
+                return solution
+        return None
+
+    def solve(self) -> list[list[int]] | None:
+        x_masks, o_masks = self.x_masks.copy(), self.o_masks.copy()
+        for (row, col), val in self.fixed_cells.items():
+            self.set_cell(x_masks, o_masks, row, 1 << col, val == 'X')
+        candidates = [self.patterns[self.get_line_length(line)] for line in range(self.line_number)]
+        solution = self.search(x_masks, o_masks, candidates)
+        if solution is None:
+            return None
+        return [
+            [(solution[row] >> col) & 1 for col in range(self.n_cols)]
+            for row in range(self.n_rows)
+        ]
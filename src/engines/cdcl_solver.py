@@ -0,0 +1,308 @@
+import heapq
+import time
+
+
+class CdclSolver:
+    # Conflict driven clause learning on clauses of DIMACS literals (v or -v
+    # for variable v >= 1). Inside, literal 2v is v and 2v + 1 is not v, so
+    # lit ^ 1 is the negation. Two watched literals per clause (clause[0]
+    # and clause[1], clause[0] is the implied literal of a reason), first UIP
+    # learning with minimization, VSIDS on a heap with stale entries, phase
+    # saving, Luby restarts and removal of learnt clauses with a high LBD.
+    RESTART_BASE = 100
+    DECAY = 0.95
+    MAX_ACTIVITY = 1e100
+
+    def __init__(self, var_number: int = 0) -> None:
+        self.var_number = 0
+        # values[lit] is 1 if lit is true, -1 if false, 0 unassigned
+        self.values = [0, 0]
+        self.levels = [0]
+        self.reasons = [-1]
+        self.activity = [0.0]
+        self.phases = [False]
+        self.seen = bytearray(1)
+        self.watches = [[], []]
+        # None for removed learnt clauses
+        self.clauses = []
+        self.learnts = []
+        self.lbds = {}
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.heap = []
+        self.increment = 1.0
+        self.is_unsat = False
+        self.model = None
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        for _ in range(var_number):
+            self.new_var()
+        return None
+
+    def new_var(self) -> int:
+        self.var_number += 1
+        self.values += [0, 0]
+        self.levels.append(0)
+        self.reasons.append(-1)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        self.seen.append(0)
+        self.watches += [[], []]
+        heapq.heappush(self.heap, (0.0, self.var_number))
+        return self.var_number
+
+    def add_clause(self, literals: list[int]) -> bool:
+        # Added at level 0, between solve() calls. False once the clauses are
+        # known to be unsatisfiable.
+        if self.is_unsat:
+            return False
+        clause = []
+        for literal in literals:
+            lit = 2 * literal if literal > 0 else -2 * literal + 1
+            value = self.values[lit]
+            if value == 1 or lit ^ 1 in clause:
+                return True
+            if value == 0 and lit not in clause:
+                clause.append(lit)
+        if len(clause) == 0:
+            self.is_unsat = True
+            return False
+        if len(clause) == 1:
+            self.assign(clause[0], -1)
+            return True
+        self.watches[clause[0]].append(len(self.clauses))
+        self.watches[clause[1]].append(len(self.clauses))
+        self.clauses.append(clause)
+        return True
+
+    def assign(self, lit: int, reason: int) -> None:
+        self.values[lit] = 1
+        self.values[lit ^ 1] = -1
+        self.levels[lit >> 1] = len(self.trail_limits)
+        self.reasons[lit >> 1] = reason
+        self.trail.append(lit)
+        return None
+
+    def propagate(self) -> int:
+        # Index of a conflicting clause, -1 if none
+        values, watches, clauses, trail = self.values, self.watches, self.clauses, self.trail
+        while self.head < len(trail):
+            false_lit = trail[self.head] ^ 1
+            self.head += 1
+            self.propagations += 1
+            watch_list = watches[false_lit]
+            kept = []
+            index = 0
+            while index < len(watch_list):
+                clause_index = watch_list[index]
+                index += 1
+                clause = clauses[clause_index]
+                if clause is None:
+                    continue
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if values[first] == 1:
+                    kept.append(clause_index)
+                    continue
+                for position in range(2, len(clause)):
+                    other = clause[position]
+                    if values[other] != -1:
+                        clause[1], clause[position] = other, false_lit
+                        watches[other].append(clause_index)
+                        break
+                else:
+                    kept.append(clause_index)
+                    if values[first] == -1:
+                        kept += watch_list[index:]
+                        watches[false_lit] = kept
+                        return clause_index
+                    self.assign(first, clause_index)
+            watches[false_lit] = kept
+        return -1
+
+    def bump(self, var: int) -> None:
+        self.activity[var] += self.increment
+        if self.activity[var] > self.MAX_ACTIVITY:
+            self.activity = [activity / self.MAX_ACTIVITY for activity in self.activity]
+            self.increment /= self.MAX_ACTIVITY
+            self.heap = [(-self.activity[var], var) for var in range(1, self.var_number + 1)]
+            heapq.heapify(self.heap)
+        elif self.values[2 * var] == 0:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        return None
+
+    def analyze(self, conflict: int) -> tuple[list[int], int]:
+        # First UIP clause (asserting literal first) and the level to go back to
+        seen, levels, reasons, trail, clauses = self.seen, self.levels, self.reasons, self.trail, self.clauses
+        level = len(self.trail_limits)
+        learnt = [0]
+        counter = 0
+        lit = -1
+        clause = clauses[conflict]
+        position = len(trail) - 1
+        while True:
+            for other in clause if lit == -1 else clause[1:]:
+                var = other >> 1
+                if not seen[var] and levels[var] > 0:
+                    seen[var] = 1
+                    self.bump(var)
+                    if levels[var] >= level:
+                        counter += 1
+                    else:
+                        learnt.append(other)
+            while not seen[trail[position] >> 1]:
+                position -= 1
+            lit = trail[position]
+            position -= 1
+            seen[lit >> 1] = 0
+            counter -= 1
+            if counter == 0:
+                break
+            clause = clauses[reasons[lit >> 1]]
+        learnt[0] = lit ^ 1
+        # Drop literals implied by the others of the clause
+        minimized = [learnt[0]]
+        for other in learnt[1:]:
+            reason = reasons[other >> 1]
+            if reason == -1 or any(
+                not seen[implied >> 1] and levels[implied >> 1] > 0 for implied in clauses[reason][1:]
+            ):
+                minimized.append(other)
+        for other in learnt[1:]:
+            seen[other >> 1] = 0
+        back_level = 0
+        if len(minimized) > 1:
+            highest = max(range(1, len(minimized)), key=lambda index: levels[minimized[index] >> 1])
+            minimized[1], minimized[highest] = minimized[highest], minimized[1]
+            back_level = levels[minimized[1] >> 1]
+        return minimized, back_level
+
+    def backtrack(self, level: int) -> None:
+        if len(self.trail_limits) <= level:
+            return None
+        values, phases, activity, heap = self.values, self.phases, self.activity, self.heap
+        limit = self.trail_limits[level]
+        for lit in self.trail[limit:]:
+            var = lit >> 1
+            phases[var] = lit & 1 == 0
+            values[lit] = 0
+            values[lit ^ 1] = 0
+            heapq.heappush(heap, (-activity[var], var))
+        del self.trail[limit:]
+        del self.trail_limits[level:]
+        self.head = limit
+        return None
+
+    def learn(self, learnt: list[int]) -> None:
+        if len(learnt) == 1:
+            self.assign(learnt[0], -1)
+            return None
+        clause_index = len(self.clauses)
+        self.clauses.append(learnt)
+        self.watches[learnt[0]].append(clause_index)
+        self.watches[learnt[1]].append(clause_index)
+        self.learnts.append(clause_index)
+        self.lbds[clause_index] = len({self.levels[lit >> 1] for lit in learnt})
+        self.assign(learnt[0], clause_index)
+        return None
+
+    def reduce_learnts(self) -> None:
+        # Removes the half of learnt clauses with the highest LBD, except
+        # reasons of the current assignment and glue clauses (LBD 2)
+        learnts = sorted(self.learnts, key=lambda index: (self.lbds[index], len(self.clauses[index])))
+        kept = learnts[:len(learnts) // 2]
+        for clause_index in learnts[len(learnts) // 2:]:
+            first = self.clauses[clause_index][0]
+            if self.lbds[clause_index] <= 2 or (
+                self.reasons[first >> 1] == clause_index and self.values[first] == 1
+            ):
+                kept.append(clause_index)
+                continue
+            self.clauses[clause_index] = None
+            del self.lbds[clause_index]
+        self.learnts = kept
+        return None
+
+    def pick_branch_lit(self) -> int:
+        # 0 once every variable is assigned
+        heap, values = self.heap, self.values
+        while len(heap):
+            var = heapq.heappop(heap)[1]
+            if values[2 * var] == 0:
+                return 2 * var if self.phases[var] else 2 * var + 1
+        return 0
+
+    @classmethod
+    def luby(cls, index: int) -> int:
+        # index-th term (from 0) of 1, 1, 2, 1, 1, 2, 4, 1, ...
+        size, power = 1, 0
+        while size < index + 1:
+            power += 1
+            size = 2 * size + 1
+        while size - 1 != index:
+            size = (size - 1) >> 1
+            power -= 1
+            index %= size
+        return 1 << power
+
+    def solve(
+        self, phases: dict[int, bool] | None = None, max_conflicts: int | None = None, max_seconds: float | None = None
+    ) -> bool | None:
+        # True with self.model filled, False if unsatisfiable, None when
+        # max_conflicts or max_seconds runs out. phases gives the first value
+        # tried for a variable, e.g. from a warm start.
+        self.model = None
+        deadline = time.perf_counter() + max_seconds if max_seconds is not None else None
+        if self.is_unsat:
+            return False
+        for var, phase in (phases or {}).items():
+            self.phases[var] = phase
+        restarts = 0
+        restart_limit = self.RESTART_BASE * self.luby(restarts)
+        restart_conflicts = 0
+        max_learnts = len(self.clauses) // 3 + 1000
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict != -1:
+                self.conflicts += 1
+                conflicts += 1
+                restart_conflicts += 1
+                if len(self.trail_limits) == 0:
+                    self.is_unsat = True
+                    return False
+                learnt, back_level = self.analyze(conflict)
+                self.backtrack(back_level)
+                self.learn(learnt)
+                self.increment /= self.DECAY
+                # Checked on conflicts only, a search without any is short
+                if deadline is not None and time.perf_counter() > deadline:
+                    self.backtrack(0)
+                    return None
+                continue
+            if max_conflicts is not None and conflicts >= max_conflicts:
+                self.backtrack(0)
+                return None
+            if restart_conflicts >= restart_limit:
+                self.backtrack(0)
+                restarts += 1
+                restart_limit = self.RESTART_BASE * self.luby(restarts)
+                restart_conflicts = 0
+            if len(self.learnts) > max_learnts:
+                self.reduce_learnts()
+                max_learnts += max_learnts // 10
+            lit = self.pick_branch_lit()
+            if lit == 0:
+                self.model = [False] + [self.values[2 * var] == 1 for var in range(1, self.var_number + 1)]
+                self.backtrack(0)
+                return True
+            self.decisions += 1
+            self.trail_limits.append(len(self.trail))
+            self.assign(lit, -1)
+
+    def value(self, literal: int) -> bool:
+        # Value of a DIMACS literal in the last model
+        return self.model[literal] if literal > 0 else not self.model[-literal]
@@ -0,0 +1,133 @@
+class DancingLinks:
+    # Knuth's Algorithm X on a toroidal doubly linked list stored in flat
+    # arrays. Node 0 is the root, nodes 1..column_number are column headers,
+    # the other nodes are the 1s of the exact cover matrix.
+
+    def __init__(self, column_number: int) -> None:
+        header_number = column_number + 1
+        self.left = [header - 1 for header in range(header_number)]
+        self.left[0] = column_number
+        self.right = [header + 1 for header in range(header_number)]
+        self.right[column_number] = 0
+        self.up = list(range(header_number))
+        self.down = list(range(header_number))
+        self.column = list(range(header_number))
+        self.row = [-1] * header_number
+        self.size = [0] * header_number
+        self.row_number = 0
+        return None
+
+    def add_row(self, columns: list[int]) -> int:
+        row = self.row_number
+        self.row_number += 1
+        first = None
+        for column in columns:
+            header = column + 1
+            node = len(self.column)
+            self.column.append(header)
+            self.row.append(row)
+            self.up.append(self.up[header])
+            self.down.append(header)
+            self.down[self.up[header]] = node
+            self.up[header] = node
+            self.size[header] += 1
+            if first is None:
+                first = node
+                self.left.append(node)
+                self.right.append(node)
+            else:
+                self.left.append(self.left[first])
+                self.right.append(first)
+                self.right[self.left[first]] = node
+                self.left[first] = node
+        return row
+
+    def cover(self, header: int) -> None:
+        left, right, up, down, column, size = (
+            self.left, self.right, self.up, self.down, self.column, self.size
+        )
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+        node = down[header]
+        while node != header:
+            other = right[node]
+            while other != node:
+                down[up[other]] = down[other]
+                up[down[other]] = up[other]
+                size[column[other]] -= 1
+                other = right[other]
+            node = down[node]
+        return None
+
+    def uncover(self, header: int) -> None:
+        left, right, up, down, column, size = (
+            self.left, self.right, self.up, self.down, self.column, self.size
+        )
+        node = up[header]
+        while node != header:
+            other = left[node]
+            while other != node:
+                size[column[other]] += 1
+                down[up[other]] = other
+                up[down[other]] = other
+                other = left[other]
+            node = up[node]
+        right[left[header]] = header
+        left[right[header]] = header
+        return None
+
+    def choose_column(self) -> int:
+        # The column with the fewest rows left (Knuth's S heuristic)
+        best, best_size = 0, None
+        header = self.right[0]
+        while header != 0:
+            if best_size is None or self.size[header] < best_size:
+                best, best_size = header, self.size[header]
+                if best_size <= 1:
+                    break
+            header = self.right[header]
+        return best
+
+    def select(self, node: int) -> None:
+        other = self.right[node]
+        while other != node:
+            self.cover(self.column[other])
+            other = self.right[other]
+        return None
+
+    def unselect(self, node: int) -> None:
+        other = self.left[node]
+        while other != node:
+            self.uncover(self.column[other])
+            other = self.left[other]
+        return None
+
+    def solutions(self):
+        # Iterative search so deep boards (e.g. 25x25 Sudoku) do not hit the
+        # recursion limit. Yields the chosen rows of each exact cover.
+        stack = []
+        while True:
+            backtrack = True
+            if self.right[0] == 0:
+                yield [self.row[node] for node in stack]
+            else:
+                header = self.choose_column()
+                if self.size[header] > 0:
+                    self.cover(header)
+                    node = self.down[header]
+                    self.select(node)
+                    stack.append(node)
+                    backtrack = False
+            while backtrack:
+                if len(stack) == 0:
+                    return None
+                node = stack.pop()
+                self.unselect(node)
+                header = self.column[node]
+                node = self.down[node]
+                if node != header:
+                    self.select(node)
+                    stack.append(node)
+                    backtrack = False
+                else:
+                    self.uncover(header)
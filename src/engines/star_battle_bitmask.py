@@ -0,0 +1,168 @@
+class StarBattleBitmask:
+    # Backtracking search over the whole board as one integer: bit
+    # row * n_cols + col is cell (row, col). The state is the mask of placed
+    # stars and the mask of cells that can no longer hold a star.
+
+    def __init__(self, shape: list[int], star_number: int, cages: list[list[dict]]) -> None:
+        self.n_rows, self.n_cols = shape
+        self.star_number = star_number
+        self.full = (1 << (self.n_rows * self.n_cols)) - 1
+        self.row_masks = [
+            ((1 << self.n_cols) - 1) << (row * self.n_cols) for row in range(self.n_rows)
+        ]
+        self.col_masks = [
+            sum(1 << (row * self.n_cols + col) for row in range(self.n_rows))
+            for col in range(self.n_cols)
+        ]
+        self.cage_masks = [
+            sum(1 << (cell['row'] * self.n_cols + cell['col']) for cell in cage)
+            for cage in cages
+        ]
+        self.units = self.row_masks + self.col_masks + self.cage_masks
+        self.neighbors = []
+        for row in range(self.n_rows):
+            for col in range(self.n_cols):
+                mask = 0
+                for gap_row in [-1, 0, 1]:
+                    for gap_col in [-1, 0, 1]:
+                        if (
+                            (gap_row != 0 or gap_col != 0)
+                            and 0 <= row + gap_row < self.n_rows
+                            and 0 <= col + gap_col < self.n_cols
+                        ):
+                            mask |= 1 << ((row + gap_row) * self.n_cols + col + gap_col)
+                self.neighbors.append(mask)
+        return None
+
+    def place_stars(self, stars: int, excluded: int, cells: int) -> tuple[int, int] | None:
+        # Places a star in every cell of the mask and excludes its neighbours
+        if cells & excluded:
+            return None
+        stars |= cells
+        while cells:
+            bit = cells & -cells
+            excluded |= self.neighbors[bit.bit_length() - 1]
+            cells ^= bit
+        if stars & excluded:
+            return None
+        return stars, excluded
+
+    def propagate(self, stars: int, excluded: int) -> tuple[int, int] | None:
+        changed = True
+        while changed:
+            changed = False
+            open_cells = self.full & ~stars & ~excluded
+            # Each row, column and cage holds exactly star_number stars
+            for unit in self.units:
+                star_count = (stars & unit).bit_count()
+                available = unit & open_cells
+                available_count = available.bit_count()
+                if star_count > self.star_number or star_count + available_count < self.star_number:
+                    return None
+                if available_count == 0:
+                    continue
+                if star_count == self.star_number:
+                    excluded |= available
+                    open_cells &= ~available
+                    changed = True
+                elif star_count + available_count == self.star_number:
+                    placed = self.place_stars(stars, excluded, available)
+                    if placed is None:
+                        return None
+                    stars, excluded = placed
+                    open_cells = self.full & ~stars & ~excluded
+                    changed = True
+            if changed:
+                continue
+            for lines in [self.row_masks, self.col_masks]:
+                next_excluded = self.apply_band_rule(stars, excluded, lines)
+                if next_excluded is None:
+                    return None
+                if next_excluded != excluded:
+                    excluded = next_excluded
+                    changed = True
+                    break
+        return stars, excluded
+
+    def apply_band_rule(self, stars: int, excluded: int, lines: list[int]) -> int | None:
+        # Counting rule on bands of k consecutive rows (columns): k cages
+        # confined to the band fill it, so other cells of the band are
+        # excluded; a band touched by only k cages takes all their stars, so
+        # cells of those cages outside the band are excluded.
+        # Returns the new excluded mask, None on a contradiction.
+        live = [cage & ~excluded for cage in self.cage_masks]
+        line_cages = [
+            [index for index, cells in enumerate(live) if cells & line] for line in lines
+        ]
+        first_line, last_line = [None] * len(live), [None] * len(live)
+        for index in range(len(lines)):
+            for cage in line_cages[index]:
+                if first_line[cage] is None:
+                    first_line[cage] = index
+                last_line[cage] = index
+        # Cages by the last line they reach
+        ending_cages = [[] for _ in lines]
+        for cage, index in enumerate(last_line):
+            if index is not None:
+                ending_cages[index].append(cage)
+        for start in range(len(lines)):
+            band, inside, inside_count, touching, touching_count, seen = 0, 0, 0, 0, 0, 0
+            for end in range(start, len(lines)):
+                band |= lines[end]
+                for cage in line_cages[end]:
+                    if not seen >> cage & 1:
+                        seen |= 1 << cage
+                        touching |= live[cage]
+                        touching_count += 1
+                for cage in ending_cages[end]:
+                    if first_line[cage] >= start:
+                        inside |= live[cage]
+                        inside_count += 1
+                size = end - start + 1
+                if size == len(lines):
+                    continue
+                if inside_count > size or touching_count < size:
+                    return None
+                open_cells = ~stars & ~excluded
+                if inside_count == size and band & open_cells & ~inside:
+                    return excluded | (band & open_cells & ~inside)
+                if touching_count == size and touching & open_cells & ~band:
+                    return excluded | (touching & open_cells & ~band)
+        return excluded
+
+    def search(self, stars: int, excluded: int) -> int | None:
+        # Depth first over (stars, excluded) states on an explicit stack, so
+        # deep boards do not hit the recursion limit. Placing a star in the
+        # branching cell is tried before excluding it.
+        stack = [(stars, excluded)]
+        while len(stack):
+            state = self.propagate(*stack.pop())
+            if state is None:
+                continue
+            stars, excluded = state
+            open_cells = self.full & ~stars & ~excluded
+            # Branch on the first open cell of the most constrained cage
+            best_cells, best_count = 0, None
+            for cage in self.cage_masks:
+                if (stars & cage).bit_count() == self.star_number:
+                    continue
+                count = (cage & open_cells).bit_count()
+                if best_count is None or count < best_count:
+                    best_cells, best_count = cage & open_cells, count
+            if best_count is None:
+                return stars
+            cell = best_cells & -best_cells
+            stack.append((stars, excluded | cell))
+            placed = self.place_stars(stars, excluded, cell)
+            if placed is not None:
+                stack.append(placed)
+        return None
+
+    def solve(self) -> list[list[int]] | None:
+        stars = self.search(0, 0)
+        if stars is None:
+            return None
+        return [
+            [(stars >> (row * self.n_cols + col)) & 1 for col in range(self.n_cols)]
+            for row in range(self.n_rows)
+        ]
@@ -0,0 +1,229 @@
+class TroixSearch:
+    # Backtracking search with incremental propagation. cells[index] is the
+    # 2-bit code of the symbol in the cell (0 while empty, 1 + position in
+    # SYMBOLS otherwise) and domains[index] the bitmask of symbols it can
+    # still take. Rows are lines 0..n_rows-1, columns follow.
+    # For every line and symbol, counts holds the cells fixed to the symbol
+    # and supports the cells that can still take it, both updated in O(1)
+    # on each domain change and restored from the trail on backtrack.
+    SYMBOLS = 'XOI'
+    POPCOUNT = (0, 1, 1, 2, 1, 2, 2, 3)
+
+    def __init__(self, shape: list[int], symbol_number: int, fixed_cells: dict[tuple, str]) -> None:
+        self.n_rows, self.n_cols = shape
+        self.symbol_number = symbol_number
+        self.cells = bytearray(self.n_rows * self.n_cols)
+        self.domains = bytearray([7] * (self.n_rows * self.n_cols))
+        self.lines = [
+            [row * self.n_cols + col for col in range(self.n_cols)] for row in range(self.n_rows)
+        ] + [
+            [row * self.n_cols + col for row in range(self.n_rows)] for col in range(self.n_cols)
+        ]
+        self.cell_lines = [
+            (index // self.n_cols, self.n_rows + index % self.n_cols)
+            for index in range(self.n_rows * self.n_cols)
+        ]
+        self.thirds = [len(line) // 3 for line in self.lines]
+        self.counts = [0] * (3 * len(self.lines))
+        self.supports = [len(line) for line in self.lines for _ in self.SYMBOLS]
+        self.trail = []
+        self.queue = []
+        self.fixed_cells = fixed_cells
+        return None
+
+    def restrict(self, index: int, domain: int) -> bool:
+        # Keeps only the symbols of domain in the cell, False if none is left
+        old = self.domains[index]
+        new = old & domain
+        if new == old:
+            return True
+        if new == 0:
+            return False
+        self.trail.append((index, old))
+        self.domains[index] = new
+        removed = old & ~new
+        for line in self.cell_lines[index]:
+            for symbol in range(3):
+                if removed >> symbol & 1:
+                    self.supports[3 * line + symbol] -= 1
+        if self.POPCOUNT[new] == 1:
+            symbol = new.bit_length() - 1
+            self.cells[index] = symbol + 1
+            for line in self.cell_lines[index]:
+                self.counts[3 * line + symbol] += 1
+        self.queue.append(index)
+        return True
+
+    def undo(self, mark: int) -> None:
+        while len(self.trail) > mark:
+            index, old = self.trail.pop()
+            new = self.domains[index]
+            if self.POPCOUNT[new] == 1 and self.POPCOUNT[old] > 1:
+                self.cells[index] = 0
+                for line in self.cell_lines[index]:
+                    self.counts[3 * line + new.bit_length() - 1] -= 1
+            restored = old & ~new
+            for line in self.cell_lines[index]:
+                for symbol in range(3):
+                    if restored >> symbol & 1:
+                        self.supports[3 * line + symbol] += 1
+            self.domains[index] = old
+        return None
+
+    def check_line(self, line: int) -> bool:
+        # Balance rule: every symbol fills a third of the line
+        third = self.thirds[line]
+        for symbol in range(3):
+            count, support = self.counts[3 * line + symbol], self.supports[3 * line + symbol]
+            if count > third or support < third:
+                return False
+            bit = 1 << symbol
+            if count == third and support > third:
+                for index in self.lines[line]:
+                    if self.cells[index] != symbol + 1 and not self.restrict(index, 7 & ~bit):
+                        return False
+            elif support == third and count < third:
+                for index in self.lines[line]:
+                    if self.domains[index] & bit and not self.restrict(index, bit):
+                        return False
+        return True
+
+    def check_capacity(self, line: int, symbol: int) -> bool:
+        # The line must still fit a third of the symbol without runs longer
+        # than symbol_number. forward[i][run] (backward[i][run]) is the most
+        # copies of the symbol in the cells before (from) position i, ending
+        # (starting) with a run of run copies. A cell is fixed, or loses the
+        # symbol, when the other choice can not reach a third.
+        cells = self.lines[line]
+        third = self.thirds[line]
+        bit = 1 << symbol
+        impossible = -len(cells) - 1
+        forward = [[impossible] * (self.symbol_number + 1) for _ in range(len(cells) + 1)]
+        forward[0][0] = 0
+        for position, index in enumerate(cells):
+            domain, current, following = self.domains[index], forward[position], forward[position + 1]
+            if domain & ~bit & 7:
+                following[0] = max(current)
+            if domain & bit:
+                for run in range(self.symbol_number):
+                    following[run + 1] = current[run] + 1
+        if max(forward[len(cells)]) < third:
+            return False
+        backward = [[impossible] * (self.symbol_number + 1) for _ in range(len(cells) + 1)]
+        backward[len(cells)][0] = 0
+        for position in range(len(cells) - 1, -1, -1):
+            domain, current, following = self.domains[cells[position]], backward[position], backward[position + 1]
+            if domain & ~bit & 7:
+                current[0] = max(following)
+            if domain & bit:
+                for run in range(self.symbol_number):
+                    current[run + 1] = following[run] + 1
+        for position, index in enumerate(cells):
+            domain = self.domains[index]
+            if not domain & bit or not domain & ~bit & 7:
+                continue
+            without_symbol = max(forward[position]) + max(backward[position + 1])
+            with_symbol = max(
+                forward[position][before] + 1 + backward[position + 1][after]
+                for before in range(self.symbol_number)
+                for after in range(self.symbol_number - before)
+            )
+            if without_symbol < third and not self.restrict(index, bit):
+                return False
+            if with_symbol < third and not self.restrict(index, 7 & ~bit):
+                return False
+        return True
+
+    def check_runs(self, index: int) -> bool:
+        # Run rule around a newly fixed cell: a window of symbol_number + 1
+        # cells with symbol_number copies of its symbol excludes it elsewhere
+        code = self.cells[index]
+        bit = 1 << (code - 1)
+        for line in self.cell_lines[index]:
+            cells = self.lines[line]
+            position = cells.index(index)
+            for start in range(
+                max(0, position - self.symbol_number),
+                min(position, len(cells) - self.symbol_number - 1) + 1
+            ):
+                window = cells[start: start + self.symbol_number + 1]
+                count = sum(1 for cell in window if self.cells[cell] == code)
+                if count > self.symbol_number:
+                    return False
+                if count == self.symbol_number:
+                    for cell in window:
+                        if self.cells[cell] != code and not self.restrict(cell, 7 & ~bit):
+                            return False
+        return True
+
+    def propagate(self) -> bool:
+        # Cheap rules first, the capacity of changed lines once they are stable
+        changed_lines = set()
+        while len(self.queue) or len(changed_lines):
+            if len(self.queue) == 0:
+                line = changed_lines.pop()
+                for symbol in range(3):
+                    if self.counts[3 * line + symbol] < self.thirds[line] and not self.check_capacity(line, symbol):
+                        self.queue.clear()
+                        return False
+                continue
+            index = self.queue.pop()
+            for line in self.cell_lines[index]:
+                changed_lines.add(line)
+                if not self.check_line(line):
+                    self.queue.clear()
+                    return False
+            if self.cells[index] and not self.check_runs(index):
+                self.queue.clear()
+                return False
+        return True
+
+    def search(self) -> bool:
+        # Iterative so large boards do not hit the recursion limit. A frame
+        # is a branching cell, its symbols left to try and the trail mark
+        # that undoes the last one.
+        stack = []
+        is_consistent = self.propagate()
+        while True:
+            if is_consistent:
+                # Branch on the first empty cell, trying first the symbols its
+                # row and column miss the most
+                index = next(
+                    (index for index, domain in enumerate(self.domains) if self.POPCOUNT[domain] > 1), None
+                )
+                if index is None:
+                    return True
+                domain = self.domains[index]
+                symbols = sorted(
+                    [symbol for symbol in range(3) if domain >> symbol & 1],
+                    key=lambda symbol: -min(
+                        self.thirds[line] - self.counts[3 * line + symbol] for line in self.cell_lines[index]
+                    )
+                )
+                stack.append((index, symbols, len(self.trail)))
+            is_consistent = False
+            while not is_consistent:
+                if len(stack) == 0:
+                    return False
+                index, symbols, mark = stack[-1]
+                self.queue.clear()
+                self.undo(mark)
+                if len(symbols) == 0:
+                    stack.pop()
+                    continue
+                is_consistent = self.restrict(index, 1 << symbols.pop(0)) and self.propagate()
+
+    def solve(self) -> list[list[str]] | None:
+        for (row, col), val in self.fixed_cells.items():
+            if not self.restrict(row * self.n_cols + col, 1 << self.SYMBOLS.index(val)):
+                return None
+        # Lines without fixed cells still need their balance checked
+        for line in range(len(self.lines)):
+            if not self.check_line(line):
+                return None
+        if not self.search():
+            return None
+        return [
+            [self.SYMBOLS[self.cells[row * self.n_cols + col] - 1] for col in range(self.n_cols)]
+            for row in range(self.n_rows)
+        ]
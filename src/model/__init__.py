@@ -1,2 +1,9 @@
+from .constant import Constant
+from .cut_generator import CutGenerator
+from .propagator import Propagator
+from .sat_model import SatModel
+from .stats import Stats
+from .cp_sat_model import CpSatModel
+from .template_cache import ModelTemplate, TemplateCache
 from .base_model import BaseModel
 from .line_model import LineModel
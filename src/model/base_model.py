@@ -1,3 +1,6 @@
+import itertools
+import time
+
 from datetime import datetime
 from pathlib import Path
 
@@ -6,41 +9,315 @@ import mip
 from src.utils import (
     DataIO,
     DataModel,
-    Colors
+    Colors,
+    GridRenderer,
+    Profiler,
+    Solution,
+    SolutionCache
 )
 
+from .bulk_builder import BulkBuilder
+from .constant import Constant
+from .cp_sat_model import CpSatModel
+from .cut_generator import CutGenerator
+from .propagator import Propagator
+from .sat_model import SatModel
+from .stats import Stats
+from .template_cache import ModelTemplate, TemplateCache
+
 
 class BaseModel:
+    # Attributes holding the variables of the solution, make_solution() turns
+    # their values into a Solution
+    SOLUTION_VARS = ()
+    # 'mip' builds the model for the MIP solver, other engines are native
+    # solvers implemented by the puzzle in run_engine()
+    ENGINES = ('mip',)
+    # True when separate() cuts off solutions breaking rules left out of the
+    # model. 'lazy' cuts are added by CBC inside one run, 'loop' cuts between
+    # runs of the solver.
+    SEPARATES = False
+    CUTS = ('lazy', 'loop')
+    # Solver of the model, 'cbc' and 'highs' through mip, 'cp-sat' through
+    # OR-Tools, 'sat' compiled to CNF for CdclSolver
+    BACKENDS = ('cbc', 'highs', 'cp-sat', 'sat')
+    BACKEND = 'cbc'
+    # Data attribute holding the givens of an instance, e.g. 'fixed'. The
+    # model of the other data is then shared by all instances through a
+    # TemplateCache, get_given_values() gives the variables to fix.
+    GIVENS = None
+    # Pieces of the board drawn by render_board(), added to the ones of
+    # GridRenderer
+    STYLES = {}
 
-    def __init__(self, dataPath: Path) -> None:
+    def __init__(
+        self, dataPath: Path, cache: SolutionCache | None = None, presolve: bool = False,
+        engine: str = 'mip', cuts: str = 'loop', profiler: Profiler | None = None,
+        names: bool = True, templates: TemplateCache | None = None, warm_start: bool = False,
+        backend: str | None = None, threads: int | None = None, max_seconds: float | None = None
+    ) -> None:
         self.start_time = datetime.now()
+        # Seconds from now for the solver to find a solution, none if None.
+        # Building the model counts, native engines are not stopped.
+        self.max_seconds = max_seconds
+        self.deadline = time.perf_counter() + max_seconds if max_seconds is not None else None
+        if engine not in self.ENGINES:
+            raise ValueError(f"Engine {engine} is not supported by {type(self).__name__}, use one of {self.ENGINES}.")
+        if cuts not in self.CUTS:
+            raise ValueError(f"Cuts {cuts} is not supported, use one of {self.CUTS}.")
+        backend = backend or self.BACKEND
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend {backend} is not supported, use one of {self.BACKENDS}.")
+        self.engine = engine
+        self.backend = backend
+        # Search threads of the solver, None for its default (CP-SAT: one per
+        # core). Process pools run one each.
+        self.threads = threads
+        # Only CBC calls back for lazy cuts
+        self.cuts = cuts if backend == 'cbc' else 'loop'
+        # Variables made by add_variable_array() get no name if False, names
+        # are only read when debugging or by model.translate() in separate()
+        self.names = names
+        # Give the solver the values of get_warm_start() before its first run
+        self.warm_start = warm_start
+        self.cut_number = 0
+        # Result of check_unique()
+        self.unique_check = None
+        self.stats = Stats()
+        # Profiled phases are wrapped on the instance, nothing runs between
+        # the calls without a profiler
+        if profiler is not None:
+            for phase in profiler.PHASES:
+                setattr(self, phase, profiler.wrap(
+                    f'{type(self).__name__}_{Path(dataPath).stem}', phase, getattr(self, phase)
+                ))
+        phase_start = time.perf_counter()
         self.data = DataModel(**DataIO.read_json_data(dataPath))
+        phase_start = self.record_timing('parse', phase_start)
         self.verify_data()
-        # Init model
-        self._model = mip.Model(solver_name='CBC')
-        # Set MIPFocus = 1
-        self._model.solver.set_emphasis(mip.SearchEmphasis.FEASIBILITY)
-        self._model.verbose = 0
+        self.record_timing('verify_data', phase_start)
+        self.cache = cache
+        self.is_cached = False
+        self.presolve = presolve
+        self.propagator = None
+        if templates is not None and presolve:
+            raise ValueError("Templates can not be used with presolve, presolved models depend on the givens.")
+        # Puzzles without givens build their own model
+        self.templates = templates if self.GIVENS is not None else None
+        self.template = None
+        if self.cache is not None:
+            self.cache_key = self.cache.make_key(type(self).__name__, vars(self.data))
+        self._model = self.create_solver_model()
+        self.builder = BulkBuilder(self._model)
         return None
 
+    def create_solver_model(self) -> mip.Model | CpSatModel | SatModel:
+        if self.backend == 'cp-sat':
+            return CpSatModel(self.threads)
+        if self.backend == 'sat':
+            return SatModel()
+        model = mip.Model(solver_name={'cbc': mip.CBC, 'highs': mip.HIGHS}[self.backend])
+        if self.threads is not None:
+            model.threads = self.threads
+        if self.backend == 'cbc':
+            # Set MIPFocus = 1
+            model.solver.set_emphasis(mip.SearchEmphasis.FEASIBILITY)
+        model.verbose = 0
+        return model
+
     def verify_data(self) -> None:
         return None
 
+    def record_timing(self, phase: str, start: float) -> float:
+        # Adds the time since start to the phase, returns the current time to
+        # start the next phase
+        now = time.perf_counter()
+        self.stats.add_timing(phase, now - start)
+        return now
+
+    def update_model_size(self) -> None:
+        self.stats.vars = self._model.num_cols
+        self.stats.constrs = self._model.num_rows
+        self.stats.nonzeros = self._model.num_nz
+        return None
+
     def init_model(self) -> None:
+        if self.load_solution_from_cache():
+            return None
+        if self.engine != 'mip':
+            return None
+        phase_start = time.perf_counter()
+        if self.presolve:
+            self.propagator = self.create_propagator()
+            if self.propagator is not None:
+                self.propagator.propagate()
+            phase_start = self.record_timing('presolve', phase_start)
+        if self.templates is not None:
+            self.init_model_from_template()
+            return None
         self.add_variables()
+        phase_start = self.record_timing('add_variables', phase_start)
         self.add_constraints()
+        self.builder.flush()
         self.set_objective()
+        self.record_timing('add_constraints', phase_start)
+        return None
+
+    def get_template_params(self) -> dict:
+        # Everything but the givens that changes the model
+        return {
+            **{key: value for key, value in vars(self.data).items() if key != self.GIVENS},
+            'backend': self.backend
+        }
+
+    def get_given_values(self) -> list[tuple[mip.Var, int]]:
+        # (var, value) of every given
+        return []
+
+    def init_model_from_template(self) -> None:
+        key = self.templates.make_key(type(self).__name__, self.get_template_params())
+        template = self.templates.get(key)
+        if template is None:
+            phase_start = time.perf_counter()
+            # The template is the model of the grid without givens
+            givens = getattr(self.data, self.GIVENS)
+            setattr(self.data, self.GIVENS, [])
+            try:
+                self.add_variables()
+                phase_start = self.record_timing('add_variables', phase_start)
+                self.add_constraints()
+            finally:
+                setattr(self.data, self.GIVENS, givens)
+            self.builder.flush()
+            self.set_objective()
+            self.record_timing('add_constraints', phase_start)
+            template = ModelTemplate(
+                self._model, self.builder, {name: getattr(self, name) for name in self.SOLUTION_VARS}
+            )
+            self.templates.put(key, template)
+        else:
+            self._model = template.model
+            self.builder = template.builder
+            for name, variables in template.variables.items():
+                setattr(self, name, variables)
+            self.stats.count('template_hits')
+        phase_start = time.perf_counter()
+        template.fix(self.get_given_values())
+        self.template = template
+        self.record_timing('set_givens', phase_start)
         return None
 
     def add_variable(self, vtype: str, name: str = '') -> mip.Var:
+        self.builder.flush()
         return self._model.add_var(name=name, var_type=vtype)
 
+    def add_decision_variable(self, cell: tuple, value, name: str = '') -> mip.Var | Constant:
+        # Binary variable "cell contains value", replaced by a constant when
+        # presolve already decided it.
+        decided = self.get_decided_value(cell, value)
+        if decided is not None:
+            return Constant(decided)
+        return self.add_variable(vtype=mip.BINARY, name=name)
+
+    def get_decided_value(self, cell: tuple, value) -> int | None:
+        # 1 (0) when presolve placed (removed) value in cell, None otherwise
+        if self.propagator is None:
+            return None
+        domain = self.propagator.domains[cell]
+        if value not in domain:
+            return 0
+        if len(domain) == 1:
+            return 1
+        return None
+
+    def add_variable_array(self, shape: tuple, vtype: str = mip.BINARY, name: str = '', constant=None) -> list:
+        # Nested lists of variables of the given shape, named name_i_j...,
+        # pushed to the solver in one batch. constant(*index) gives the value
+        # of an entry known before solving, e.g. get_decided_value() of a
+        # decision variable, or None to make a variable.
+        indices = list(itertools.product(*[range(size) for size in shape]))
+        flat = [None] * len(indices)
+        positions = []
+        for position, index in enumerate(indices):
+            value = constant(*index) if constant is not None else None
+            if value is None:
+                positions.append(position)
+            else:
+                flat[position] = Constant(value)
+        names = None
+        # separate() finds the variables of the solver model by name
+        if self.names or self.separates():
+            names = ['_'.join([name, *map(str, indices[position])]) for position in positions]
+        for position, var in zip(positions, self.builder.add_columns(len(positions), vtype, names)):
+            flat[position] = var
+        for size in reversed(shape[1:]):
+            flat = [flat[start: start + size] for start in range(0, len(flat), size)]
+        return flat
+
     def add_variables(self) -> None:
         return None
 
-    def add_constraint(self, constraint: mip.LinExpr, name: str = '') -> mip.Constr:
+    def create_propagator(self) -> Propagator | None:
+        return None
+
+    def add_constraint(self, constraint: mip.LinExpr | bool, name: str = '') -> mip.Constr | None:
+        # Constraints over presolved constants only are checked here instead
+        # of being sent to the solver.
+        if isinstance(constraint, bool):
+            if not constraint:
+                self.raise_error_infeasible()
+            return None
+        if len(constraint.expr) == 0:
+            self.check_constant_constraint(constraint.const, constraint.sense)
+            return None
+        self.builder.flush()
         return self._model.add_constr(constraint, name=name)
 
+    def check_constant_constraint(self, const: float, sense: str) -> None:
+        # const <sense> 0 must hold
+        if (
+            (sense == '=' and abs(const) > 1e-6)
+            or (sense == '<' and const > 1e-6)
+            or (sense == '>' and const < -1e-6)
+        ):
+            self.raise_error_infeasible()
+        return None
+
+    def add_constraint_rows(self, rows: list[list], sense: str, rhs, coefficients: list[list] | None = None) -> None:
+        # A family of constraints in sparse row form, pushed to the solver in
+        # one batch: row i is sum(coefficients[i][j] * rows[i][j]) <sense>
+        # rhs[i]. Coefficients are all 1 if omitted, rhs may be one number
+        # shared by all rows. Presolved constants move to the right side.
+        all_columns, all_coefficients, all_rhs = [], [], []
+        # Constants only come from presolve
+        has_constants = self.propagator is not None
+        for index, row in enumerate(rows):
+            row_rhs = rhs[index] if isinstance(rhs, list) else rhs
+            row_coefficients = coefficients[index] if coefficients is not None else [1] * len(row)
+            if not has_constants:
+                columns, column_coefficients = [var.idx for var in row], row_coefficients
+            else:
+                columns, column_coefficients = [], []
+                for var, coefficient in zip(row, row_coefficients):
+                    if isinstance(var, Constant):
+                        row_rhs -= coefficient * var.x
+                    else:
+                        columns.append(var.idx)
+                        column_coefficients.append(coefficient)
+            if len(columns) == 0:
+                self.check_constant_constraint(-row_rhs, sense)
+                continue
+            if len(set(columns)) < len(columns):
+                merged = {}
+                for column, coefficient in zip(columns, column_coefficients):
+                    merged[column] = merged.get(column, 0.0) + coefficient
+                columns, column_coefficients = list(merged.keys()), list(merged.values())
+            all_columns.append(columns)
+            all_coefficients.append(column_coefficients)
+            all_rhs.append(row_rhs)
+        self.builder.add_rows(all_columns, all_coefficients, sense, all_rhs)
+        return None
+
     def add_constraints(self) -> None:
         return None
 
@@ -48,20 +325,240 @@ class BaseModel:
         self._model.objective = mip.minimize(mip.LinExpr())
         return None
 
+    def write_model(self, path: Path) -> None:
+        # DIMACS CNF with the sat backend, a CpModel proto with cp-sat, LP or
+        # MPS (by extension) with the mip solvers
+        self.builder.flush()
+        self._model.write(str(path))
+        return None
+
     def raise_error_infeasible(self) -> None:
+        if self.stats.status is None:
+            self.stats.status = 'INFEASIBLE'
         raise ValueError("Your puzzle is infeasible. Please check the data! Maybe you typed it wrong")
 
     def calculate_solving_time(self) -> None:
         self.solving_time = round((datetime.now() - self.start_time).total_seconds(), 2)
         return None
 
-    def solve(self) -> None:
-        self._model.optimize()
-        if self._model.status != mip.OptimizationStatus.OPTIMAL:
+    def get_solution_values(self) -> dict:
+        # Solver values are read once for all variables, presolved cells are
+        # constants
+        values = []
+
+        def to_values(variables):
+            if len(variables) and isinstance(variables[0], list):
+                return [to_values(row) for row in variables]
+            if len(values) == 0 and any(isinstance(var, mip.Var) for var in variables):
+                values.extend(self.builder.get_values())
+            return [round(values[var.idx]) if isinstance(var, mip.Var) else round(var.x) for var in variables]
+
+        return {name: to_values(getattr(self, name)) for name in self.SOLUTION_VARS}
+
+    def get_solution(self) -> Solution:
+        # Board of the last solve, it does not hold the solver model
+        return self.make_solution(self.get_solution_values())
+
+    def make_solution(self, values: dict) -> Solution:
+        # values of SOLUTION_VARS as nested lists of integers
+        raise NotImplementedError(f"{type(self).__name__} has no solution board.")
+
+    def set_solution_values(self, solution: dict) -> None:
+        def to_constants(values):
+            if isinstance(values, list):
+                return [to_constants(value) for value in values]
+            return Constant(values)
+
+        for name in self.SOLUTION_VARS:
+            setattr(self, name, to_constants(solution[name]))
+        return None
+
+    def load_solution_from_cache(self) -> bool:
+        if self.cache is None:
+            return False
+        solution = self.cache.get(self.cache_key)
+        if solution is None:
+            return False
+        self.set_solution_values(solution)
+        self.is_cached = True
+        return True
+
+    def save_solution_to_cache(self) -> None:
+        if self.cache is not None:
+            self.cache.put(self.cache_key, self.get_solution_values())
+        return None
+
+    def get_decision_vars(self) -> dict:
+        # Variable of "cell contains value" by (cell, value), for the cells
+        # of create_propagator()
+        return {}
+
+    def get_warm_start(self) -> list[tuple[mip.Var, float]]:
+        # Partial solution for the solver, by default the decision variables
+        # that propagation decides. Puzzles may build one by other means.
+        propagator = self.propagator
+        if propagator is None:
+            propagator = self.create_propagator()
+            if propagator is None:
+                return []
+            propagator.propagate()
+        values = []
+        for (cell, value), var in self.get_decision_vars().items():
+            if isinstance(var, Constant):
+                continue
+            domain = propagator.domains[cell]
+            if value not in domain:
+                values.append((var, 0))
+            elif len(domain) == 1:
+                values.append((var, 1))
+        return values
+
+    def set_warm_start(self) -> None:
+        # CBC finds no solution at all with a start and lazy constraints
+        if self.separates() and self.cuts == 'lazy':
+            return None
+        phase_start = time.perf_counter()
+        values = self.get_warm_start()
+        if len(values):
+            self.builder.set_start(values)
+            self.stats.count('warm_start_vars', len(values))
+        self.record_timing('warm_start', phase_start)
+        return None
+
+    def separates(self) -> bool:
+        # SEPARATES of the class, puzzles where it depends on their options
+        # override it
+        return self.SEPARATES
+
+    def separate(self, model: mip.Model, fractional: bool = False) -> list[mip.LinExpr]:
+        # Cuts violated by the current solution of model, which is the solver
+        # model seen in a callback or self._model. Variables must be read and
+        # used through model.translate().
+        return []
+
+    def optimize(self) -> None:
+        self.builder.flush()
+        if self.warm_start:
+            self.set_warm_start()
+        status = self.run_solver(mip.INF if self.deadline is None else self.deadline - time.perf_counter())
+        self.stats.status = status.name
+        if status == mip.OptimizationStatus.NO_SOLUTION_FOUND and self.deadline is not None:
+            self.stats.status = 'TIMEOUT'
+            raise TimeoutError(f"No solution within {self.max_seconds}s.")
+        if status != mip.OptimizationStatus.OPTIMAL:
             self.raise_error_infeasible()
+        return None
+
+    def run_solver(self, max_seconds: float = mip.INF) -> mip.OptimizationStatus:
+        # Runs the solver until separate() finds no cut, within max_seconds
+        # for all runs. Status of the last run.
+        deadline = time.perf_counter() + max_seconds
+        # Set on every run, a template model is shared with other instances
+        if self.separates() and self.cuts == 'lazy':
+            self._model.lazy_constrs_generator = CutGenerator(self)
+            self._model.cuts_generator = CutGenerator(self, fractional=True)
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return mip.OptimizationStatus.NO_SOLUTION_FOUND
+            status = self._model.optimize(max_seconds=remaining)
+            self.stats.count('solver_runs')
+            # A feasible solution of a feasibility model is optimal
+            if status not in [mip.OptimizationStatus.OPTIMAL, mip.OptimizationStatus.FEASIBLE]:
+                return status
+            # Loop mode, and a check that lazy cuts left nothing behind
+            cuts = self.separate(self._model) if self.separates() else []
+            if len(cuts) == 0:
+                return mip.OptimizationStatus.OPTIMAL
+            for cut in cuts:
+                self.add_constraint(cut)
+                self.cut_number += 1
+
+    def check_unique(self, max_seconds: float = 10.0) -> dict:
+        # After solve(), runs the solver again on the same model with a
+        # no-good cut that every other board must break: at least one
+        # solution variable changes its value. 'unique' when no board is
+        # left, 'multiple' with the second board as 'solution', 'timeout'
+        # after max_seconds. Cuts of SEPARATES puzzles found so far stay,
+        # the loop adds the ones the next board needs. Boards of the model
+        # stay the first one.
+        if self.unique_check is not None:
+            return self.unique_check
+        if self.engine != 'mip' or self.is_cached or self.template is not None:
+            raise ValueError("Uniqueness is checked on the model of a mip solve, without cache or templates.")
+        if self.stats.status is None:
+            raise ValueError("Solve the puzzle before checking that its solution is unique.")
+        phase_start = time.perf_counter()
+        values = self.get_solution_values()
+        ones, zeros = [], []
+
+        def split(variables, variable_values):
+            if len(variables) and isinstance(variables[0], list):
+                for row, row_values in zip(variables, variable_values):
+                    split(row, row_values)
+                return None
+            for var, value in zip(variables, variable_values):
+                # Presolved cells are the same in every board
+                if isinstance(var, mip.Var):
+                    (ones if value else zeros).append(var)
+            return None
+
+        for name in self.SOLUTION_VARS:
+            split(getattr(self, name), values[name])
+        self.unique_check = {'status': 'unique'}
+        if len(ones) + len(zeros):
+            self.add_constraint(mip.xsum(zeros) - mip.xsum(ones) >= 1 - len(ones))
+            status = self.run_solver(max_seconds)
+            if status == mip.OptimizationStatus.OPTIMAL:
+                self.unique_check = {'status': 'multiple', 'solution': self.get_solution()}
+            elif status != mip.OptimizationStatus.INFEASIBLE:
+                self.unique_check = {'status': 'timeout'}
+            self.set_solution_values(values)
+        self.record_timing('check_unique', phase_start)
+        return self.unique_check
+
+    def is_presolved(self) -> bool:
+        return self.propagator is not None and self._model.num_cols == 0
+
+    def run_engine(self) -> None:
+        raise NotImplementedError(f"Engine {self.engine} is not implemented.")
+
+    def solve(self) -> None:
+        if not self.is_cached:
+            phase_start = time.perf_counter()
+            if self.engine != 'mip':
+                self.run_engine()
+            elif not self.is_presolved():
+                self.optimize()
+            self.record_timing('optimize', phase_start)
+            # Native engines and presolve raise on infeasible puzzles
+            if self.stats.status is None:
+                self.stats.status = 'OPTIMAL'
+            self.save_solution_to_cache()
+            # The next instance of the template overwrites the variables
+            if self.template is not None:
+                self.set_solution_values(self.get_solution_values())
+        else:
+            self.stats.status = 'CACHED'
+        if self.cut_number:
+            self.stats.counters['cuts'] = self.cut_number
+        self.update_model_size()
         self.calculate_solving_time()
         return None
 
-    def visualize(self) -> None:
-        print(f'{Colors.BOLD}{Colors.GREEN}Done! Solving time: {self.solving_time}s{Colors.ENDC}')
+    def get_styles(self) -> dict:
+        return self.STYLES
+
+    def render_board(self, renderer: GridRenderer, solution: Solution) -> list[str]:
+        return []
+
+    def visualize(self, mode: str = 'ansi') -> None:
+        # Board in 'ansi' colors or 'plain' text, written at once, 'none'
+        # skips rendering
+        renderer = GridRenderer(self.get_styles(), mode)
+        if mode == 'none':
+            return None
+        cuts = f', cuts: {self.cut_number}' if self.cut_number else ''
+        lines = [renderer.paint(f'Done! Solving time: {self.solving_time}s{cuts}', Colors.BOLD + Colors.GREEN)]
+        renderer.write(lines + self.render_board(renderer, self.get_solution()))
         return None
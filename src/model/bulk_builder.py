@@ -0,0 +1,110 @@
+import mip
+
+
+class BulkBuilder:
+    # Pushes columns and rows to the solver of a mip.Model without building
+    # a mip.LinExpr and a mip.Constr for every row. With CBC they go straight
+    # to the C library, other solvers get them through the mip API.
+    # mip keeps its own list of the variables and constraints of the model,
+    # flush() brings it up to date and must run before adding anything with
+    # the mip API. That uses mip internals, only on the versions of
+    # RAW_VERSIONS and if they are still there, the mip API otherwise.
+    SENSES = {'<': b'L', '>': b'G', '=': b'E'}
+    RAW_VERSIONS = ('1.16',)
+    RAW_FUNCTIONS = ('Cbc_addCol', 'Cbc_addRow', 'Cbc_setMIPStartI', 'Cbc_getColSolution')
+
+    def __init__(self, model: mip.Model) -> None:
+        self.model = model
+        self.is_raw = self.can_use_raw(model)
+        self.is_dirty = False
+        # Variables added since the last flush()
+        self.columns = []
+        return None
+
+    @classmethod
+    def can_use_raw(cls, model: mip.Model) -> bool:
+        if not isinstance(model, mip.Model) or model.solver_name.upper() != mip.CBC:
+            return False
+        if not mip.__version__.startswith(cls.RAW_VERSIONS):
+            return False
+        from mip.cbc import cbclib
+
+        return hasattr(model.vars, '_VarList__vars') and all(hasattr(cbclib, name) for name in cls.RAW_FUNCTIONS)
+
+    def add_columns(self, number: int, vtype: str = mip.BINARY, names: list[str] | None = None) -> list[mip.Var]:
+        if not self.is_raw:
+            return [
+                self.model.add_var(name=names[index] if names else '', var_type=vtype)
+                for index in range(number)
+            ]
+        from mip.cbc import cbclib, ffi
+
+        solver = self.model.solver._model
+        start = self.model.solver.num_cols()
+        upper = 1.0 if vtype == mip.BINARY else mip.INF
+        is_integer = b'\x01' if vtype in [mip.BINARY, mip.INTEGER] else b'\x00'
+        for index in range(number):
+            name = names[index].encode('utf-8') if names else b''
+            cbclib.Cbc_addCol(solver, name, 0.0, upper, 0.0, is_integer, 0, ffi.NULL, ffi.NULL)
+        columns = [mip.Var(self.model, start + index) for index in range(number)]
+        self.columns += columns
+        self.is_dirty = True
+        return columns
+
+    def add_rows(self, columns: list[list[int]], coefficients: list[list[float]], sense: str, rhs: list[float]) -> None:
+        # Row i is sum(coefficients[i][j] * column columns[i][j]) <sense> rhs[i]
+        if not self.is_raw:
+            for row_columns, row_coefficients, row_rhs in zip(columns, coefficients, rhs):
+                self.model.add_constr(mip.LinExpr(
+                    [self.model.vars[column] for column in row_columns], row_coefficients, -row_rhs, sense
+                ))
+            return None
+        from mip.cbc import cbclib
+
+        solver = self.model.solver._model
+        cbc_sense = self.SENSES[sense]
+        for row_columns, row_coefficients, row_rhs in zip(columns, coefficients, rhs):
+            cbclib.Cbc_addRow(
+                solver, b'', len(row_columns), row_columns, row_coefficients, cbc_sense, float(row_rhs)
+            )
+        self.is_dirty = True
+        return None
+
+    def set_start(self, values: list[tuple[mip.Var, float]]) -> None:
+        # Partial MIP start by column index. mip's Model.start finds columns
+        # by name and sets every integer variable left out to 0.
+        if not self.is_raw:
+            self.model.start = values
+            return None
+        from mip.cbc import cbclib, ffi
+
+        self.flush()
+        cbclib.Cbc_setMIPStartI(
+            self.model.solver._model, len(values),
+            ffi.new('int[]', [var.idx for var, _ in values]),
+            ffi.new('double[]', [float(value) for _, value in values])
+        )
+        return None
+
+    def get_values(self) -> list[float]:
+        # Value of every column in the last solution, read at once instead
+        # of one var.x at a time
+        if not isinstance(self.model, mip.Model):
+            # CpSatModel and SatModel keep them in a list
+            return self.model.values
+        if not self.is_raw:
+            return [var.x for var in self.model.vars]
+        from mip.cbc import cbclib, ffi
+
+        return ffi.unpack(cbclib.Cbc_getColSolution(self.model.solver._model), self.model.solver.num_cols())
+
+    def flush(self) -> None:
+        if self.is_dirty:
+            # mip's update_vars() makes new Var objects for all columns, the
+            # ones held by the puzzle must stay the ones of model.vars (mixing
+            # two Var objects of a column in a set or dict recurses in __eq__)
+            self.model.vars._VarList__vars += self.columns
+            self.columns = []
+            self.model.constrs.update_constrs(self.model.solver.num_rows())
+            self.is_dirty = False
+        return None
@@ -0,0 +1,7 @@
+class Constant(int):
+    # A solved value that stands in for a mip.Var: it can be read with `.x`
+    # by visualize() and summed with mip.xsum like any other number.
+
+    @property
+    def x(self) -> int:
+        return int(self)
@@ -0,0 +1,155 @@
+import os
+
+import mip
+
+
+class CpSatModel:
+    # The part of mip.Model that BaseModel and the puzzles use, on top of
+    # OR-Tools CP-SAT. Variables are mip.Var objects of this model, so
+    # mip.xsum(), var.x and var.lb work as with CBC. CP-SAT has integer
+    # variables and coefficients only, continuous variables become integers
+    # up to MAX_VALUE (flows of a grid never get near it).
+    MAX_VALUE = 2 ** 30
+    STATUSES = {
+        'OPTIMAL': mip.OptimizationStatus.OPTIMAL,
+        'FEASIBLE': mip.OptimizationStatus.FEASIBLE,
+        'INFEASIBLE': mip.OptimizationStatus.INFEASIBLE,
+        'MODEL_INVALID': mip.OptimizationStatus.ERROR,
+        'UNKNOWN': mip.OptimizationStatus.NO_SOLUTION_FOUND
+    }
+
+    def __init__(self, workers: int | None = None) -> None:
+        try:
+            from ortools.sat.python import cp_model
+        except ImportError as error:
+            raise ImportError("The cp-sat backend needs OR-Tools: pip install ortools") from error
+        self.cp_model = cp_model
+        self.model = cp_model.CpModel()
+        self.workers = workers or os.cpu_count() or 1
+        self.solver_name = 'CP-SAT'
+        # mip.Var asks model.solver for its name, bounds and value
+        self.solver = self
+        self.vars = []
+        self.cp_vars = []
+        self.var_types = []
+        self.num_rows = 0
+        self.num_nz = 0
+        self.values = None
+        self.status = None
+        self.verbose = 0
+        # Never set, CP-SAT has no callbacks. SEPARATES puzzles add their cuts
+        # between runs.
+        self.lazy_constrs_generator = None
+        self.cuts_generator = None
+        return None
+
+    @property
+    def num_cols(self) -> int:
+        return len(self.vars)
+
+    def add_var(self, name: str = '', lb: float = 0.0, ub: float = mip.INF, var_type: str = mip.CONTINUOUS) -> mip.Var:
+        name = name or f'var({len(self.vars)})'
+        if var_type == mip.BINARY:
+            cp_var = self.model.new_bool_var(name)
+        else:
+            cp_var = self.model.new_int_var(int(lb), min(int(ub), self.MAX_VALUE) if ub != mip.INF else self.MAX_VALUE, name)
+        var = mip.Var(self, len(self.vars))
+        self.vars.append(var)
+        self.cp_vars.append(cp_var)
+        self.var_types.append(var_type)
+        return var
+
+    def to_integer(self, value: float) -> int:
+        if abs(value - round(value)) > 1e-9:
+            raise ValueError(f"CP-SAT needs integer coefficients, not {value}.")
+        return int(round(value))
+
+    def add_constr(self, lin_expr: mip.LinExpr, name: str = '') -> None:
+        # sum(expr) + const <sense> 0
+        variables = [self.cp_vars[var.idx] for var in lin_expr.expr]
+        expr = self.cp_model.LinearExpr.weighted_sum(
+            variables, [self.to_integer(coefficient) for coefficient in lin_expr.expr.values()]
+        )
+        rhs = -self.to_integer(lin_expr.const)
+        if lin_expr.sense == '<':
+            self.model.add(expr <= rhs)
+        elif lin_expr.sense == '>':
+            self.model.add(expr >= rhs)
+        else:
+            self.model.add(expr == rhs)
+        self.num_rows += 1
+        self.num_nz += len(variables)
+        return None
+
+    @property
+    def objective(self) -> None:
+        return None
+
+    @objective.setter
+    def objective(self, lin_expr: mip.LinExpr) -> None:
+        # Puzzles are feasibility models, an empty objective sets nothing
+        if len(lin_expr.expr):
+            self.model.minimize(self.cp_model.LinearExpr.weighted_sum(
+                [self.cp_vars[var.idx] for var in lin_expr.expr],
+                [self.to_integer(coefficient) for coefficient in lin_expr.expr.values()]
+            ))
+        return None
+
+    @property
+    def start(self) -> None:
+        return None
+
+    @start.setter
+    def start(self, values: list[tuple[mip.Var, float]]) -> None:
+        # Hints may be partial
+        self.model.clear_hints()
+        for var, value in values:
+            self.model.add_hint(self.cp_vars[var.idx], self.to_integer(value))
+        return None
+
+    def translate(self, ref):
+        # Cuts are only separated on this model, between runs
+        return ref
+
+    def optimize(self, max_seconds: float = mip.INF) -> mip.OptimizationStatus:
+        solver = self.cp_model.CpSolver()
+        solver.parameters.num_workers = self.workers
+        if max_seconds != mip.INF:
+            solver.parameters.max_time_in_seconds = max_seconds
+        solver.parameters.log_search_progress = bool(self.verbose)
+        status = self.STATUSES[solver.status_name(solver.solve(self.model))]
+        self.values = None
+        if status in [mip.OptimizationStatus.OPTIMAL, mip.OptimizationStatus.FEASIBLE]:
+            # A feasibility model is solved once a solution is found
+            status = mip.OptimizationStatus.OPTIMAL
+            self.values = [solver.value(cp_var) for cp_var in self.cp_vars]
+        self.status = status
+        return status
+
+    def write(self, path: str) -> None:
+        # Text proto if path ends with .txt, binary otherwise
+        self.model.export_to_file(path)
+        return None
+
+    def var_get_x(self, var: mip.Var) -> float | None:
+        return None if self.values is None else self.values[var.idx]
+
+    def var_get_name(self, idx: int) -> str:
+        return self.cp_vars[idx].name
+
+    def var_get_var_type(self, var: mip.Var) -> str:
+        return self.var_types[var.idx]
+
+    def var_get_lb(self, var: mip.Var) -> float:
+        return self.model.proto.variables[var.idx].domain[0]
+
+    def var_get_ub(self, var: mip.Var) -> float:
+        return self.model.proto.variables[var.idx].domain[1]
+
+    def var_set_lb(self, var: mip.Var, value: float) -> None:
+        self.model.proto.variables[var.idx].domain[0] = self.to_integer(value)
+        return None
+
+    def var_set_ub(self, var: mip.Var, value: float) -> None:
+        self.model.proto.variables[var.idx].domain[1] = self.to_integer(value)
+        return None
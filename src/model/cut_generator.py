@@ -0,0 +1,19 @@
+import mip
+
+
+class CutGenerator(mip.ConstrsGenerator):
+    # CBC calls it on every integer solution as lazy constraints generator,
+    # or on fractional LP solutions as cuts generator, and the puzzle cuts the
+    # solution off when it breaks a rule left out of the model. All cuts are
+    # added inside one branch and bound run.
+
+    def __init__(self, puzzle, fractional: bool = False) -> None:
+        self.puzzle = puzzle
+        self.fractional = fractional
+        return None
+
+    def generate_constrs(self, model: mip.Model, depth: int = 0, npass: int = 0) -> None:
+        for cut in self.puzzle.separate(model, self.fractional):
+            model += cut
+            self.puzzle.cut_number += 1
+        return None
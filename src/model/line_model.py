@@ -4,41 +4,27 @@ from pathlib import Path
 
 import mip
 
+from src.utils import Solution
+
 from .base_model import BaseModel
 
 
 class LineModel(BaseModel):
+    SOLUTION_VARS = ('h_vars', 'v_vars')
+    SEPARATES = True
 
-    def __init__(self, dataPath: Path) -> None:
-        super().__init__(dataPath)
+    def __init__(self, dataPath: Path, **kwargs) -> None:
+        super().__init__(dataPath, **kwargs)
         return None
 
     def add_variables(self) -> None:
         super().add_variables()
         # Horizontal line variables
-        self.h_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'h_{row}_{col}')
-                for col in range(self.data.shape[1])
-            ]
-            for row in range(self.data.shape[0] + 1)
-        ]
+        self.h_vars = self.add_variable_array((self.data.shape[0] + 1, self.data.shape[1]), name='h')
         # Vertical line variables
-        self.v_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'v_{row}_{col}')
-                for col in range(self.data.shape[1] + 1)
-            ]
-            for row in range(self.data.shape[0])
-        ]
+        self.v_vars = self.add_variable_array((self.data.shape[0], self.data.shape[1] + 1), name='v')
         # Point variables
-        self.p_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'p_{row}_{col}')
-                for col in range(self.data.shape[1] + 1)
-            ]
-            for row in range(self.data.shape[0] + 1)
-        ]
+        self.p_vars = self.add_variable_array((self.data.shape[0] + 1, self.data.shape[1] + 1), name='p')
         return None
 
     def add_constraints(self) -> None:
@@ -47,6 +33,7 @@ class LineModel(BaseModel):
         return None
 
     def add_lines_connected_into_disjoint_closed_cycles_constraint(self) -> None:
+        rows, coefficients = [], []
         for row, col in itertools.product(
             range(self.data.shape[0] + 1), range(self.data.shape[1] + 1)
         ):
@@ -60,84 +47,122 @@ class LineModel(BaseModel):
             if col < self.data.shape[1]:
                 lines_vars.append(self.h_vars[row][col])
             if len(lines_vars) > 0:
-                self.add_constraint(
-                    mip.xsum(lines_vars) == 2*self.p_vars[row][col]
-                )
+                rows.append(lines_vars + [self.p_vars[row][col]])
+                coefficients.append([1] * len(lines_vars) + [-2])
+        self.add_constraint_rows(rows, '=', 0, coefficients)
         return None
 
-    def find_next_line(self, line) -> tuple:
-        if line[0] == 'h':
-            pass
-        elif line[0] == 'v':
-            pass
-        else:
-            raise ValueError(f'Invalid direction {line[0]}')
-
-    def find_cycles(self) -> list[list]:
-        all_lines = [
-            (row, col, 'h') for row, col in itertools.product(
-                range(self.data.shape[0] + 1), range(self.data.shape[1])
-            ) if self.h_vars[row][col].x == 1
+    def make_solution(self, values: dict) -> Solution:
+        # The lines of the loops, cells have no value
+        return Solution(type(self).__name__, self.data.shape, edges=[
+            (point, other) for point, other, value in self.get_line_edges(values['h_vars'], values['v_vars'])
+            if value == 1
+        ])
+
+    def get_line_edges(self, h_vars: list[list], v_vars: list[list]) -> list[tuple]:
+        # Every line as (point, point, var)
+        return [
+            ((row, col), (row, col + 1), h_vars[row][col])
+            for row, col in itertools.product(range(self.data.shape[0] + 1), range(self.data.shape[1]))
         ] + [
-            (row, col, 'v') for row, col in itertools.product(
-                range(self.data.shape[0]), range(self.data.shape[1] + 1)
-            ) if self.v_vars[row][col].x == 1
+            ((row, col), (row + 1, col), v_vars[row][col])
+            for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1] + 1))
         ]
+
+    def find_cycles(self, h_vars: list[list] | None = None, v_vars: list[list] | None = None) -> list[list[tuple]]:
+        # Loops of the used lines as ordered lists of points, found by walking
+        # the two lines of every point once
+        h_vars = self.h_vars if h_vars is None else h_vars
+        v_vars = self.v_vars if v_vars is None else v_vars
+        neighbors = {}
+        for point_1, point_2, var in self.get_line_edges(h_vars, v_vars):
+            if var.x >= 0.5:
+                neighbors.setdefault(point_1, []).append(point_2)
+                neighbors.setdefault(point_2, []).append(point_1)
         cycles = []
-        while True:
-            if len(all_lines) == 0:
-                break
-            cycle = [all_lines.pop(0)]
-            while True:
-                for index, line in enumerate(all_lines):
-                    h_h_connection = (
-                        cycle[-1][-1] == 'h' == line[-1]
-                        and cycle[-1][0] == line[0]
-                        and cycle[-1][1] - line[1] in [-1, 1]
-                    )
-                    h_v_connection = (
-                        cycle[-1][-1] == 'h' != line[-1]
-                        and 0 <= cycle[-1][0] - line[0] <= 1
-                        and 0 <= line[1] - cycle[-1][1] <= 1
-                    )
-                    v_v_connection = (
-                        cycle[-1][-1] == 'v' == line[-1]
-                        and cycle[-1][0] - line[0] in [-1, 1]
-                        and cycle[-1][1] == line[1]
-                    )
-                    v_h_connection = (
-                        cycle[-1][-1] == 'v' != line[-1]
-                        and 0 <= line[0] - cycle[-1][0] <= 1
-                        and 0 <= cycle[-1][1] - line[1] <= 1
-                    )
-                    if (
-                        h_h_connection
-                        or h_v_connection
-                        or v_v_connection
-                        or v_h_connection
-                    ):
-                        cycle.append(all_lines.pop(index))
-                        break
-                else:
-                    cycles.append(cycle)
-                    break
+        visited = set()
+        for start in neighbors:
+            if start in visited:
+                continue
+            cycle = [start]
+            visited.add(start)
+            previous, point = start, neighbors[start][0]
+            while point != start:
+                cycle.append(point)
+                visited.add(point)
+                next_points = neighbors[point]
+                previous, point = point, next_points[1] if next_points[0] == previous else next_points[0]
+            cycles.append(cycle)
         return cycles
 
-    def solve(self) -> None:
-        self._model.optimize()
-        while True:
-            cycles = self.find_cycles()
-            if len(cycles) == 1:
-                self.calculate_solving_time()
-                break
-            if self._model.status != mip.OptimizationStatus.OPTIMAL:
-                self.raise_error_infeasible()
-            for cycle in cycles:
-                var_lines = [
-                    self.h_vars[line[0]][line[1]]
-                    if line[-1] == 'h' else self.v_vars[line[0]][line[1]]
-                    for line in cycle
-                ]
-                self.add_constraint(mip.xsum(var_lines) <= len(var_lines) - 1)
-            self._model.optimize()
-        return None
+    def get_cycle_vars(self, cycle: list[tuple], h_vars: list[list], v_vars: list[list]) -> list:
+        # Line variables between consecutive points of a loop
+        return [
+            h_vars[point[0]][min(point[1], next_point[1])] if point[0] == next_point[0]
+            else v_vars[min(point[0], next_point[0])][point[1]]
+            for point, next_point in zip(cycle, cycle[1:] + cycle[:1])
+        ]
+
+    def separate(self, model: mip.Model, fractional: bool = False) -> list[mip.LinExpr]:
+        h_vars, v_vars = model.translate(self.h_vars), model.translate(self.v_vars)
+        if fractional:
+            return self.separate_components(model, h_vars, v_vars)
+        # Subtour elimination: every loop of a solution with many loops must
+        # lose at least one line
+        cycles = self.find_cycles(h_vars, v_vars)
+        if len(cycles) <= 1:
+            return []
+        self.stats.count('subtours', len(cycles))
+        cuts = []
+        for cycle in cycles:
+            var_lines = self.get_cycle_vars(cycle, h_vars, v_vars)
+            cuts.append(mip.xsum(var_lines) <= len(var_lines) - 1)
+        return cuts
+
+    def separate_components(self, model: mip.Model, h_vars: list[list], v_vars: list[list]) -> list[mip.LinExpr]:
+        # Connectivity cuts on a fractional solution: when points i in a
+        # component S of the used lines and j outside S are both on the loop,
+        # at least two lines leave S, i.e. sum(lines leaving S) >= 2(p_i + p_j - 1)
+        p_vars = model.translate(self.p_vars)
+        edges = self.get_line_edges(h_vars, v_vars)
+        parents = {}
+
+        def find(point):
+            while parents.setdefault(point, point) != point:
+                parents[point] = parents[parents[point]]
+                point = parents[point]
+            return point
+
+        for point_1, point_2, var in edges:
+            if var.x > 1e-6:
+                parents[find(point_1)] = find(point_2)
+        components = {}
+        for row, col in itertools.product(range(self.data.shape[0] + 1), range(self.data.shape[1] + 1)):
+            if p_vars[row][col].x > 1e-6:
+                components.setdefault(find((row, col)), []).append((row, col))
+        if len(components) <= 1:
+            return []
+        component_of = {point: root for root, points in components.items() for point in points}
+        leaving_vars = {root: [] for root in components}
+        for point_1, point_2, var in edges:
+            root_1, root_2 = component_of.get(point_1), component_of.get(point_2)
+            if root_1 != root_2:
+                if root_1 is not None:
+                    leaving_vars[root_1].append(var)
+                if root_2 is not None:
+                    leaving_vars[root_2].append(var)
+        best_points = {
+            root: max(points, key=lambda point: p_vars[point[0]][point[1]].x)
+            for root, points in components.items()
+        }
+        cuts = []
+        for root in components:
+            i = best_points[root]
+            j = max(
+                [best_points[other] for other in components if other != root],
+                key=lambda point: p_vars[point[0]][point[1]].x
+            )
+            p_i, p_j = p_vars[i[0]][i[1]], p_vars[j[0]][j[1]]
+            if sum(var.x for var in leaving_vars[root]) < 2 * (p_i.x + p_j.x - 1) - 1e-5:
+                cuts.append(mip.xsum(leaving_vars[root]) >= 2 * (p_i + p_j - 1))
+        return cuts
@@ -0,0 +1,82 @@
+from collections import deque
+
+
+class Propagator:
+    # Domain propagation over cells. Every rule says that between `min_count`
+    # and `max_count` cells of a group contain a value, e.g. a Sudoku row has
+    # exactly one 5, or a Binox window has at most 2 Xs.
+
+    def __init__(self) -> None:
+        self.domains = {}
+        self.rules = []
+        self.cell_rules = {}
+        self.queue = deque()
+        self.queued = set()
+        return None
+
+    def add_cell(self, cell: tuple, values) -> None:
+        self.domains[cell] = set(values)
+        self.cell_rules[cell] = []
+        return None
+
+    def add_rule(self, cells: list[tuple], value, min_count: int, max_count: int) -> None:
+        self.rules.append((cells, value, min_count, max_count))
+        for cell in cells:
+            self.cell_rules[cell].append(len(self.rules) - 1)
+        self.enqueue_rule(len(self.rules) - 1)
+        return None
+
+    def enqueue_rule(self, rule: int) -> None:
+        if rule not in self.queued:
+            self.queued.add(rule)
+            self.queue.append(rule)
+        return None
+
+    def on_cell_changed(self, cell: tuple) -> None:
+        if len(self.domains[cell]) == 0:
+            raise ValueError(f"Cell {cell} can not contain any value.")
+        for rule in self.cell_rules[cell]:
+            self.enqueue_rule(rule)
+        return None
+
+    def fix(self, cell: tuple, value) -> None:
+        if value not in self.domains[cell]:
+            raise ValueError(f"Cell {cell} can not contain {value}.")
+        if len(self.domains[cell]) > 1:
+            self.domains[cell] = {value}
+            self.on_cell_changed(cell)
+        return None
+
+    def remove(self, cell: tuple, value) -> None:
+        if value in self.domains[cell]:
+            self.domains[cell].remove(value)
+            self.on_cell_changed(cell)
+        return None
+
+    def apply_rule(self, rule: int) -> None:
+        cells, value, min_count, max_count = self.rules[rule]
+        fixed_cells = [cell for cell in cells if self.domains[cell] == {value}]
+        candidate_cells = [cell for cell in cells if value in self.domains[cell]]
+        if len(fixed_cells) > max_count or len(candidate_cells) < min_count:
+            raise ValueError(f"Cells {cells} can not contain {value} from {min_count} to {max_count} times.")
+        if len(fixed_cells) == max_count:
+            for cell in candidate_cells:
+                if self.domains[cell] != {value}:
+                    self.remove(cell, value)
+        elif len(candidate_cells) == min_count:
+            for cell in candidate_cells:
+                self.fix(cell, value)
+        return None
+
+    def propagate(self) -> None:
+        while len(self.queue):
+            rule = self.queue.popleft()
+            self.queued.remove(rule)
+            self.apply_rule(rule)
+        return None
+
+    def is_fixed(self, cell: tuple) -> bool:
+        return len(self.domains[cell]) == 1
+
+    def is_solved(self) -> bool:
+        return all(len(domain) == 1 for domain in self.domains.values())
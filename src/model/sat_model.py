@@ -0,0 +1,301 @@
+from pathlib import Path
+
+import mip
+
+from src.engines import CdclSolver
+
+
+class SatModel:
+    # The part of mip.Model that BaseModel and the puzzles use, compiled to
+    # CNF and solved by CdclSolver. Every variable is boolean, a row with
+    # integer coefficients becomes clauses once its negative terms are
+    # written on negated literals (sum of weights * literals <= or = bound):
+    # at most or at least k literals with a sequential counter, exactly k or
+    # weighted sums with a totalizer, a row that forbids the other literals
+    # of a big one (Star Battle neighbours) with binary clauses. Variables
+    # keep their bounds, optimize() adds them as unit clauses, so templates
+    # can change them between runs. While they stay the same, the next run
+    # adds the new clauses (cuts) to the solver of the last one and keeps
+    # what it learnt.
+    # Small at-most-one rows are cheaper as pairs than as a counter
+    PAIRWISE_SIZE = 6
+
+    def __init__(self) -> None:
+        self.solver_name = 'SAT'
+        # mip.Var asks model.solver for its name, bounds and value
+        self.solver = self
+        self.vars = []
+        self.names = []
+        # DIMACS variable of each model variable, encodings add their own
+        self.sat_vars = []
+        self.bounds = []
+        self.var_number = 0
+        self.clauses = []
+        self.num_rows = 0
+        self.num_nz = 0
+        self.phases = {}
+        self.values = None
+        self.status = None
+        self.verbose = 0
+        self.stats = {}
+        # Solver of the last run, its bound clauses and number of clauses
+        self.cdcl = None
+        self.cdcl_bounds = None
+        self.cdcl_clauses = 0
+        # Never set, cuts of SEPARATES puzzles are added between runs
+        self.lazy_constrs_generator = None
+        self.cuts_generator = None
+        return None
+
+    @property
+    def num_cols(self) -> int:
+        return len(self.vars)
+
+    def new_sat_var(self) -> int:
+        self.var_number += 1
+        return self.var_number
+
+    def add_var(self, name: str = '', lb: float = 0.0, ub: float = 1.0, var_type: str = mip.BINARY) -> mip.Var:
+        if var_type != mip.BINARY:
+            kind = 'continuous' if var_type == mip.CONTINUOUS else 'integer'
+            raise ValueError(f"The sat backend only has binary variables, not {kind} ones.")
+        var = mip.Var(self, len(self.vars))
+        self.vars.append(var)
+        self.names.append(name or f'var({len(self.vars) - 1})')
+        self.sat_vars.append(self.new_sat_var())
+        self.bounds.append([self.to_integer(lb), min(self.to_integer(ub), 1) if ub != mip.INF else 1])
+        return var
+
+    def to_integer(self, value: float) -> int:
+        if abs(value - round(value)) > 1e-9:
+            raise ValueError(f"The sat backend needs integer coefficients, not {value}.")
+        return int(round(value))
+
+    def add_clause(self, literals: list[int]) -> None:
+        self.clauses.append(literals)
+        return None
+
+    def add_constr(self, lin_expr: mip.LinExpr, name: str = '') -> None:
+        # sum(expr) + const <sense> 0
+        rhs = -self.to_integer(lin_expr.const)
+        sign = -1 if lin_expr.sense == '>' else 1
+        literals, weights = [], []
+        for var, coefficient in lin_expr.expr.items():
+            weight = sign * self.to_integer(coefficient)
+            if weight > 0:
+                literals.append(self.sat_vars[var.idx])
+                weights.append(weight)
+            elif weight < 0:
+                # weight * x = -weight * (not x) + weight
+                literals.append(-self.sat_vars[var.idx])
+                weights.append(-weight)
+                rhs -= sign * weight
+        self.num_rows += 1
+        self.num_nz += len(lin_expr.expr)
+        if lin_expr.sense == '=':
+            self.add_exactly(literals, weights, rhs)
+        else:
+            self.add_at_most(literals, weights, sign * rhs)
+        return None
+
+    def add_at_most(self, literals: list[int], weights: list[int], bound: int) -> None:
+        if bound < 0:
+            self.add_clause([])
+            return None
+        # A literal heavier than the bound is false
+        for literal, weight in zip(literals, weights):
+            if weight > bound:
+                self.add_clause([-literal])
+        literals, weights = (
+            [literal for literal, weight in zip(literals, weights) if weight <= bound],
+            [weight for weight in weights if weight <= bound]
+        )
+        total = sum(weights)
+        if total <= bound:
+            return None
+        if len(literals) > 1 and total - max(weights) <= bound:
+            # The others alone fit, the row only binds when the heaviest
+            # literal is true, e.g. k * x + (k neighbours) <= k
+            heaviest = weights.index(max(weights))
+            if weights[heaviest] == bound:
+                for literal in literals[:heaviest] + literals[heaviest + 1:]:
+                    self.add_clause([-literals[heaviest], -literal])
+                return None
+        if any(weight > 1 for weight in weights):
+            outputs = self.add_totalizer(self.expand(literals, weights), bound + 1, downward=False)
+            self.add_clause([-outputs[bound]])
+        elif bound == 0:
+            for literal in literals:
+                self.add_clause([-literal])
+        elif bound == len(literals) - 1:
+            # Not all of them, at least one of the negations
+            self.add_clause([-literal for literal in literals])
+        elif bound == 1 and len(literals) <= self.PAIRWISE_SIZE:
+            for index, literal in enumerate(literals):
+                for other in literals[index + 1:]:
+                    self.add_clause([-literal, -other])
+        else:
+            self.add_sequential_counter(literals, bound)
+        return None
+
+    def add_exactly(self, literals: list[int], weights: list[int], bound: int) -> None:
+        total = sum(weights)
+        if bound < 0 or bound > total:
+            self.add_clause([])
+        elif bound == 0 or bound == total:
+            for literal in literals:
+                self.add_clause([literal if bound else -literal])
+        elif all(weight == 1 for weight in weights) and (bound == 1 or bound == total - 1):
+            # At least and at most one literal (one negation)
+            self.add_at_most(literals, weights, bound)
+            self.add_at_most([-literal for literal in literals], weights, total - bound)
+        else:
+            outputs = self.add_totalizer(self.expand(literals, weights), bound + 1)
+            self.add_clause([outputs[bound - 1]])
+            if len(outputs) > bound:
+                self.add_clause([-outputs[bound]])
+        return None
+
+    def expand(self, literals: list[int], weights: list[int]) -> list[int]:
+        # A literal of weight w counts as w copies
+        return [literal for literal, weight in zip(literals, weights) for _ in range(weight)]
+
+    def add_sequential_counter(self, literals: list[int], bound: int) -> None:
+        # Sinz's sequential counter of sum(literals) <= bound, 0 < bound <
+        # len(literals): counts[i][j] is true if at least j + 1 of
+        # literals[0..i] are true
+        counts = [[self.new_sat_var() for _ in range(bound)] for _ in range(len(literals) - 1)]
+        self.add_clause([-literals[0], counts[0][0]])
+        for j in range(1, bound):
+            self.add_clause([-counts[0][j]])
+        for i in range(1, len(literals) - 1):
+            self.add_clause([-literals[i], counts[i][0]])
+            self.add_clause([-counts[i - 1][0], counts[i][0]])
+            for j in range(1, bound):
+                self.add_clause([-literals[i], -counts[i - 1][j - 1], counts[i][j]])
+                self.add_clause([-counts[i - 1][j], counts[i][j]])
+            self.add_clause([-literals[i], -counts[i - 1][bound - 1]])
+        self.add_clause([-literals[-1], -counts[-1][bound - 1]])
+        return None
+
+    def add_totalizer(self, literals: list[int], size: int, downward: bool = True) -> list[int]:
+        # Bailleux and Boufkhad's totalizer on a tree of halves: outputs[j] is
+        # true if at least j + 1 literals are, counting up to size. Upward
+        # clauses set the outputs from the literals, downward ones (for
+        # exactly and at least) the literals from the outputs.
+        if len(literals) == 1:
+            return literals
+        half = len(literals) // 2
+        left = self.add_totalizer(literals[:half], size, downward)
+        right = self.add_totalizer(literals[half:], size, downward)
+        outputs = [self.new_sat_var() for _ in range(min(len(left) + len(right), size))]
+        for i in range(len(left) + 1):
+            for j in range(len(right) + 1):
+                if i + j > 0:
+                    self.add_clause(
+                        ([-left[i - 1]] if i else []) + ([-right[j - 1]] if j else [])
+                        + [outputs[min(i + j, len(outputs)) - 1]]
+                    )
+                if downward and i + j < len(outputs):
+                    self.add_clause(
+                        ([left[i]] if i < len(left) else []) + ([right[j]] if j < len(right) else [])
+                        + [-outputs[i + j]]
+                    )
+        return outputs
+
+    def bound_clauses(self) -> list[list[int]]:
+        clauses = []
+        for sat_var, (lb, ub) in zip(self.sat_vars, self.bounds):
+            if lb > ub:
+                clauses.append([])
+            elif lb == 1:
+                clauses.append([sat_var])
+            elif ub == 0:
+                clauses.append([-sat_var])
+        return clauses
+
+    @property
+    def objective(self) -> None:
+        return None
+
+    @objective.setter
+    def objective(self, lin_expr: mip.LinExpr) -> None:
+        if len(lin_expr.expr):
+            raise ValueError("The sat backend only solves feasibility models.")
+        return None
+
+    @property
+    def start(self) -> None:
+        return None
+
+    @start.setter
+    def start(self, values: list[tuple[mip.Var, float]]) -> None:
+        # First value tried by the solver for each variable
+        self.phases = {self.sat_vars[var.idx]: value > 0.5 for var, value in values}
+        return None
+
+    def translate(self, ref):
+        # Cuts are only separated on this model, between runs
+        return ref
+
+    def optimize(self, max_seconds: float = mip.INF) -> mip.OptimizationStatus:
+        bounds = self.bound_clauses()
+        if self.cdcl is None or bounds != self.cdcl_bounds:
+            self.cdcl = CdclSolver()
+            self.cdcl_bounds = bounds
+            self.cdcl_clauses = 0
+        solver = self.cdcl
+        # Encodings of new cuts may add variables
+        for _ in range(solver.var_number, self.var_number):
+            solver.new_var()
+        clauses = self.clauses[self.cdcl_clauses:]
+        if self.cdcl_clauses == 0:
+            clauses += bounds
+        for clause in clauses:
+            if not solver.add_clause(clause):
+                break
+        self.cdcl_clauses = len(self.clauses)
+        is_satisfied = solver.solve(self.phases, max_seconds=max_seconds if max_seconds != mip.INF else None)
+        self.stats = {'conflicts': solver.conflicts, 'decisions': solver.decisions}
+        self.values = None
+        self.status = mip.OptimizationStatus.INFEASIBLE
+        if is_satisfied:
+            self.values = [float(solver.value(sat_var)) for sat_var in self.sat_vars]
+            self.status = mip.OptimizationStatus.OPTIMAL
+        elif is_satisfied is None:
+            self.status = mip.OptimizationStatus.NO_SOLUTION_FOUND
+        return self.status
+
+    def write(self, path: str) -> None:
+        # DIMACS CNF, comments name the variables of the model
+        with open(Path(path), 'w') as f:
+            for name, sat_var in zip(self.names, self.sat_vars):
+                f.write(f'c {sat_var} {name}\n')
+            clauses = self.clauses + self.bound_clauses()
+            f.write(f'p cnf {self.var_number} {len(clauses)}\n')
+            for clause in clauses:
+                f.write(' '.join(str(literal) for literal in clause) + ' 0\n')
+        return None
+
+    def var_get_x(self, var: mip.Var) -> float | None:
+        return None if self.values is None else self.values[var.idx]
+
+    def var_get_name(self, idx: int) -> str:
+        return self.names[idx]
+
+    def var_get_var_type(self, var: mip.Var) -> str:
+        return mip.BINARY
+
+    def var_get_lb(self, var: mip.Var) -> float:
+        return self.bounds[var.idx][0]
+
+    def var_get_ub(self, var: mip.Var) -> float:
+        return self.bounds[var.idx][1]
+
+    def var_set_lb(self, var: mip.Var, value: float) -> None:
+        self.bounds[var.idx][0] = self.to_integer(value)
+        return None
+
+    def var_set_ub(self, var: mip.Var, value: float) -> None:
+        self.bounds[var.idx][1] = self.to_integer(value)
+        return None
@@ -0,0 +1,36 @@
+class Stats:
+    # What a model spent solving a puzzle: seconds of each phase from
+    # time.perf_counter(), size of the solver model, solver status and
+    # counters of puzzle specific work (cuts, solver runs, paths...).
+    # to_dict() gives a JSON serializable dict to aggregate many solves.
+
+    def __init__(self) -> None:
+        self.timings = {}
+        self.vars = 0
+        self.constrs = 0
+        self.nonzeros = 0
+        self.status = None
+        self.counters = {}
+        return None
+
+    def add_timing(self, phase: str, seconds: float) -> None:
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        return None
+
+    def count(self, name: str, number: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + number
+        return None
+
+    def get_total_time(self) -> float:
+        return sum(self.timings.values())
+
+    def to_dict(self) -> dict:
+        return {
+            'status': self.status,
+            'timings': {phase: round(seconds, 6) for phase, seconds in self.timings.items()},
+            'total_time': round(self.get_total_time(), 6),
+            'vars': self.vars,
+            'constrs': self.constrs,
+            'nonzeros': self.nonzeros,
+            'counters': dict(self.counters)
+        }
@@ -0,0 +1,66 @@
+import json
+
+from collections import OrderedDict
+
+import mip
+
+from .bulk_builder import BulkBuilder
+
+
+class ModelTemplate:
+    # Structural model of a puzzle shape, built without givens. Givens of an
+    # instance fix variable bounds, the bounds of the previous instance are
+    # reset first. Cuts added by earlier instances stay in the model, they
+    # only cut off grids that break the rules of the puzzle.
+
+    def __init__(self, model: mip.Model, builder: BulkBuilder, variables: dict) -> None:
+        self.model = model
+        self.builder = builder
+        # Variable attributes of the puzzle model by name, e.g. x_vars
+        self.variables = variables
+        # (var, lb, ub) of the variables fixed by the current instance
+        self.fixed = []
+        return None
+
+    def fix(self, givens: list[tuple[mip.Var, float]]) -> None:
+        for var, lb, ub in self.fixed:
+            var.lb, var.ub = lb, ub
+        self.fixed = [(var, var.lb, var.ub) for var, _ in givens]
+        for var, value in givens:
+            var.lb, var.ub = value, value
+        return None
+
+
+class TemplateCache:
+    # In memory templates by (puzzle, shape, parameters) for the lifetime of
+    # a process, the least recently used are dropped over max_size
+
+    def __init__(self, max_size: int = 16) -> None:
+        self.max_size = max_size
+        self.templates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        return None
+
+    @classmethod
+    def make_key(cls, puzzle_name: str, params: dict) -> str:
+        return json.dumps({'puzzle': puzzle_name, 'params': params}, sort_keys=True, separators=(',', ':'))
+
+    def get(self, key: str) -> ModelTemplate | None:
+        template = self.templates.get(key)
+        if template is None:
+            self.misses += 1
+            return None
+        self.templates.move_to_end(key)
+        self.hits += 1
+        return template
+
+    def put(self, key: str, template: ModelTemplate) -> None:
+        self.templates[key] = template
+        self.templates.move_to_end(key)
+        while len(self.templates) > self.max_size:
+            self.templates.popitem(last=False)
+        return None
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
@@ -1,7 +1,48 @@
-from .binox import Binox
-from .galaxies import Galaxies
-from .sudoku import Sudoku
-from .slitherlink import Slitherlink
-from .star_battle import StarBattle
-from .troix import Troix
-from .haunted_mirror_maze import HauntedMirrorMaze
+import importlib
+
+
+PUZZLE_NAME = {
+    'B': 'Binox',
+    'G': 'Galaxies',
+    'S': 'Sudoku',
+    'SB': 'StarBattle',
+    'T': 'Troix',
+    'SL': 'Slitherlink',
+    'HMM': 'HauntedMirrorMaze'
+}
+
+# Folder names used in ./data/<folder>/
+PUZZLE_FOLDER = {
+    'binox': 'Binox',
+    'galaxies': 'Galaxies',
+    'sudoku': 'Sudoku',
+    'star_battle': 'StarBattle',
+    'troix': 'Troix',
+    'slitherlink': 'Slitherlink',
+    'haunted_mirror_maze': 'HauntedMirrorMaze'
+}
+
+# Module of each puzzle class. A class is imported on first access
+# (src.puzzles.Sudoku), so solving a Sudoku does not load networkx
+# (Galaxies) or the modules of the other puzzles.
+PUZZLE_MODULE = {
+    'Binox': 'binox',
+    'Galaxies': 'galaxies',
+    'Sudoku': 'sudoku',
+    'StarBattle': 'star_battle',
+    'Troix': 'troix',
+    'Slitherlink': 'slitherlink',
+    'HauntedMirrorMaze': 'haunted_mirror_maze'
+}
+
+
+def __getattr__(name: str):
+    if name not in PUZZLE_MODULE:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    puzzle_class = getattr(importlib.import_module(f'.{PUZZLE_MODULE[name]}', __name__), name)
+    globals()[name] = puzzle_class
+    return puzzle_class
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(PUZZLE_MODULE))
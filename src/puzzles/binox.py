@@ -5,16 +5,48 @@ from pathlib import Path
 import mip
 
 
-from src.model import BaseModel
-from src.utils import Colors
+from src.engines import BinoxBitboard
+from src.model import BaseModel, Constant, Propagator
+from src.utils import Colors, GridRenderer, Solution
 
 
 class Binox(BaseModel):
+    SOLUTION_VARS = ('x_vars',)
+    ENGINES = ('mip', 'bitboard')
+    # Unique rows and columns: auxiliary equality variables for every pair of
+    # lines ('aux'), or cuts on duplicate lines of the solutions ('lazy')
+    UNIQUENESSES = ('aux', 'lazy')
+    GIVENS = 'fixed'
+    # Solves ./data/binox/puzzle_4.json in 0.02s against 7s with CBC
+    BACKEND = 'sat'
+    STYLES = {
+        'X': (' X ', Colors.BOLD + Colors.RED),
+        'O': (' O ', Colors.BOLD + Colors.BLUE),
+        'fixed_X': (' X ', Colors.BOLD + Colors.GRAY),
+        'fixed_O': (' O ', Colors.BOLD + Colors.GRAY)
+    }
 
-    def __init__(self, dataPath: Path) -> None:
-        super().__init__(dataPath)
+    def __init__(self, dataPath: Path, uniqueness: str = 'aux', **kwargs) -> None:
+        super().__init__(dataPath, **kwargs)
+        if uniqueness not in self.UNIQUENESSES:
+            raise ValueError(f"Uniqueness {uniqueness} is not supported, use one of {self.UNIQUENESSES}.")
+        self.uniqueness = uniqueness
+        # Grids with too many line patterns (over 26x26) would leave the
+        # bitboard branching on single cells for minutes, the model is
+        # solved instead
+        if self.engine == 'bitboard' and not BinoxBitboard.can_enumerate(self.data.shape, self.data.symbol_number):
+            self.engine = 'mip'
+            self.stats.count('engine_fallback')
+        # CBC keeps returning the duplicate solution when its no-good cut is
+        # added from the lazy constraints callback, so cuts are added between
+        # runs of the solver
+        if self.separates():
+            self.cuts = 'loop'
         return None
 
+    def separates(self) -> bool:
+        return self.uniqueness == 'lazy'
+
     def verify_data(self) -> None:
         if self.data.shape[0] % 2 == 1 or self.data.shape[1] % 2 == 1:
             raise ValueError(f"Shape must be even, not {self.data.shape}")
@@ -30,26 +62,72 @@ class Binox(BaseModel):
 
     def add_variables(self) -> None:
         super().add_variables()
-        self.x_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'x_{row}_{col}')
-                for col in range(self.data.shape[1])
-            ]
-            for row in range(self.data.shape[0])
+        self.x_vars = self.add_variable_array(
+            (self.data.shape[0], self.data.shape[1]), name='x',
+            constant=lambda row, col: self.get_decided_value((row, col), 'X')
+        )
+        if self.uniqueness == 'lazy':
+            return None
+        row_pairs = list(itertools.combinations(range(self.data.shape[0]), 2))
+        y_vars = self.add_variable_array(
+            (self.data.shape[1], len(row_pairs)), name='y',
+            constant=lambda col, pair: self.get_equal_value(
+                self.x_vars[row_pairs[pair][0]][col], self.x_vars[row_pairs[pair][1]][col]
+            )
+        )
+        self.y_vars = {
+            (row1, row2, col): y_vars[col][pair]
+            for col in range(self.data.shape[1]) for pair, (row1, row2) in enumerate(row_pairs)
+        }
+        col_pairs = list(itertools.combinations(range(self.data.shape[1]), 2))
+        z_vars = self.add_variable_array(
+            (self.data.shape[0], len(col_pairs)), name='z',
+            constant=lambda row, pair: self.get_equal_value(
+                self.x_vars[row][col_pairs[pair][0]], self.x_vars[row][col_pairs[pair][1]]
+            )
+        )
+        self.z_vars = {
+            (col1, col2, row): z_vars[row][pair]
+            for row in range(self.data.shape[0]) for pair, (col1, col2) in enumerate(col_pairs)
+        }
+        return None
+
+    def get_template_params(self) -> dict:
+        return {**super().get_template_params(), 'uniqueness': self.uniqueness}
+
+    def get_given_values(self) -> list[tuple[mip.Var, int]]:
+        return [(self.x_vars[cell['row']][cell['col']], int(cell['val'] == 'X')) for cell in self.data.fixed]
+
+    def get_decision_vars(self) -> dict:
+        return {
+            ((row, col), 'X'): self.x_vars[row][col]
+            for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1]))
+        }
+
+    def get_equal_value(self, x_var1, x_var2) -> int | None:
+        if isinstance(x_var1, Constant) and isinstance(x_var2, Constant):
+            return int(x_var1 == x_var2)
+        return None
+
+    def create_propagator(self) -> Propagator:
+        propagator = Propagator()
+        fixed_cells = {(cell['row'], cell['col']): cell['val'] for cell in self.data.fixed}
+        for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1])):
+            propagator.add_cell((row, col), [fixed_cells[(row, col)]] if (row, col) in fixed_cells else ['X', 'O'])
+        lines = [
+            [(row, col) for col in range(self.data.shape[1])] for row in range(self.data.shape[0])
+        ] + [
+            [(row, col) for row in range(self.data.shape[0])] for col in range(self.data.shape[1])
         ]
-        self.y_vars = {}
-        for col in range(self.data.shape[1]):
-            for row1, row2 in itertools.combinations(range(self.data.shape[0]), 2):
-                self.y_vars[(row1, row2, col)] = self.add_variable(
-                    vtype=mip.BINARY, name=f'y_{row1}_{row2}_{col}'
-                )
-        self.z_vars = {}
-        for row in range(self.data.shape[0]):
-            for col1, col2 in itertools.combinations(range(self.data.shape[1]), 2):
-                self.z_vars[(col1, col2, row)] = self.add_variable(
-                    vtype=mip.BINARY, name=f'y_{row1}_{col2}_{row}'
+        for cells, symbol in itertools.product(lines, ['X', 'O']):
+            # Balance rule
+            propagator.add_rule(cells, symbol, len(cells) // 2, len(cells) // 2)
+            # Run rule: at most symbol_number same symbols in any symbol_number + 1 consecutive cells
+            for start in range(len(cells) - self.data.symbol_number):
+                propagator.add_rule(
+                    cells[start: start + self.data.symbol_number + 1], symbol, 0, self.data.symbol_number
                 )
-        return None
+        return propagator
 
     def add_constraints(self) -> None:
         super().add_constraints()
@@ -58,125 +136,129 @@ class Binox(BaseModel):
         self.add_limit_consecutive_symbol_each_col_constraints()
         self.add_equal_symbols_each_row_constraints()
         self.add_equal_symbols_each_col_constraints()
-        self.add_unique_row_constraints()
-        self.add_unique_col_constraints()
+        if self.uniqueness == 'aux':
+            self.add_unique_row_constraints()
+            self.add_unique_col_constraints()
         return None
 
     def add_limit_consecutive_symbol_each_row_constraints(self) -> None:
-        for row in range(self.data.shape[0]):
-            for col in range(self.data.shape[1] - self.data.symbol_number):
-                self.add_constraint(mip.xsum(
-                    self.x_vars[row][col + gap] for gap in range(self.data.symbol_number + 1)
-                ) <= self.data.symbol_number)
-                self.add_constraint(
-                    mip.xsum(self.x_vars[row][col + gap] for gap in range(self.data.symbol_number + 1)) >= 1
-                )
+        windows = [
+            [self.x_vars[row][col + gap] for gap in range(self.data.symbol_number + 1)]
+            for row in range(self.data.shape[0])
+            for col in range(self.data.shape[1] - self.data.symbol_number)
+        ]
+        self.add_constraint_rows(windows, '<', self.data.symbol_number)
+        self.add_constraint_rows(windows, '>', 1)
         return None
 
     def add_limit_consecutive_symbol_each_col_constraints(self) -> None:
-        for col in range(self.data.shape[1]):
-            for row in range(self.data.shape[0] - self.data.symbol_number):
-                self.add_constraint(mip.xsum(
-                    self.x_vars[row + gap][col] for gap in range(self.data.symbol_number + 1)
-                ) <= self.data.symbol_number)
-                self.add_constraint(
-                    mip.xsum(self.x_vars[row + gap][col] for gap in range(self.data.symbol_number + 1)) >= 1
-                )
+        windows = [
+            [self.x_vars[row + gap][col] for gap in range(self.data.symbol_number + 1)]
+            for col in range(self.data.shape[1])
+            for row in range(self.data.shape[0] - self.data.symbol_number)
+        ]
+        self.add_constraint_rows(windows, '<', self.data.symbol_number)
+        self.add_constraint_rows(windows, '>', 1)
         return None
 
     def add_equal_symbols_each_row_constraints(self) -> None:
-        for row in range(self.data.shape[0]):
-            self.add_constraint(
-                mip.xsum(self.x_vars[row][col] for col in range(self.data.shape[1])) == self.data.shape[1] / 2
-            )
+        self.add_constraint_rows([
+            [self.x_vars[row][col] for col in range(self.data.shape[1])] for row in range(self.data.shape[0])
+        ], '=', self.data.shape[1] / 2)
         return None
 
     def add_equal_symbols_each_col_constraints(self) -> None:
-        for col in range(self.data.shape[1]):
-            self.add_constraint(
-                mip.xsum(self.x_vars[row][col] for row in range(self.data.shape[0])) == self.data.shape[0] / 2
-            )
+        self.add_constraint_rows([
+            [self.x_vars[row][col] for row in range(self.data.shape[0])] for col in range(self.data.shape[1])
+        ], '=', self.data.shape[0] / 2)
         return None
 
     def add_fixed_cell_constraints(self) -> None:
-        for cell in self.data.fixed:
-            if cell['val'] == 'X':
-                self.add_constraint(self.x_vars[cell['row']][cell['col']] == 1)
-            elif cell['val'] == 'O':
-                self.add_constraint(self.x_vars[cell['row']][cell['col']] == 0)
-            else:
-                raise ValueError(f"In valid value in cell {cell}")
+        givens = self.get_given_values()
+        self.add_constraint_rows([[var] for var, _ in givens], '=', [value for _, value in givens])
+        return None
+
+    def add_equal_linearization_constraints(self, triples: list[tuple]) -> None:
+        # equal_var = 1 iff x_var1 == x_var2, for every (equal_var, x_var1, x_var2)
+        rows = [list(triple) for triple in triples]
+        self.add_constraint_rows(rows, '>', 1)
+        self.add_constraint_rows(rows, '<', 1, [[1, 1, -1]] * len(rows))
+        self.add_constraint_rows(rows, '<', 1, [[1, -1, 1]] * len(rows))
+        self.add_constraint_rows(rows, '<', 1, [[-1, 1, 1]] * len(rows))
+        return None
 
     def add_unique_row_constraints(self) -> None:
-        for col in range(self.data.shape[1]):
-            for row1, row2 in itertools.combinations(range(self.data.shape[0]), 2):
-                self.add_constraint(
-                    self.y_vars[(row1, row2, col)] + self.x_vars[row1][col] + self.x_vars[row2][col] >= 1
-                )
-                self.add_constraint(
-                    self.y_vars[(row1, row2, col)] + self.x_vars[row1][col] <= 1 + self.x_vars[row2][col]
-                )
-                self.add_constraint(
-                    self.y_vars[(row1, row2, col)]  + self.x_vars[row2][col] <= 1 + self.x_vars[row1][col]
-                )
-                self.add_constraint(
-                    self.x_vars[row1][col] + self.x_vars[row2][col] <= 1 + self.y_vars[(row1, row2, col)]
-                )
-        for row1, row2 in itertools.combinations(range(self.data.shape[0]), 2):
-            self.add_constraint(
-                mip.xsum(self.y_vars[(row1, row2, col)] for col in range(self.data.shape[1])) <= self.data.shape[1] - 1
-            )
+        row_pairs = list(itertools.combinations(range(self.data.shape[0]), 2))
+        self.add_equal_linearization_constraints([
+            (self.y_vars[(row1, row2, col)], self.x_vars[row1][col], self.x_vars[row2][col])
+            for col in range(self.data.shape[1]) for row1, row2 in row_pairs
+        ])
+        self.add_constraint_rows([
+            [self.y_vars[(row1, row2, col)] for col in range(self.data.shape[1])] for row1, row2 in row_pairs
+        ], '<', self.data.shape[1] - 1)
         return None
 
     def add_unique_col_constraints(self) -> None:
-        for row in range(self.data.shape[0]):
-            for col1, col2 in itertools.combinations(range(self.data.shape[1]), 2):
-                self.add_constraint(
-                    self.z_vars[(col1, col2, row)] + self.x_vars[row][col1] + self.x_vars[row][col2] >= 1
-                )
-                self.add_constraint(
-                    self.z_vars[(col1, col2, row)] + self.x_vars[row][col1] <= 1 + self.x_vars[row][col2]
-                )
-                self.add_constraint(
-                    self.z_vars[(col1, col2, row)]  + self.x_vars[row][col2] <= 1 + self.x_vars[row][col1]
-                )
-                self.add_constraint(
-                    self.x_vars[row][col1] + self.x_vars[row][col2] <= 1 + self.z_vars[(col1, col2, row)]
-                )
-        for col1, col2 in itertools.combinations(range(self.data.shape[1]), 2):
-            self.add_constraint(
-                mip.xsum(self.z_vars[(col1, col2, row)] for row in range(self.data.shape[0])) <= self.data.shape[0] - 1
-            )
+        col_pairs = list(itertools.combinations(range(self.data.shape[1]), 2))
+        self.add_equal_linearization_constraints([
+            (self.z_vars[(col1, col2, row)], self.x_vars[row][col1], self.x_vars[row][col2])
+            for row in range(self.data.shape[0]) for col1, col2 in col_pairs
+        ])
+        self.add_constraint_rows([
+            [self.z_vars[(col1, col2, row)] for row in range(self.data.shape[0])] for col1, col2 in col_pairs
+        ], '<', self.data.shape[0] - 1)
         return None
 
-    def visualize(self) -> None:
-        super().visualize()
-        fixed_cells = [(cell['row'], cell['col']) for cell in self.data.fixed]
-        for row in range(self.data.shape[0]):
-            render_up_row = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-            render_row = f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-            for col in range(self.data.shape[1]):
-                if (row, col) in fixed_cells:
-                    if self.x_vars[row][col].x == 1:
-                        render_row += f' {Colors.BOLD}{Colors.GRAY}X{Colors.ENDC} '
-                    else:
-                        render_row += f' {Colors.BOLD}{Colors.GRAY}O{Colors.ENDC} '
-                else:
-                    if self.x_vars[row][col].x == 1:
-                        render_row += f' {Colors.BOLD}{Colors.RED}X{Colors.ENDC} '
-                    else:
-                        render_row += f' {Colors.BOLD}{Colors.BLUE}O{Colors.ENDC} '
-                if col == self.data.shape[1] - 1:
-                    render_row += f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-                    node = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-                else:
-                    render_row += f'{Colors.GRAY}|{Colors.ENDC}'
-                    node = f'{Colors.GRAY}+{Colors.ENDC}'
-                if row == 0:
-                    render_up_row += f'{Colors.BOLD}{Colors.PURPLE}---+{Colors.ENDC}'
+    def separate(self, model: mip.Model, fractional: bool = False) -> list[mip.LinExpr]:
+        # No-good cuts on duplicate lines: lines i and j are not both the
+        # pattern they share in the solution
+        if fractional:
+            return []
+        x_vars = model.translate(self.x_vars)
+        lines = [
+            [x_vars[row][col] for col in range(self.data.shape[1])] for row in range(self.data.shape[0])
+        ]
+        cols = [
+            [x_vars[row][col] for row in range(self.data.shape[0])] for col in range(self.data.shape[1])
+        ]
+        cuts = []
+        for line_vars in [lines, cols]:
+            patterns = {}
+            for index, variables in enumerate(line_vars):
+                pattern = tuple(round(var.x) for var in variables)
+                if pattern in patterns:
+                    cuts.append(
+                        mip.xsum(
+                            var if value == 1 else 1 - var
+                            for variables in [line_vars[patterns[pattern]], variables]
+                            for var, value in zip(variables, pattern)
+                        ) <= 2 * len(pattern) - 1
+                    )
                 else:
-                    render_up_row += f'{Colors.GRAY}---{Colors.ENDC}{node}'
-            print(render_up_row)
-            print(render_row)
-        print(f'{Colors.BOLD}{Colors.PURPLE}{"---".join(["+"] * (self.data.shape[1] + 1))}{Colors.ENDC}')
+                    patterns[pattern] = index
+        return cuts
+
+    def run_engine(self) -> None:
+        fixed_cells = {(cell['row'], cell['col']): cell['val'] for cell in self.data.fixed}
+        x_values = BinoxBitboard(self.data.shape, self.data.symbol_number, fixed_cells).solve()
+        if x_values is None:
+            self.raise_error_infeasible()
+        self.set_solution_values({'x_vars': x_values})
         return None
+
+    def make_solution(self, values: dict) -> Solution:
+        return Solution(
+            type(self).__name__, self.data.shape, [value for row in values['x_vars'] for value in row], ('O', 'X')
+        )
+
+    def render_board(self, renderer: GridRenderer, solution: Solution) -> list[str]:
+        fixed_cells = {(cell['row'], cell['col']) for cell in self.data.fixed}
+        cells = [
+            [
+                f"{'fixed_' if (row, col) in fixed_cells else ''}{solution.symbols[value]}"
+                for col, value in enumerate(values)
+            ]
+            for row, values in enumerate(solution.get_rows())
+        ]
+        h_borders, v_borders = renderer.get_region_borders([[0] * self.data.shape[1]] * self.data.shape[0])
+        return renderer.render(cells, h_borders, v_borders)
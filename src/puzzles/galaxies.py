@@ -7,13 +7,30 @@ import networkx as nx
 
 
 from src.model import BaseModel
-from src.utils import Colors
+from src.utils import Colors, GridRenderer, Solution
 
 
 class Galaxies(BaseModel):
+    SOLUTION_VARS = ('x_vars',)
+    # Galaxy shape connectivity: one variable per simple path from a cell to
+    # the center ('paths'), or a flow sent from the center to every cell of
+    # the galaxy ('flow'), polynomial in the number of candidate cells
+    CONNECTIVITIES = ('paths', 'flow')
+    # Galaxy borders only
+    STYLES = {
+        'h_edge': ('   ', ''),
+        'v_edge': (' ', ''),
+        'center': (' 𖤓 ', Colors.GREEN),
+        'v_center': ('𖤓', Colors.GREEN),
+        'h_center': (' 𖤓 ', Colors.GREEN),
+        'node_center': ('𖤓', Colors.GREEN)
+    }
 
-    def __init__(self, dataPath: Path) -> None:
-        super().__init__(dataPath)
+    def __init__(self, dataPath: Path, connectivity: str = 'paths', **kwargs) -> None:
+        super().__init__(dataPath, **kwargs)
+        if connectivity not in self.CONNECTIVITIES:
+            raise ValueError(f"Connectivity {connectivity} is not supported, use one of {self.CONNECTIVITIES}.")
+        self.connectivity = connectivity
         self.galaxy_number = len(self.data.galaxies)
         return None
 
@@ -100,13 +117,9 @@ class Galaxies(BaseModel):
 
     def add_variables(self) -> None:
         super().add_variables()
-        self.x_vars = [[
-            [
-                self.add_variable(
-                    vtype=mip.BINARY, name=f'x_{row}_{col}_{galaxy}'
-                ) for galaxy in range(self.galaxy_number)
-            ] for col in range(self.data.shape[1])
-        ] for row in range(self.data.shape[0])]
+        self.x_vars = self.add_variable_array(
+            (self.data.shape[0], self.data.shape[1], self.galaxy_number), name='x'
+        )
         return None
 
     def add_constraints(self) -> None:
@@ -115,54 +128,55 @@ class Galaxies(BaseModel):
         self.add_each_galaxy_contains_center_cells_contraints()
         self.add_galaxies_candidate_cells_constraints()
         self.add_symetrical_constraints()
-        self.add_galaxy_shape_conected_constraints()
+        if self.connectivity == 'flow':
+            self.add_galaxy_shape_flow_constraints()
+        else:
+            self.add_galaxy_shape_conected_constraints()
         return None
 
     def add_each_cell_only_contained_in_one_galaxy_contraints(self) -> None:
-        for row, col in itertools.product(
-            range(self.data.shape[0]), range(self.data.shape[1])
-        ):
-            self.add_constraint(
-                mip.xsum(self.x_vars[row][col][galaxy] for galaxy in range(self.galaxy_number)) == 1
-            )
+        self.add_constraint_rows([
+            [self.x_vars[row][col][galaxy] for galaxy in range(self.galaxy_number)]
+            for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1]))
+        ], '=', 1)
         return None
 
     def add_each_galaxy_contains_center_cells_contraints(self) -> None:
-        for index, center_cells in enumerate(self.data.galaxies):
-            for cell in center_cells:
-                for galaxy in range(self.galaxy_number):
-                    if galaxy == index:
-                        self.add_constraint(
-                            self.x_vars[cell['row']][cell['col']][galaxy] == 1
-                        )
-                    else:
-                        self.add_constraint(
-                            self.x_vars[cell['row']][cell['col']][galaxy] == 0
-                        )
+        center_rows = [
+            (galaxy == index, [self.x_vars[cell['row']][cell['col']][galaxy]])
+            for index, center_cells in enumerate(self.data.galaxies)
+            for cell in center_cells
+            for galaxy in range(self.galaxy_number)
+        ]
+        self.add_constraint_rows([row for is_center, row in center_rows if is_center], '=', 1)
+        self.add_constraint_rows([row for is_center, row in center_rows if not is_center], '=', 0)
         return None
 
     def add_galaxies_candidate_cells_constraints(self) -> None:
+        rows = []
         for galaxy, candidate_cells in enumerate(self.galaxies_candidate_cells):
+            galaxy_cells = set(candidate_cells) | {
+                (cell['row'], cell['col']) for cell in self.data.galaxies[galaxy]
+            }
             for row, col in itertools.product(
                 range(self.data.shape[0]), range(self.data.shape[1])
             ):
-                if (row, col) not in candidate_cells + [
-                    (cell['row'], cell['col']) for cell in self.data.galaxies[galaxy]
-                ]:
-                    self.add_constraint(
-                        self.x_vars[row][col][galaxy] == 0
-                    )
+                if (row, col) not in galaxy_cells:
+                    rows.append([self.x_vars[row][col][galaxy]])
+        self.add_constraint_rows(rows, '=', 0)
         return None
 
     def add_symetrical_constraints(self) -> None:
+        rows = []
         for galaxy, cells in enumerate(self.galaxies_candidate_cells):
             for cell in cells:
                 if cell[0] <= self.data.galaxies[galaxy][0]['row']:
                     symetrical_cell = self.get_symetrical_cells(self.centers[galaxy], cell)
-                    self.add_constraint(
-                        self.x_vars[cell[0]][cell[1]][galaxy]
-                        == self.x_vars[symetrical_cell[0]][symetrical_cell[1]][galaxy]
-                    )
+                    rows.append([
+                        self.x_vars[cell[0]][cell[1]][galaxy],
+                        self.x_vars[symetrical_cell[0]][symetrical_cell[1]][galaxy]
+                    ])
+        self.add_constraint_rows(rows, '=', 0, [[1, -1]] * len(rows))
         return None
 
     def create_candidate_cells_graph(self, candidate_cells: list[tuple], center_cells: list[dict]) -> nx.Graph:
@@ -187,6 +201,9 @@ class Galaxies(BaseModel):
         return graph
 
     def add_galaxy_shape_conected_constraints(self) -> None:
+        # A cell is in a galaxy only if all cells of one of its paths to the
+        # center are, path_var says so for each path
+        cell_paths = []
         for galaxy in range(self.galaxy_number):
             if len(self.galaxies_candidate_cells[galaxy]) == 0:
                 continue
@@ -196,95 +213,94 @@ class Galaxies(BaseModel):
             for cell in self.galaxies_candidate_cells[galaxy]:
                 if cell[0] <= self.data.galaxies[galaxy][0]['row']:
                     paths = self.get_cell_to_center_paths(graph, cell)
-                    if len(paths) == 0:
-                        self.add_constraint(
-                            self.x_vars[cell[0]][cell[1]][galaxy] == 0
-                        )
-                        continue
-                    temp_vars = [
-                        self.add_variable(vtype=mip.BINARY) for _ in paths
-                    ]
-                    for index, path in enumerate(paths):
-                        cells = path[1: len(path) - 1]
-                        self.add_constraint(
-                            mip.xsum(
-                                self.x_vars[cell_in_path[0]][cell_in_path[1]][galaxy]
-                                for cell_in_path in cells
-                            ) >= len(cells) * temp_vars[index]
-                        )
-                        self.add_constraint(
-                            mip.xsum(
-                                self.x_vars[cell_in_path[0]][cell_in_path[1]][galaxy]
-                                for cell_in_path in cells
-                            ) + 1 <= temp_vars[index] + len(cells)
-                        )
-                    self.add_constraint(
-                        self.x_vars[cell[0]][cell[1]][galaxy] <= mip.xsum(temp_vars)
-                    )
+                    self.stats.count('paths', len(paths))
+                    cell_paths.append((galaxy, cell, paths))
+        path_vars = self.add_variable_array((sum(len(paths) for _, _, paths in cell_paths),), name='t')
+        unreachable_rows, path_rows, path_sizes, cell_rows = [], [], [], []
+        start = 0
+        for galaxy, cell, paths in cell_paths:
+            cell_var = self.x_vars[cell[0]][cell[1]][galaxy]
+            if len(paths) == 0:
+                unreachable_rows.append([cell_var])
+                continue
+            cell_path_vars = path_vars[start: start + len(paths)]
+            start += len(paths)
+            for path_var, path in zip(cell_path_vars, paths):
+                path_rows.append([self.x_vars[row][col][galaxy] for row, col in path[1: len(path) - 1]] + [path_var])
+                path_sizes.append(len(path) - 2)
+            cell_rows.append([cell_var] + cell_path_vars)
+        self.add_constraint_rows(unreachable_rows, '=', 0)
+        # len(cells) * path_var <= sum(cells) <= path_var + len(cells) - 1
+        self.add_constraint_rows(path_rows, '>', 0, [[1] * size + [-size] for size in path_sizes])
+        self.add_constraint_rows(
+            path_rows, '<', [size - 1 for size in path_sizes], [[1] * size + [-1] for size in path_sizes]
+        )
+        # A cell needs one of its paths
+        self.add_constraint_rows(cell_rows, '<', 0, [[1] + [-1] * (len(row) - 1) for row in cell_rows])
         return None
 
-    def visualize(self) -> None:
-        super().visualize()
-        galaxies_shapes = [[None] * self.data.shape[1] for _ in range(self.data.shape[0])]
-        for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1])):
-            galaxies_shapes[row][col] = sum([
-                galaxy*self.x_vars[row][col][galaxy].x
-                for galaxy in range(self.galaxy_number)
-            ])
-        center_positions = {}
+    def add_galaxy_shape_flow_constraints(self) -> None:
+        # The center sends one unit of flow to every cell of the galaxy, flow
+        # only goes through cells of the galaxy, so they are connected.
+        unreachable_rows, capacity_rows, capacity_coefficients = [], [], []
+        conservation_rows, conservation_coefficients = [], []
+        for galaxy in range(self.galaxy_number):
+            if len(self.galaxies_candidate_cells[galaxy]) == 0:
+                continue
+            graph = self.create_candidate_cells_graph(
+                self.galaxies_candidate_cells[galaxy], self.data.galaxies[galaxy]
+            )
+            reachable_cells = nx.node_connected_component(graph, 'center')
+            candidate_cells = []
+            for cell in self.galaxies_candidate_cells[galaxy]:
+                if cell in reachable_cells:
+                    candidate_cells.append(cell)
+                else:
+                    unreachable_rows.append([self.x_vars[cell[0]][cell[1]][galaxy]])
+            graph = graph.subgraph(reachable_cells)
+            arcs = [
+                (cell_1, cell_2) for edge in graph.edges()
+                for cell_1, cell_2 in [edge, edge[::-1]] if cell_2 != 'center'
+            ]
+            flow_vars = dict(zip(arcs, self.add_variable_array((len(arcs),), vtype=mip.CONTINUOUS, name=f'f_{galaxy}')))
+            self.stats.count('flow_arcs', len(arcs))
+            # flow <= len(candidate_cells) * x at both ends of an arc
+            for cell_1, cell_2 in arcs:
+                for cell in [cell_1, cell_2]:
+                    if cell != 'center':
+                        capacity_rows.append([flow_vars[(cell_1, cell_2)], self.x_vars[cell[0]][cell[1]][galaxy]])
+                        capacity_coefficients.append([1, -len(candidate_cells)])
+            # Inflow - outflow == x
+            for cell in candidate_cells:
+                incoming = [flow_vars[(neighbor, cell)] for neighbor in graph[cell]]
+                outgoing = [flow_vars[(cell, neighbor)] for neighbor in graph[cell] if neighbor != 'center']
+                conservation_rows.append(incoming + outgoing + [self.x_vars[cell[0]][cell[1]][galaxy]])
+                conservation_coefficients.append([1] * len(incoming) + [-1] * len(outgoing) + [-1])
+        self.add_constraint_rows(unreachable_rows, '=', 0)
+        self.add_constraint_rows(capacity_rows, '<', 0, capacity_coefficients)
+        self.add_constraint_rows(conservation_rows, '=', 0, conservation_coefficients)
+        return None
+
+    def make_solution(self, values: dict) -> Solution:
+        # Galaxy of every cell
+        return Solution(type(self).__name__, self.data.shape, [
+            cell.index(1) for row in values['x_vars'] for cell in row
+        ])
+
+    def render_board(self, renderer: GridRenderer, solution: Solution) -> list[str]:
+        # A center is drawn in its cell, on the edge or on the node between
+        # its cells
+        cells = [['empty'] * self.data.shape[1] for _ in range(self.data.shape[0])]
+        marks = {}
         for galaxy in self.data.galaxies:
             if len(galaxy) == 1:
-                center_positions[galaxy[0]['row'], galaxy[0]['col']] = 'C'
+                cells[galaxy[0]['row']][galaxy[0]['col']] = 'center'
             elif len(galaxy) == 2:
                 if galaxy[0]['row'] == galaxy[1]['row']:
-                    center_positions[galaxy[0]['row'], galaxy[0]['col']] = 'R'
+                    marks[('v_edge', galaxy[0]['row'], galaxy[0]['col'] + 1)] = 'v_center'
                 else:
-                    center_positions[galaxy[1]['row'], galaxy[1]['col']] = 'U'
+                    marks[('h_edge', galaxy[1]['row'], galaxy[1]['col'])] = 'h_center'
             elif len(galaxy) == 4:
-                center_positions[galaxy[2]['row'], galaxy[2]['col']] = 'RU'
-
-        def is_center_position(cell, postion):
-            return (
-                cell in center_positions.keys()
-                and center_positions[(row, col)] == postion
-            )
-
-        for row in range(self.data.shape[0]):
-            render_up_row = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-            render_row = f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-            for col in range(self.data.shape[1]):
-                if is_center_position((row, col), 'C'):
-                    render_row += f'{Colors.GREEN} 𖤓 {Colors.ENDC}'
-                else:
-                    render_row += f'   '
-                if (
-                    col == self.data.shape[1] - 1
-                    or galaxies_shapes[row][col] != galaxies_shapes[row][col + 1]
-                ):
-                    render_row += f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-                    cross_node = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-                else:
-                    if is_center_position((row, col), 'R'):
-                        render_row += f'{Colors.GREEN}𖤓{Colors.ENDC}'
-                    else:
-                        render_row += f' '
-                    if is_center_position((row, col), 'RU'):
-                        cross_node = f'{Colors.GREEN}𖤓{Colors.ENDC}'
-                    else:
-                        cross_node = f'{Colors.GRAY}+{Colors.ENDC}'
-                if row == 0 or galaxies_shapes[row][col] != galaxies_shapes[row - 1][col]:
-                    normal_cross_node = f'{Colors.GRAY}+{Colors.ENDC}'
-                    if render_up_row.endswith(normal_cross_node):
-                        render_up_row = render_up_row[:len(render_up_row) - len(normal_cross_node)]
-                        render_up_row += f'{Colors.BOLD}{Colors.PURPLE}+---+{Colors.ENDC}'
-                    else:
-                        render_up_row += f'{Colors.BOLD}{Colors.PURPLE}---+{Colors.ENDC}'
-                else:
-                    if is_center_position((row, col), 'U'):
-                        render_up_row += f' {Colors.GREEN}𖤓{Colors.ENDC} {cross_node}'
-                    else:
-                        render_up_row += f'   {cross_node}'
-            print(render_up_row)
-            print(render_row)
-        print(f'{Colors.BOLD}{Colors.PURPLE}{"---".join(["+"] * (self.data.shape[1] + 1))}{Colors.ENDC}')
-        return None
+                marks[('node', galaxy[2]['row'], galaxy[2]['col'] + 1)] = 'node_center'
+        h_borders, v_borders = renderer.get_region_borders(solution.get_rows())
+        return renderer.render(cells, h_borders, v_borders, marks)
@@ -2,11 +2,9 @@ import itertools
 
 from pathlib import Path
 
-import mip
-
 
 from src.model import BaseModel
-from src.utils import Colors
+from src.utils import Colors, GridRenderer, Solution
 from src.utils import (
     Position,
     Mirror,
@@ -15,9 +13,17 @@ from src.utils import (
 
 
 class HauntedMirrorMaze(BaseModel):
+    SOLUTION_VARS = ('v_vars', 'g_vars', 'z_vars')
+    STYLES = {
+        'V': (' V ', Colors.BOLD + Colors.RED),
+        'G': (' G ', Colors.BOLD + Colors.YELLOW),
+        'Z': (' Z ', Colors.BOLD + Colors.GREEN),
+        Mirror.LeftDownToRight: (' \\ ', Colors.BOLD + Colors.BLUE),
+        Mirror.RightDownToLeft: (' / ', Colors.BOLD + Colors.BLUE)
+    }
 
-    def __init__(self, dataPath: Path) -> None:
-        super().__init__(dataPath)
+    def __init__(self, dataPath: Path, **kwargs) -> None:
+        super().__init__(dataPath, **kwargs)
         self.change_direction = {
             ((Position.Top, Position.Bottom), Mirror.RightDownToLeft): (Position.Right, Position.Left),
             ((Position.Top, Position.Bottom), Mirror.LeftDownToRight): (Position.Left, Position.Right),
@@ -83,26 +89,22 @@ class HauntedMirrorMaze(BaseModel):
 
     def add_variables(self) -> None:
         super().add_variables()
-        self.v_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'v_{row}_{col}')
-                for col in range(self.data.shape[1])
-            ] for row in range(self.data.shape[0])
-        ]
-        self.g_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'g_{row}_{col}')
-                for col in range(self.data.shape[1])
-            ] for row in range(self.data.shape[0])
-        ]
-        self.z_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'z_{row}_{col}')
-                for col in range(self.data.shape[1])
-            ] for row in range(self.data.shape[0])
-        ]
+        self.v_vars = self.add_variable_array((self.data.shape[0], self.data.shape[1]), name='v')
+        self.g_vars = self.add_variable_array((self.data.shape[0], self.data.shape[1]), name='g')
+        self.z_vars = self.add_variable_array((self.data.shape[0], self.data.shape[1]), name='z')
         return None
 
+    def get_monster_vars(self, monster: Monster) -> list[list]:
+        match monster:
+            case Monster.Vampire:
+                return self.v_vars
+            case Monster.Ghost:
+                return self.g_vars
+            case Monster.Zombie:
+                return self.z_vars
+            case _:
+                raise ValueError(f'Invalid monster {monster}')
+
     def add_constraints(self) -> None:
         super().add_constraints()
         self.add_mirror_cell_not_contain_monster_constraints()
@@ -114,93 +116,66 @@ class HauntedMirrorMaze(BaseModel):
         return None
 
     def add_mirror_cell_not_contain_monster_constraints(self) -> None:
-        for row, col in self.data.mirrors.keys():
-            self.add_constraint(self.v_vars[row][col] == 0)
-            self.add_constraint(self.g_vars[row][col] == 0)
-            self.add_constraint(self.z_vars[row][col] == 0)
+        self.add_constraint_rows([
+            [monster_vars[row][col]]
+            for row, col in self.data.mirrors.keys()
+            for monster_vars in [self.v_vars, self.g_vars, self.z_vars]
+        ], '=', 0)
         return None
 
     def add_each_cell_contains_one_monster_constraints(self) -> None:
-        for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1])):
-            if (row, col) not in self.data.mirrors.keys():
-                self.add_constraint(
-                    self.v_vars[row][col] + self.g_vars[row][col] + self.z_vars[row][col] == 1
-                )
+        self.add_constraint_rows([
+            [self.v_vars[row][col], self.g_vars[row][col], self.z_vars[row][col]]
+            for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1]))
+            if (row, col) not in self.data.mirrors.keys()
+        ], '=', 1)
         return None
 
     def add_fixed_cells_constraints(self) -> None:
-        for cell in self.data.fixed_cells:
-            match cell['val']:
-                case Monster.Vampire:
-                    self.add_constraint(self.v_vars[cell['row']][cell['col']] == 1)
-                case Monster.Ghost:
-                    self.add_constraint(self.g_vars[cell['row']][cell['col']] == 1)
-                case Monster.Zombie:
-                    self.add_constraint(self.z_vars[cell['row']][cell['col']] == 1)
-                case _:
-                    raise ValueError(f'Invalid monster {cell["val"]}')
+        self.add_constraint_rows([
+            [self.get_monster_vars(cell['val'])[cell['row']][cell['col']]] for cell in self.data.fixed_cells
+        ], '=', 1)
         return None
 
     def add_same_cells_constraints(self) -> None:
         if len(self.data.same_cells):
-            for i in range(1, len(self.data.same_cells)):
-                self.add_constraint(
-                    self.v_vars[self.data.same_cells[i]['row']][self.data.same_cells[i]['col']]
-                    == self.v_vars[self.data.same_cells[0]['row']][self.data.same_cells[0]['col']]
-                )
-                self.add_constraint(
-                    self.g_vars[self.data.same_cells[i]['row']][self.data.same_cells[i]['col']]
-                    == self.g_vars[self.data.same_cells[0]['row']][self.data.same_cells[0]['col']]
-                )
-                self.add_constraint(
-                    self.z_vars[self.data.same_cells[i]['row']][self.data.same_cells[i]['col']]
-                    == self.z_vars[self.data.same_cells[0]['row']][self.data.same_cells[0]['col']]
-                )
+            first = self.data.same_cells[0]
+            rows = [
+                [monster_vars[cell['row']][cell['col']], monster_vars[first['row']][first['col']]]
+                for cell in self.data.same_cells[1:]
+                for monster_vars in [self.v_vars, self.g_vars, self.z_vars]
+            ]
+            self.add_constraint_rows(rows, '=', 0, [[1, -1]] * len(rows))
         return None
 
     def add_limit_monster_number_constraints(self) -> None:
-        for monster_number in self.data.monster_number:
-            match monster_number['name']:
-                case Monster.Vampire:
-                    self.add_constraint(mip.xsum(
-                        self.v_vars[row][col]
-                        for row, col in itertools.product(
-                            range(self.data.shape[0]), range(self.data.shape[1])
-                        ) if (row, col) not in self.data.mirrors.keys()
-                    ) == monster_number['val'])
-                case Monster.Ghost:
-                    self.add_constraint(mip.xsum(
-                        self.g_vars[row][col]
-                        for row, col in itertools.product(
-                            range(self.data.shape[0]), range(self.data.shape[1])
-                        ) if (row, col) not in self.data.mirrors.keys()
-                    ) == monster_number['val'])
-                case Monster.Zombie:
-                    self.add_constraint(mip.xsum(
-                        self.z_vars[row][col]
-                        for row, col in itertools.product(
-                            range(self.data.shape[0]), range(self.data.shape[1])
-                        ) if (row, col) not in self.data.mirrors.keys()
-                    ) == monster_number['val'])
-                case _:
-                    raise ValueError(f'Invalid monster {monster_number["name"]}')
+        self.add_constraint_rows([
+            [
+                self.get_monster_vars(monster_number['name'])[row][col]
+                for row, col in itertools.product(
+                    range(self.data.shape[0]), range(self.data.shape[1])
+                ) if (row, col) not in self.data.mirrors.keys()
+            ]
+            for monster_number in self.data.monster_number
+        ], '=', [monster_number['val'] for monster_number in self.data.monster_number])
         return None
 
     def add_visible_monster_number_constraints(self) -> None:
+        rows, rhs = [], []
         for position, visible_monster_number_list in self.data.visibility.items():
             for cell_index, monster_number in enumerate(visible_monster_number_list):
                 if monster_number is  None:
                     continue
                 head_on_cells, reflective_cells = self.get_visible_cells(position, cell_index)
-                self.add_constraint(
-                    mip.xsum(
-                        self.v_vars[row][col] + self.z_vars[row][col]
-                        for row, col in head_on_cells
-                    ) + mip.xsum(
-                        self.g_vars[row][col] + self.z_vars[row][col]
-                        for row, col in reflective_cells
-                    ) == monster_number
-                )
+                rows.append([
+                    monster_vars[row][col]
+                    for row, col in head_on_cells for monster_vars in [self.v_vars, self.z_vars]
+                ] + [
+                    monster_vars[row][col]
+                    for row, col in reflective_cells for monster_vars in [self.g_vars, self.z_vars]
+                ])
+                rhs.append(monster_number)
+        self.add_constraint_rows(rows, '=', rhs)
         return None
 
     def is_on_board(self, cell: tuple) -> bool:
@@ -248,73 +223,37 @@ class HauntedMirrorMaze(BaseModel):
             )
         return head_on_cells, reflective_cells
 
-    def get_rendered_lines_in_main_board(self) -> list[str]:
-        rendered_lines = []
-        for row in range(self.data.shape[0]):
-            render_up_row = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-            render_row = f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-            for col in range(self.data.shape[1]):
-                if (row, col) in self.data.mirrors.keys():
-                    if self.data.mirrors[(row, col)] == Mirror.LeftDownToRight:
-                        render_row += f' {Colors.BOLD}{Colors.BLUE}\\{Colors.ENDC} '
-                    elif self.data.mirrors[(row, col)] == Mirror.RightDownToLeft:
-                        render_row += f' {Colors.BOLD}{Colors.BLUE}/{Colors.ENDC} '
-                    else:
-                        raise ValueError(f'Invalid mirror {self.data.mirrors[(row, col)]}')
-                else:
-                    if self.v_vars[row][col].x == 1:
-                        render_row += f' {Colors.BOLD}{Colors.RED}V{Colors.ENDC} '
-                    elif self.g_vars[row][col].x == 1:
-                        render_row += f' {Colors.BOLD}{Colors.YELLOW}G{Colors.ENDC} '
-                    elif self.z_vars[row][col].x == 1:
-                        render_row += f' {Colors.BOLD}{Colors.GREEN}Z{Colors.ENDC} '
-                if col == self.data.shape[1] - 1:
-                    render_row += f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-                    node = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-                else:
-                    render_row += f'{Colors.GRAY}|{Colors.ENDC}'
-                    node = f'{Colors.GRAY}+{Colors.ENDC}'
-                if row == 0:
-                    render_up_row += f'{Colors.BOLD}{Colors.PURPLE}---+{Colors.ENDC}'
-                else:
-                    render_up_row += f'{Colors.GRAY}---{Colors.ENDC}{node}'
-            rendered_lines.append(render_up_row)
-            rendered_lines.append(render_row)
-        rendered_lines.append(
-            f'{Colors.BOLD}{Colors.PURPLE}{"---".join(["+"] * (self.data.shape[1] + 1))}{Colors.ENDC}'
-        )
-        return rendered_lines
-
-    def visualize(self) -> None:
-        super().visualize()
-        rendered_lines_in_main_board = self.get_rendered_lines_in_main_board()
-        topLine = f'{Colors.GRAY}    '
-        for cell in self.data.visibility[Position.Top]:
-            if cell is None:
-                topLine += '    '
-            else:
-                topLine += str(cell).center(4)
-        topLine += f'{Colors.ENDC}'
-        print(topLine)
-        for i, l in enumerate(rendered_lines_in_main_board):
-            if i % 2:
-                left_number = self.data.visibility[Position.Left][int(i/2)]
-                if left_number is None: left_number = '   '
-                else: left_number = str(left_number).center(3)
-
-                right_number = self.data.visibility[Position.Right][int(i/2)]
-                if right_number is None: right_number = '   '
-                else: right_number = str(right_number).center(3)
+    def make_solution(self, values: dict) -> Solution:
+        # Monster of every cell, mirrors have none
+        cells = []
+        for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1])):
+            monsters = [values[name][row][col] for name in ['v_vars', 'g_vars', 'z_vars']]
+            cells.append(monsters.index(1) if 1 in monsters else Solution.EMPTY)
+        return Solution(type(self).__name__, self.data.shape, cells, ('V', 'G', 'Z'))
 
-                print(f'{Colors.GRAY}{left_number}{Colors.ENDC}{l}{Colors.GRAY}{right_number}{Colors.ENDC}')
-            else:
-                print(f'   {l}    ')
-        bottom_line = f'{Colors.GRAY}    '
-        for cell in self.data.visibility[Position.Bottom]:
-            if cell is None:
-                bottom_line += '    '
+    def render_board(self, renderer: GridRenderer, solution: Solution) -> list[str]:
+        cells = [
+            [
+                self.data.mirrors[(row, col)] if (row, col) in self.data.mirrors else solution.get_symbol((row, col))
+                for col in range(self.data.shape[1])
+            ]
+            for row in range(self.data.shape[0])
+        ]
+        h_borders, v_borders = renderer.get_region_borders([[0] * self.data.shape[1]] * self.data.shape[0])
+        board = renderer.render(cells, h_borders, v_borders)
+        # Visible monster numbers around the board
+        numbers = {
+            position: ['' if number is None else str(number) for number in self.data.visibility[position]]
+            for position in [Position.Top, Position.Bottom, Position.Left, Position.Right]
+        }
+        lines = [renderer.paint('    ' + ''.join(number.center(4) for number in numbers[Position.Top]), Colors.GRAY)]
+        for index, line in enumerate(board):
+            if index % 2:
+                lines.append(
+                    renderer.paint(numbers[Position.Left][index // 2].center(3), Colors.GRAY) + line
+                    + renderer.paint(numbers[Position.Right][index // 2].center(3), Colors.GRAY)
+                )
             else:
-                bottom_line += str(cell).center(4)
-        bottom_line += f'{Colors.ENDC}'
-        print(bottom_line)
-        return None
+                lines.append(f'   {line}    ')
+        lines.append(renderer.paint('    ' + ''.join(number.center(4) for number in numbers[Position.Bottom]), Colors.GRAY))
+        return lines
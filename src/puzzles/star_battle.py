@@ -2,17 +2,26 @@ import itertools
 
 from pathlib import Path
 
-import mip
 
-
-from src.model import BaseModel
-from src.utils import Colors
+from src.engines import StarBattleBitmask
+from src.model import BaseModel, Propagator
+from src.utils import Colors, GridRenderer, Solution
 
 
 class StarBattle(BaseModel):
+    SOLUTION_VARS = ('x_vars',)
+    ENGINES = ('mip', 'bitmask')
+    # Solves ./data/star_battle/puzzle_3.json in 0.06s against 0.36s with CBC
+    BACKEND = 'cp-sat'
+    # Cage borders only
+    STYLES = {
+        'h_edge': ('   ', ''),
+        'v_edge': (' ', ''),
+        'star': (' ⚝ ', Colors.BOLD + Colors.GREEN)
+    }
 
-    def __init__(self, dataPath: Path) -> None:
-        super().__init__(dataPath)
+    def __init__(self, dataPath: Path, **kwargs) -> None:
+        super().__init__(dataPath, **kwargs)
         return None
 
     def verify_data(self) -> None:
@@ -32,15 +41,39 @@ class StarBattle(BaseModel):
 
     def add_variables(self) -> None:
         super().add_variables()
-        self.x_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'x_{row}_{col}')
-                for col in range(self.data.shape[1])
-            ]
-            for row in range(self.data.shape[0])
-        ]
+        self.x_vars = self.add_variable_array(
+            (self.data.shape[0], self.data.shape[1]), name='x',
+            constant=lambda row, col: self.get_decided_value((row, col), 1)
+        )
         return None
 
+    def get_decision_vars(self) -> dict:
+        return {
+            ((row, col), 1): self.x_vars[row][col]
+            for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1]))
+        }
+
+    def create_propagator(self) -> Propagator:
+        propagator = Propagator()
+        for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1])):
+            propagator.add_cell((row, col), [0, 1])
+        units = [
+            [(row, col) for col in range(self.data.shape[1])] for row in range(self.data.shape[0])
+        ] + [
+            [(row, col) for row in range(self.data.shape[0])] for col in range(self.data.shape[1])
+        ] + [
+            [(cell['row'], cell['col']) for cell in cage] for cage in self.data.cages
+        ]
+        for cells in units:
+            propagator.add_rule(cells, 1, self.data.star_number, self.data.star_number)
+        # Every two adjacent cells (even diagonally) share a 2x2 block, at most
+        # one star in each block excludes the neighbours of a placed star.
+        for row, col in itertools.product(range(self.data.shape[0] - 1), range(self.data.shape[1] - 1)):
+            propagator.add_rule(
+                [(row, col), (row, col + 1), (row + 1, col), (row + 1, col + 1)], 1, 0, 1
+            )
+        return propagator
+
     def add_constraints(self) -> None:
         super().add_constraints()
         self.add_star_number_each_row_constraints()
@@ -50,24 +83,21 @@ class StarBattle(BaseModel):
         return None
 
     def add_star_number_each_row_constraints(self) -> None:
-        for row in range(self.data.shape[0]):
-            self.add_constraint(
-                mip.xsum(self.x_vars[row][col] for col in range(self.data.shape[1])) == self.data.star_number
-            )
+        self.add_constraint_rows([
+            [self.x_vars[row][col] for col in range(self.data.shape[1])] for row in range(self.data.shape[0])
+        ], '=', self.data.star_number)
         return None
 
     def add_star_number_each_column_constraints(self) -> None:
-        for col in range(self.data.shape[1]):
-            self.add_constraint(
-                mip.xsum(self.x_vars[row][col] for row in range(self.data.shape[0])) == self.data.star_number
-            )
+        self.add_constraint_rows([
+            [self.x_vars[row][col] for row in range(self.data.shape[0])] for col in range(self.data.shape[1])
+        ], '=', self.data.star_number)
         return None
 
     def add_star_number_each_cage_constraints(self) -> None:
-        for cage in self.data.cages:
-            self.add_constraint(
-                mip.xsum(self.x_vars[cell['row']][cell['col']] for cell in cage) == self.data.star_number
-            )
+        self.add_constraint_rows([
+            [self.x_vars[cell['row']][cell['col']] for cell in cage] for cage in self.data.cages
+        ], '=', self.data.star_number)
         return None
 
     def add_stars_not_adjacent_each_other_constraints(self) -> None:
@@ -80,47 +110,38 @@ class StarBattle(BaseModel):
                     continue
                 if 0 <= row + gap_row < self.data.shape[0] and 0 <= col + gap_col < self.data.shape[1]:
                     blocks[(row, col)].append((row + gap_row, col + gap_col))
-        for cell, neighbors in blocks.items():
-            neighbor_cells_number = len(neighbors)
-            self.add_constraint(
-                neighbor_cells_number * self.x_vars[cell[0]][cell[1]]
-                + mip.xsum(self.x_vars[row][col] for row, col in neighbors)
-                <= neighbor_cells_number
-            )
+        cells = list(blocks.keys())
+        self.add_constraint_rows(
+            [
+                [self.x_vars[cell[0]][cell[1]]] + [self.x_vars[row][col] for row, col in blocks[cell]]
+                for cell in cells
+            ],
+            '<', [len(blocks[cell]) for cell in cells],
+            [[len(blocks[cell])] + [1] * len(blocks[cell]) for cell in cells]
+        )
+        return None
+
+    def run_engine(self) -> None:
+        x_values = StarBattleBitmask(self.data.shape, self.data.star_number, self.data.cages).solve()
+        if x_values is None:
+            self.raise_error_infeasible()
+        self.set_solution_values({'x_vars': x_values})
         return None
 
-    def visualize(self) -> None:
-        super().visualize()
+    def make_solution(self, values: dict) -> Solution:
+        # 1 for a star
+        return Solution(type(self).__name__, self.data.shape, [value for row in values['x_vars'] for value in row])
+
+    def render_board(self, renderer: GridRenderer, solution: Solution) -> list[str]:
         cages = [[None] * self.data.shape[1] for _ in range(self.data.shape[0])]
         for index, cage in enumerate(self.data.cages):
             for cell in cage:
                 if cages[cell['row']][cell['col']] is not None:
                     raise ValueError(f'Cell {cell} is duplicated')
                 cages[cell['row']][cell['col']] = index
-        for row in range(self.data.shape[0]):
-            render_up_row = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-            render_row = f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-            for col in range(self.data.shape[1]):
-                if self.x_vars[row][col].x == 1:
-                    render_row += f' {Colors.BOLD}{Colors.GREEN}⚝{Colors.ENDC} '
-                else:
-                    render_row += f'   '
-                if col == self.data.shape[1] - 1 or cages[row][col] != cages[row][col + 1]:
-                    render_row += f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-                    cross_node = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-                else:
-                    render_row += f' '
-                    cross_node = f'{Colors.GRAY}+{Colors.ENDC}'
-                if row == 0 or cages[row][col] != cages[row - 1][col]:
-                    normal_cross_node = f'{Colors.GRAY}+{Colors.ENDC}'
-                    if render_up_row.endswith(normal_cross_node):
-                        render_up_row = render_up_row[:len(render_up_row) - len(normal_cross_node)]
-                        render_up_row += f'{Colors.BOLD}{Colors.PURPLE}+---+{Colors.ENDC}'
-                    else:
-                        render_up_row += f'{Colors.BOLD}{Colors.PURPLE}---+{Colors.ENDC}'
-                else:
-                    render_up_row += f'   {cross_node}'
-            print(render_up_row)
-            print(render_row)
-        print(f'{Colors.BOLD}{Colors.PURPLE}{"---".join(["+"] * (self.data.shape[1] + 1))}{Colors.ENDC}')
-        return None
+        cells = [
+            ['star' if solution[row, col] == 1 else 'empty' for col in range(self.data.shape[1])]
+            for row in range(self.data.shape[0])
+        ]
+        h_borders, v_borders = renderer.get_region_borders(cages)
+        return renderer.render(cells, h_borders, v_borders)
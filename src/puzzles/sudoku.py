@@ -5,14 +5,18 @@ from pathlib import Path
 import mip
 
 
-from src.model import BaseModel
-from src.utils import Colors
+from src.engines import DancingLinks
+from src.model import BaseModel, Propagator
+from src.utils import Colors, GridRenderer, Solution
 
 
 class Sudoku(BaseModel):
+    SOLUTION_VARS = ('x_vars',)
+    ENGINES = ('mip', 'dlx')
+    GIVENS = 'fixed_cells'
 
-    def __init__(self, dataPath: Path) -> None:
-        super().__init__(dataPath)
+    def __init__(self, dataPath: Path, **kwargs) -> None:
+        super().__init__(dataPath, **kwargs)
         self.modifiy_fixed_cells_values()
         return None
 
@@ -37,17 +41,39 @@ class Sudoku(BaseModel):
 
     def add_variables(self) -> None:
         super().add_variables()
-        self.x_vars = [
+        self.x_vars = self.add_variable_array(
+            (self.data.shape, self.data.shape, self.data.shape), name='x',
+            constant=lambda row, col, val: self.get_decided_value((row, col), val)
+        )
+        return None
+
+    def create_propagator(self) -> Propagator:
+        propagator = Propagator()
+        fixed_cells = {(cell['row'], cell['col']): cell['val'] for cell in self.data.fixed_cells}
+        for row, col in itertools.product(range(self.data.shape), range(self.data.shape)):
+            if (row, col) in fixed_cells:
+                propagator.add_cell((row, col), [fixed_cells[(row, col)]])
+            else:
+                propagator.add_cell((row, col), range(self.data.shape))
+        units = [
+            [(row, col) for col in range(self.data.shape)] for row in range(self.data.shape)
+        ] + [
+            [(row, col) for row in range(self.data.shape)] for col in range(self.data.shape)
+        ] + [
             [
-                [
-                    self.add_variable(vtype=mip.BINARY, name=f'x_{row}_{col}_{val}')
-                    for val in range(self.data.shape)
-                ]
-                for col in range(self.data.shape)
+                (row + step_row, col + step_col)
+                for step_row, step_col in itertools.product(range(self.block_shape), range(self.block_shape))
             ]
-            for row in range(self.data.shape)
+            for row, col in itertools.product(
+                range(0, self.data.shape, self.block_shape), range(0, self.data.shape, self.block_shape)
+            )
         ]
-        return None
+        # Each value appears once in each unit: a placed value is removed from
+        # its peers (naked single) and a value with one place left is placed
+        # there (hidden single).
+        for cells, val in itertools.product(units, range(self.data.shape)):
+            propagator.add_rule(cells, val, 1, 1)
+        return propagator
 
     def add_constraints(self) -> None:
         super().add_constraints()
@@ -59,69 +85,114 @@ class Sudoku(BaseModel):
         return None
 
     def add_each_cell_contains_one_value_contraints(self) -> None:
-        for row, col in itertools.product(range(self.data.shape), range(self.data.shape)):
-            self.add_constraint(
-                mip.xsum(self.x_vars[row][col][val] for val in range(self.data.shape)) == 1
-            )
+        self.add_constraint_rows([
+            [self.x_vars[row][col][val] for val in range(self.data.shape)]
+            for row, col in itertools.product(range(self.data.shape), range(self.data.shape))
+        ], '=', 1)
         return None
 
+    def get_decision_vars(self) -> dict:
+        return {
+            ((row, col), val): self.x_vars[row][col][val]
+            for row, col, val in itertools.product(range(self.data.shape), repeat=3)
+        }
+
+    def get_given_values(self) -> list[tuple[mip.Var, int]]:
+        return [(self.x_vars[cell['row']][cell['col']][cell['val']], 1) for cell in self.data.fixed_cells]
+
     def add_fixed_cell_constraints(self) -> None:
-        for cell in self.data.fixed_cells:
-            self.add_constraint(self.x_vars[cell['row']][cell['col']][cell['val']] == 1)
+        self.add_constraint_rows([[var] for var, _ in self.get_given_values()], '=', 1)
         return None
 
     def add_unique_number_each_row_constraints(self) -> None:
-        for row, val in itertools.product(range(self.data.shape), range(self.data.shape)):
-            self.add_constraint(
-                mip.xsum(self.x_vars[row][col][val] for col in range(self.data.shape)) == 1
-            )
+        self.add_constraint_rows([
+            [self.x_vars[row][col][val] for col in range(self.data.shape)]
+            for row, val in itertools.product(range(self.data.shape), range(self.data.shape))
+        ], '=', 1)
         return None
 
     def add_unique_number_each_column_constraints(self) -> None:
-        for col, val in itertools.product(range(self.data.shape), range(self.data.shape)):
-            self.add_constraint(
-                mip.xsum(self.x_vars[row][col][val] for row in range(self.data.shape)) == 1
-            )
+        self.add_constraint_rows([
+            [self.x_vars[row][col][val] for row in range(self.data.shape)]
+            for col, val in itertools.product(range(self.data.shape), range(self.data.shape))
+        ], '=', 1)
         return None
 
     def add_unique_number_each_block_constraints(self) -> None:
-        for row, col in itertools.product(
-            range(0, self.data.shape, self.block_shape), range(0, self.data.shape, self.block_shape)
-        ):
-            for val in range(self.data.shape):
-                self.add_constraint(
-                    mip.xsum(
-                        self.x_vars[row + step_row][col + step_col][val]
-                        for step_row, step_col in itertools.product(
-                            range(self.block_shape), range(self.block_shape)
-                        )
-                    ) == 1
-                )
+        self.add_constraint_rows([
+            [
+                self.x_vars[row + step_row][col + step_col][val]
+                for step_row, step_col in itertools.product(range(self.block_shape), range(self.block_shape))
+            ]
+            for row, col in itertools.product(
+                range(0, self.data.shape, self.block_shape), range(0, self.data.shape, self.block_shape)
+            )
+            for val in range(self.data.shape)
+        ], '=', 1)
         return None
 
-    def visualize(self) -> None:
-        super().visualize()
+    def run_engine(self) -> None:
+        # Exact cover with 4n^2 columns: cell (row, col) is filled, and value
+        # val is placed once in each row, column and block.
+        size, block_shape = self.data.shape, self.block_shape
         fixed_cells = {(cell['row'], cell['col']): cell['val'] for cell in self.data.fixed_cells}
-        for row in range(self.data.shape):
-            render_up_row = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-            render_row = f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-            for col in range(self.data.shape):
-                if (row, col) in fixed_cells.keys():
-                    render_row += f' {Colors.BOLD}{Colors.GRAY}{fixed_cells[(row, col)]}{Colors.ENDC} '
-                else:
-                    value = int(sum(val * self.x_vars[row][col][val].x for val in range(self.data.shape)))
-                    render_row += f' {Colors.BOLD}{Colors.BLUE}{value + 1}{Colors.ENDC} '
-                if (col + 1) % self.block_shape == 0:
-                    render_row += f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-                    node = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-                else:
-                    render_row += f'{Colors.GRAY}|{Colors.ENDC}'
-                    node = f'{Colors.GRAY}+{Colors.ENDC}'
-                if row % self.block_shape == 0:
-                    render_up_row += f'{Colors.BOLD}{Colors.PURPLE}---+{Colors.ENDC}'
-                else:
-                    render_up_row += f'{Colors.GRAY}---{Colors.ENDC}{node}'
-            print(render_up_row)
-            print(render_row)
-        print(f'{Colors.BOLD}{Colors.PURPLE}{"---".join(["+"] * (self.data.shape + 1))}{Colors.ENDC}')
+        used_values = set()
+        for (row, col), val in fixed_cells.items():
+            block = (row // block_shape) * block_shape + col // block_shape
+            used_values.update([('row', row, val), ('col', col, val), ('block', block, val)])
+        links = DancingLinks(4 * size * size)
+        candidates = []
+        for row, col in itertools.product(range(size), range(size)):
+            block = (row // block_shape) * block_shape + col // block_shape
+            if (row, col) in fixed_cells:
+                values = [fixed_cells[(row, col)]]
+            else:
+                values = [
+                    val for val in range(size)
+                    if ('row', row, val) not in used_values
+                    and ('col', col, val) not in used_values
+                    and ('block', block, val) not in used_values
+                ]
+            for val in values:
+                links.add_row([
+                    row * size + col,
+                    size * size + row * size + val,
+                    2 * size * size + col * size + val,
+                    3 * size * size + block * size + val
+                ])
+                candidates.append((row, col, val))
+        solution = next(links.solutions(), None)
+        if solution is None:
+            self.raise_error_infeasible()
+        x_values = [[[0] * size for _ in range(size)] for _ in range(size)]
+        for candidate in solution:
+            row, col, val = candidates[candidate]
+            x_values[row][col][val] = 1
+        self.set_solution_values({'x_vars': x_values})
         return None
+
+    def make_solution(self, values: dict) -> Solution:
+        # Digits from 1
+        return Solution(type(self).__name__, (self.data.shape, self.data.shape), [
+            sum(val * value for val, value in enumerate(cell)) + 1 for row in values['x_vars'] for cell in row
+        ])
+
+    def get_styles(self) -> dict:
+        # Digits of the grid size, givens in gray
+        styles = {}
+        for digit in range(1, self.data.shape + 1):
+            styles[digit] = (f' {digit} ', Colors.BOLD + Colors.BLUE)
+            styles[f'fixed_{digit}'] = (f' {digit} ', Colors.BOLD + Colors.GRAY)
+        return styles
+
+    def render_board(self, renderer: GridRenderer, solution: Solution) -> list[str]:
+        fixed_cells = {(cell['row'], cell['col']) for cell in self.data.fixed_cells}
+        cells = [
+            [f'fixed_{value}' if (row, col) in fixed_cells else value for col, value in enumerate(values)]
+            for row, values in enumerate(solution.get_rows())
+        ]
+        h_borders, v_borders = renderer.get_region_borders([
+            [(row // self.block_shape, col // self.block_shape) for col in range(self.data.shape)]
+            for row in range(self.data.shape)
+        ])
+        return renderer.render(cells, h_borders, v_borders)
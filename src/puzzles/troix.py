@@ -5,14 +5,26 @@ from pathlib import Path
 import mip
 
 
-from src.model import BaseModel
-from src.utils import Colors
+from src.engines import TroixSearch
+from src.model import BaseModel, Propagator
+from src.utils import Colors, GridRenderer, Solution
 
 
 class Troix(BaseModel):
-
-    def __init__(self, dataPath: Path) -> None:
-        super().__init__(dataPath)
+    SOLUTION_VARS = ('x_vars', 'o_vars', 'i_vars')
+    STYLES = {
+        'X': (' X ', Colors.BOLD + Colors.RED),
+        'O': (' O ', Colors.BOLD + Colors.BLUE),
+        'I': (' I ', Colors.BOLD + Colors.GREEN),
+        'fixed_X': (' X ', Colors.BOLD + Colors.GRAY),
+        'fixed_O': (' O ', Colors.BOLD + Colors.GRAY),
+        'fixed_I': (' I ', Colors.BOLD + Colors.GRAY)
+    }
+    ENGINES = ('mip', 'search')
+    GIVENS = 'fixed'
+
+    def __init__(self, dataPath: Path, **kwargs) -> None:
+        super().__init__(dataPath, **kwargs)
         return None
 
     def verify_data(self) -> None:
@@ -30,29 +42,38 @@ class Troix(BaseModel):
 
     def add_variables(self) -> None:
         super().add_variables()
-        self.x_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'x_{row}_{col}')
-                for col in range(self.data.shape[1])
-            ]
-            for row in range(self.data.shape[0])
-        ]
-        self.o_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'o_{row}_{col}')
-                for col in range(self.data.shape[1])
-            ]
-            for row in range(self.data.shape[0])
-        ]
-        self.i_vars = [
-            [
-                self.add_variable(vtype=mip.BINARY, name=f'i_{row}_{col}')
-                for col in range(self.data.shape[1])
-            ]
-            for row in range(self.data.shape[0])
-        ]
+        for symbol in ['X', 'O', 'I']:
+            setattr(self, f'{symbol.lower()}_vars', self.add_variable_array(
+                (self.data.shape[0], self.data.shape[1]), name=symbol.lower(),
+                constant=lambda row, col: self.get_decided_value((row, col), symbol)
+            ))
         return None
 
+    def get_symbol_vars(self) -> list[list[list]]:
+        return [self.x_vars, self.o_vars, self.i_vars]
+
+    def create_propagator(self) -> Propagator:
+        propagator = Propagator()
+        fixed_cells = {(cell['row'], cell['col']): cell['val'] for cell in self.data.fixed}
+        for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1])):
+            propagator.add_cell(
+                (row, col), [fixed_cells[(row, col)]] if (row, col) in fixed_cells else ['X', 'O', 'I']
+            )
+        lines = [
+            [(row, col) for col in range(self.data.shape[1])] for row in range(self.data.shape[0])
+        ] + [
+            [(row, col) for row in range(self.data.shape[0])] for col in range(self.data.shape[1])
+        ]
+        for cells, symbol in itertools.product(lines, ['X', 'O', 'I']):
+            # Balance rule
+            propagator.add_rule(cells, symbol, len(cells) // 3, len(cells) // 3)
+            # Run rule: at most symbol_number same symbols in any symbol_number + 1 consecutive cells
+            for start in range(len(cells) - self.data.symbol_number):
+                propagator.add_rule(
+                    cells[start: start + self.data.symbol_number + 1], symbol, 0, self.data.symbol_number
+                )
+        return propagator
+
     def add_constraints(self) -> None:
         super().add_constraints()
         self.add_each_cell_contains_one_symbol()
@@ -64,139 +85,93 @@ class Troix(BaseModel):
         return None
 
     def add_each_cell_contains_one_symbol(self) -> None:
-        for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[0])):
-            self.add_constraint(
-                self.x_vars[row][col] + self.o_vars[row][col] + self.i_vars[row][col] == 1
-            )
+        self.add_constraint_rows([
+            [self.x_vars[row][col], self.o_vars[row][col], self.i_vars[row][col]]
+            for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1]))
+        ], '=', 1)
+        return None
+
+    def get_decision_vars(self) -> dict:
+        symbol_vars = {'X': self.x_vars, 'O': self.o_vars, 'I': self.i_vars}
+        return {
+            ((row, col), symbol): symbol_vars[symbol][row][col]
+            for row, col in itertools.product(range(self.data.shape[0]), range(self.data.shape[1]))
+            for symbol in symbol_vars
+        }
+
+    def get_given_values(self) -> list[tuple[mip.Var, int]]:
+        symbol_vars = {'X': self.x_vars, 'O': self.o_vars, 'I': self.i_vars}
+        return [(symbol_vars[cell['val']][cell['row']][cell['col']], 1) for cell in self.data.fixed]
 
     def add_fixed_cell_constraints(self) -> None:
-        for cell in self.data.fixed:
-            if cell['val'] == 'X':
-                self.add_constraint(self.x_vars[cell['row']][cell['col']] == 1)
-            elif cell['val'] == 'O':
-                self.add_constraint(self.o_vars[cell['row']][cell['col']] == 1)
-            elif cell['val'] == 'I':
-                self.add_constraint(self.i_vars[cell['row']][cell['col']] == 1)
-            else:
-                raise ValueError(f"In valid value in cell {cell}")
+        self.add_constraint_rows([[var] for var, _ in self.get_given_values()], '=', 1)
+        return None
 
     def add_limit_consecutive_symbol_each_row_constraints(self) -> None:
-        for row in range(self.data.shape[0]):
-            for col in range(self.data.shape[1] - self.data.symbol_number):
-                self.add_constraint(
-                    mip.xsum(
-                        self.x_vars[row][col + gap] for gap in range(self.data.symbol_number + 1)
-                    ) <= self.data.symbol_number
-                )
-                self.add_constraint(
-                    mip.xsum(
-                        self.o_vars[row][col + gap] for gap in range(self.data.symbol_number + 1)
-                    ) <= self.data.symbol_number
-                )
-                self.add_constraint(
-                    mip.xsum(
-                        self.i_vars[row][col + gap] for gap in range(self.data.symbol_number + 1)
-                    ) <= self.data.symbol_number
-                )
+        self.add_constraint_rows([
+            [symbol_vars[row][col + gap] for gap in range(self.data.symbol_number + 1)]
+            for row in range(self.data.shape[0])
+            for col in range(self.data.shape[1] - self.data.symbol_number)
+            for symbol_vars in self.get_symbol_vars()
+        ], '<', self.data.symbol_number)
         return None
 
     def add_limit_consecutive_symbol_each_col_constraints(self) -> None:
-        for col in range(self.data.shape[1]):
-            for row in range(self.data.shape[0] - self.data.symbol_number):
-                self.add_constraint(
-                    mip.xsum(
-                        self.x_vars[row + gap][col] for gap in range(self.data.symbol_number + 1)
-                    ) <= self.data.symbol_number
-                )
-                self.add_constraint(
-                    mip.xsum(
-                        self.o_vars[row + gap][col] for gap in range(self.data.symbol_number + 1)
-                    ) <= self.data.symbol_number
-                )
-                self.add_constraint(
-                    mip.xsum(
-                        self.i_vars[row + gap][col] for gap in range(self.data.symbol_number + 1)
-                    ) <= self.data.symbol_number
-                )
+        self.add_constraint_rows([
+            [symbol_vars[row + gap][col] for gap in range(self.data.symbol_number + 1)]
+            for col in range(self.data.shape[1])
+            for row in range(self.data.shape[0] - self.data.symbol_number)
+            for symbol_vars in self.get_symbol_vars()
+        ], '<', self.data.symbol_number)
         return None
 
     def add_equal_symbols_each_row_constraints(self) -> None:
-        for row in range(self.data.shape[0]):
-            self.add_constraint(
-                mip.xsum(
-                    self.x_vars[row][col] for col in range(self.data.shape[1])
-                ) == self.data.shape[1] / 3
-            )
-            self.add_constraint(
-                mip.xsum(
-                    self.o_vars[row][col] for col in range(self.data.shape[1])
-                ) == self.data.shape[1] / 3
-            )
-            self.add_constraint(
-                mip.xsum(
-                    self.i_vars[row][col] for col in range(self.data.shape[1])
-                ) == self.data.shape[1] / 3
-            )
+        self.add_constraint_rows([
+            [symbol_vars[row][col] for col in range(self.data.shape[1])]
+            for row in range(self.data.shape[0])
+            for symbol_vars in self.get_symbol_vars()
+        ], '=', self.data.shape[1] / 3)
         return None
 
     def add_equal_symbols_each_col_constraints(self) -> None:
-        for col in range(self.data.shape[1]):
-            self.add_constraint(
-                mip.xsum(self.x_vars[row][col] for row in range(self.data.shape[0])) == self.data.shape[0] / 3
-            )
-            self.add_constraint(
-                mip.xsum(self.o_vars[row][col] for row in range(self.data.shape[0])) == self.data.shape[0] / 3
-            )
-            self.add_constraint(
-                mip.xsum(self.i_vars[row][col] for row in range(self.data.shape[0])) == self.data.shape[0] / 3
-            )
+        self.add_constraint_rows([
+            [symbol_vars[row][col] for row in range(self.data.shape[0])]
+            for col in range(self.data.shape[1])
+            for symbol_vars in self.get_symbol_vars()
+        ], '=', self.data.shape[0] / 3)
+        return None
+
+    def run_engine(self) -> None:
+        fixed_cells = {(cell['row'], cell['col']): cell['val'] for cell in self.data.fixed}
+        board = TroixSearch(self.data.shape, self.data.symbol_number, fixed_cells).solve()
+        if board is None:
+            self.raise_error_infeasible()
+        self.set_solution_values({
+            f'{symbol.lower()}_vars': [[int(val == symbol) for val in values] for values in board]
+            for symbol in ['X', 'O', 'I']
+        })
         return None
 
-    def visualize(self) -> None:
-        super().visualize()
-        fixed_cells = [(cell['row'], cell['col']) for cell in self.data.fixed]
-        board = [[None] * self.data.shape[1] for _ in range(self.data.shape[0])]
+    def make_solution(self, values: dict) -> Solution:
+        cells = []
         for row, col in itertools.product(
             range(self.data.shape[0]),
             range(self.data.shape[1])
         ):
-            if self.x_vars[row][col].x == 1:
-                board[row][col] = 'X'
-            elif self.o_vars[row][col].x == 1:
-                board[row][col] = 'O'
-            elif self.i_vars[row][col].x == 1:
-                board[row][col] = 'I'
-            else:
+            symbols = [values[name][row][col] for name in ['x_vars', 'o_vars', 'i_vars']]
+            if 1 not in symbols:
                 raise ValueError(f'Cell ({row, col}) not contain any symbol')
-        for row in range(self.data.shape[0]):
-            render_up_row = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-            render_row = f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-            for col in range(self.data.shape[1]):
-                if (row, col) in fixed_cells:
-                    if board[row][col] == 'X':
-                        render_row += f' {Colors.BOLD}{Colors.GRAY}X{Colors.ENDC} '
-                    elif board[row][col] == 'O':
-                        render_row += f' {Colors.BOLD}{Colors.GRAY}O{Colors.ENDC} '
-                    else:
-                        render_row += f' {Colors.BOLD}{Colors.GRAY}I{Colors.ENDC} '
-                else:
-                    if board[row][col] == 'X':
-                        render_row += f' {Colors.BOLD}{Colors.RED}X{Colors.ENDC} '
-                    elif board[row][col] == 'O':
-                        render_row += f' {Colors.BOLD}{Colors.BLUE}O{Colors.ENDC} '
-                    else:
-                        render_row += f' {Colors.BOLD}{Colors.GREEN}I{Colors.ENDC} '
-                if col == self.data.shape[1] - 1:
-                    render_row += f'{Colors.BOLD}{Colors.PURPLE}|{Colors.ENDC}'
-                    node = f'{Colors.BOLD}{Colors.PURPLE}+{Colors.ENDC}'
-                else:
-                    render_row += f'{Colors.GRAY}|{Colors.ENDC}'
-                    node = f'{Colors.GRAY}+{Colors.ENDC}'
-                if row == 0:
-                    render_up_row += f'{Colors.BOLD}{Colors.PURPLE}---+{Colors.ENDC}'
-                else:
-                    render_up_row += f'{Colors.GRAY}---{Colors.ENDC}{node}'
-            print(render_up_row)
-            print(render_row)
-        print(f'{Colors.BOLD}{Colors.PURPLE}{"---".join(["+"] * (self.data.shape[1] + 1))}{Colors.ENDC}')
-        return None
+            cells.append(symbols.index(1))
+        return Solution(type(self).__name__, self.data.shape, cells, ('X', 'O', 'I'))
+
+    def render_board(self, renderer: GridRenderer, solution: Solution) -> list[str]:
+        fixed_cells = {(cell['row'], cell['col']) for cell in self.data.fixed}
+        cells = [
+            [
+                f"{'fixed_' if (row, col) in fixed_cells else ''}{solution.symbols[value]}"
+                for col, value in enumerate(values)
+            ]
+            for row, values in enumerate(solution.get_rows())
+        ]
+        h_borders, v_borders = renderer.get_region_borders([[0] * self.data.shape[1]] * self.data.shape[0])
+        return renderer.render(cells, h_borders, v_borders)
@@ -0,0 +1,11 @@
+from .batch import (
+    BatchSolver,
+    collect_puzzles
+)
+from .benchmark import (
+    Benchmark,
+    compare_results,
+    make_synthetic_puzzles,
+    measure_imports
+)
+from .service import SolveService
@@ -0,0 +1,293 @@
+import glob
+import json
+import os
+import tempfile
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from pathlib import Path
+
+
+# Per worker process state, set up once by warm_up_worker()
+worker_cache = None
+worker_options = {}
+worker_engines = {}
+worker_stats = False
+worker_templates = None
+
+
+def warm_up_worker(
+    cache_path: str | None = None, cache_size: int | None = None,
+    options: dict | None = None, engines: dict | None = None, stats: bool = False,
+    templates: bool = False
+) -> None:
+    global worker_cache, worker_options, worker_engines, worker_stats, worker_templates
+    # Pay the puzzle imports and the solver library loads once per worker,
+    # not once per puzzle.
+    import mip
+    import src.puzzles
+    from src.model import CpSatModel, TemplateCache
+    from src.utils import SolutionCache
+    mip.Model(solver_name='CBC')
+    backends = {
+        (options or {}).get('backend') or getattr(src.puzzles, puzzle_name).BACKEND
+        for puzzle_name in src.puzzles.PUZZLE_NAME.values()
+    }
+    if 'cp-sat' in backends:
+        CpSatModel()
+    if cache_path is not None:
+        worker_cache = SolutionCache(Path(cache_path), cache_size)
+    # One search thread per solve unless configured, the pool already runs
+    # a process per core
+    worker_options = {'threads': 1, **(options or {})}
+    worker_engines = engines or {}
+    worker_stats = stats
+    # Models of the puzzle shapes seen by this worker, reused by the next
+    # puzzles of the same shape
+    if templates:
+        worker_templates = TemplateCache()
+    return None
+
+
+def solve_puzzle(puzzle_name: str, path: str, solution: bool = False, max_seconds: float | None = None) -> dict:
+    import src.puzzles as puzzles
+
+    result = {'path': path, 'puzzle': puzzle_name}
+    start_time = time.perf_counter()
+    try:
+        model = getattr(puzzles, puzzle_name)(
+            Path(path), cache=worker_cache, engine=worker_engines.get(puzzle_name, 'mip'),
+            templates=worker_templates, max_seconds=max_seconds, **worker_options
+        )
+        model.init_model()
+        model.solve()
+        result['status'] = 'solved'
+        if solution:
+            result['solution'] = model.get_solution().to_dict()
+        if worker_cache is not None:
+            result['cache'] = 'hit' if model.is_cached else 'miss'
+        if model.cut_number:
+            result['cuts'] = model.cut_number
+        if worker_stats:
+            result['stats'] = model.stats.to_dict()
+    except TimeoutError as error:
+        result['status'] = 'timeout'
+        result['error'] = str(error)
+    except ValueError as error:
+        result['status'] = 'failed'
+        result['error'] = str(error)
+    except Exception as error:
+        result['status'] = 'error'
+        result['error'] = f'{type(error).__name__}: {error}'
+    result['time'] = round(time.perf_counter() - start_time, 4)
+    return result
+
+
+def solve_data(puzzle_name: str, data: dict, max_seconds: float | None = None) -> dict:
+    # Puzzle data sent by a client instead of a path. Models read their data
+    # from a file, it goes through a temporary one.
+    handle, path = tempfile.mkstemp(suffix='.json')
+    try:
+        with os.fdopen(handle, 'w') as f:
+            json.dump(data, f)
+        result = solve_puzzle(puzzle_name, path, solution=True, max_seconds=max_seconds)
+    finally:
+        os.remove(path)
+    del result['path']
+    return result
+
+
+def read_record(line: str) -> tuple[str, dict]:
+    from src.puzzles import PUZZLE_NAME
+
+    # A stream record is {"puzzle": <short or class name>, "data": <puzzle
+    # data>}, other keys (e.g. "id") are copied to the result
+    record = json.loads(line)
+    if not isinstance(record, dict) or not isinstance(record.get('data'), dict):
+        raise ValueError('Record must be a JSON object with the puzzle data as "data"')
+    puzzle_name = PUZZLE_NAME.get(record.get('puzzle'), record.get('puzzle'))
+    if puzzle_name not in PUZZLE_NAME.values():
+        raise ValueError(f"Puzzle {record.get('puzzle')} is not supported, use one of {list(PUZZLE_NAME.keys())}")
+    return puzzle_name, record
+
+
+def infer_puzzle_name(path: Path) -> str | None:
+    from src.puzzles import PUZZLE_FOLDER
+
+    for folder in path.absolute().parents:
+        if folder.name in PUZZLE_FOLDER:
+            return PUZZLE_FOLDER[folder.name]
+    return None
+
+
+def read_manifest(path: Path) -> list[tuple[str | None, Path]]:
+    from src.puzzles import PUZZLE_NAME
+
+    # Each line is "<data path>" or "<puzzle short name> <data path>",
+    # relative paths are resolved against the manifest folder.
+    entries = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if len(line) == 0 or line.startswith('#'):
+                continue
+            fields = line.split(maxsplit=1)
+            if len(fields) == 2 and fields[0] in PUZZLE_NAME:
+                puzzle_name, data_path = PUZZLE_NAME[fields[0]], fields[1]
+            else:
+                puzzle_name, data_path = None, line
+            data_path = Path(data_path)
+            if not data_path.is_absolute():
+                data_path = path.parent / data_path
+            entries.append((puzzle_name, data_path))
+    return entries
+
+
+def collect_puzzles(sources: list[str], puzzle_name: str | None = None) -> list[tuple[str | None, str]]:
+    entries = []
+    for source in sources:
+        source_path = Path(source)
+        if source_path.is_dir():
+            entries += [(None, path) for path in sorted(source_path.rglob('*.json'))]
+        elif source_path.is_file() and source_path.suffix != '.json':
+            entries += read_manifest(source_path)
+        elif source_path.is_file():
+            entries.append((None, source_path))
+        else:
+            entries += [(None, Path(path)) for path in sorted(glob.glob(source, recursive=True))]
+    puzzles = []
+    for name, path in entries:
+        if puzzle_name is not None:
+            name = puzzle_name
+        elif name is None:
+            name = infer_puzzle_name(path)
+        puzzles.append((name, str(path)))
+    return puzzles
+
+
+class BatchSolver:
+
+    def __init__(
+        self, workers: int | None = None,
+        cache_path: str | None = None, cache_size: int = 64 * 1024 * 1024,
+        engines: dict | None = None, stats: bool = False, templates: bool = False, **options
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        # Engine by puzzle class name, 'mip' if missing
+        self.engines = engines or {}
+        # Add the stats of every model to its result
+        self.stats = stats
+        # Keep a template cache in every worker
+        self.templates = templates
+        # Keyword arguments passed to every puzzle model, e.g. presolve=True
+        self.options = options
+        return None
+
+    def solve(self, puzzles: list[tuple[str | None, str]]):
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=warm_up_worker,
+            initargs=(self.cache_path, self.cache_size, self.options, self.engines, self.stats, self.templates)
+        ) as executor:
+            futures = []
+            for puzzle_name, path in puzzles:
+                if puzzle_name is None:
+                    yield {
+                        'path': path, 'puzzle': None, 'status': 'error',
+                        'error': 'Can not infer puzzle type from path', 'time': 0.0
+                    }
+                    continue
+                futures.append(executor.submit(solve_puzzle, puzzle_name, path))
+            for future in as_completed(futures):
+                yield future.result()
+        return None
+
+    def stream(self, lines, output, ordered: bool = False, window: int | None = None) -> dict:
+        # Solves the records of lines (an iterable of JSON lines) and writes
+        # one result per record as soon as it ends, or in input order with
+        # ordered. At most window records are read ahead and not written
+        # yet, results held back for the order included, so memory does not
+        # grow with the input.
+        window = window or 2 * self.workers
+        start_time = time.perf_counter()
+        summary = self.make_summary()
+        # Record future: its line number and the keys copied to the result
+        pending = {}
+        # Line number: result, None for blank lines (reorder buffer)
+        finished = {}
+        next_line = 1
+        records = enumerate(lines, start=1)
+        is_exhausted = False
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=warm_up_worker,
+            initargs=(self.cache_path, self.cache_size, self.options, self.engines, self.stats, self.templates)
+        ) as executor:
+            while True:
+                while not is_exhausted and len(pending) + len(finished) < window:
+                    line_number, line = next(records, (None, None))
+                    if line_number is None:
+                        is_exhausted = True
+                        break
+                    if len(line.strip()) == 0:
+                        finished[line_number] = None
+                        continue
+                    try:
+                        puzzle_name, record = read_record(line)
+                    except ValueError as error:
+                        finished[line_number] = {'line': line_number, 'status': 'error', 'error': str(error), 'time': 0.0}
+                        continue
+                    extra = {key: value for key, value in record.items() if key not in ['puzzle', 'data']}
+                    future = executor.submit(solve_data, puzzle_name, record['data'])
+                    pending[future] = (line_number, extra)
+                if len(pending):
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        line_number, extra = pending.pop(future)
+                        finished[line_number] = {'line': line_number, **extra, **future.result()}
+                if ordered:
+                    results = []
+                    while next_line in finished:
+                        results.append(finished.pop(next_line))
+                        next_line += 1
+                else:
+                    results = list(finished.values())
+                    finished.clear()
+                for result in results:
+                    if result is None:
+                        continue
+                    self.record_result(summary, result)
+                    output.write(json.dumps(result) + '\n')
+                    output.flush()
+                if is_exhausted and len(pending) == 0 and len(finished) == 0:
+                    break
+        summary['workers'] = self.workers
+        summary['time'] = round(time.perf_counter() - start_time, 4)
+        return summary
+
+    def make_summary(self) -> dict:
+        # Count of results by status, and of cache hits and misses
+        summary = {'total': 0, 'solved': 0, 'failed': 0, 'error': 0, 'timeout': 0}
+        if self.cache_path is not None:
+            summary['cache'] = {'hit': 0, 'miss': 0}
+        return summary
+
+    def record_result(self, summary: dict, result: dict) -> None:
+        summary['total'] += 1
+        summary[result['status']] += 1
+        if 'cache' in result:
+            summary['cache'][result['cache']] += 1
+        return None
+
+    def run(self, puzzles: list[tuple[str | None, str]], output) -> dict:
+        start_time = time.perf_counter()
+        summary = self.make_summary()
+        for result in self.solve(puzzles):
+            self.record_result(summary, result)
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+        summary['workers'] = self.workers
+        summary['time'] = round(time.perf_counter() - start_time, 4)
+        return summary
@@ -0,0 +1,212 @@
+import contextlib
+import io
+import json
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+
+PHASES = (
+    'parse', 'verify_data', 'presolve', 'add_variables', 'add_constraints', 'set_givens', 'warm_start', 'optimize', 'visualize'
+)
+
+# Empty grids solved by a native engine of the puzzle, a share of the
+# solution is then revealed as fixed cells
+SYNTHETIC_GRIDS = (
+    ('Binox', 'bitboard', {'shape': [12, 12], 'symbol_number': 2, 'fixed': []}),
+    ('Binox', 'bitboard', {'shape': [16, 16], 'symbol_number': 2, 'fixed': []}),
+    ('Troix', 'search', {'shape': [12, 12], 'symbol_number': 2, 'fixed': []}),
+    ('Troix', 'search', {'shape': [18, 18], 'symbol_number': 2, 'fixed': []}),
+    ('Sudoku', 'dlx', {'shape': 16, 'fixed_cells': []}),
+)
+
+# Libraries slow to import, reported when a puzzle class loads them
+HEAVY_MODULES = ('mip', 'networkx', 'ortools', 'rich', 'highspy')
+
+# Run in a fresh interpreter: seconds to load a puzzle class as main.py does
+# and the heavy libraries it imported
+IMPORT_SCRIPT = '''
+import json, sys, time
+start_time = time.perf_counter()
+import src.utils, src.puzzles
+getattr(src.puzzles, sys.argv[1])
+print(json.dumps({
+    'time': time.perf_counter() - start_time,
+    'modules': [name for name in sys.argv[2:] if name in sys.modules]
+}))
+'''
+
+
+def read_board(puzzle_name: str, model) -> tuple[str, list[dict]]:
+    # Solved cells of the model as fixed cells, with the data key holding them
+    if puzzle_name == 'Sudoku':
+        return 'fixed_cells', [
+            {'row': row, 'col': col, 'val': [round(var.x) for var in values].index(1) + 1}
+            for row, cols in enumerate(model.x_vars)
+            for col, values in enumerate(cols)
+        ]
+    symbols = {
+        'Binox': [('X', 'x_vars')],
+        'Troix': [('X', 'x_vars'), ('O', 'o_vars'), ('I', 'i_vars')]
+    }[puzzle_name]
+    cells = []
+    for row in range(model.data.shape[0]):
+        for col in range(model.data.shape[1]):
+            val = next((symbol for symbol, name in symbols if getattr(model, name)[row][col].x == 1), 'O')
+            cells.append({'row': row, 'col': col, 'val': val})
+    return 'fixed', cells
+
+
+def make_synthetic_puzzles(folder: Path, reveal: float = 0.4, seed: int = 0) -> list[tuple[str, str]]:
+    import src.puzzles as puzzles
+
+    generator = random.Random(seed)
+    entries = []
+    for puzzle_name, engine, data in SYNTHETIC_GRIDS:
+        shape = data['shape'] if isinstance(data['shape'], list) else [data['shape']] * 2
+        path = folder / f"{puzzle_name.lower()}_{'x'.join(map(str, shape))}.json"
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        model = getattr(puzzles, puzzle_name)(path, engine=engine)
+        model.init_model()
+        model.solve()
+        key, cells = read_board(puzzle_name, model)
+        with open(path, 'w') as f:
+            json.dump({**data, key: generator.sample(cells, round(reveal * len(cells)))}, f)
+        entries.append((puzzle_name, str(path)))
+    return entries
+
+
+class Benchmark:
+
+    def __init__(
+        self, repetitions: int = 3, engines: dict | None = None, templates: bool = False, **options
+    ) -> None:
+        from src.model import TemplateCache
+
+        self.repetitions = repetitions
+        # Engine by puzzle class name, 'mip' if missing
+        self.engines = engines or {}
+        # Keyword arguments passed to every puzzle model, e.g. presolve=True
+        self.options = options
+        # Repetitions after the first reuse the model of the puzzle shape
+        self.templates = TemplateCache() if templates else None
+        return None
+
+    def run_once(self, puzzle_name: str, path: str) -> dict:
+        import src.puzzles as puzzles
+
+        model = getattr(puzzles, puzzle_name)(
+            Path(path), engine=self.engines.get(puzzle_name, 'mip'), templates=self.templates, **self.options
+        )
+        model.init_model()
+        model.solve()
+        phase_start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.visualize()
+        model.record_timing('visualize', phase_start)
+        return model.stats.to_dict()
+
+    def run_puzzle(self, puzzle_name: str, path: str, label: str | None = None) -> dict:
+        result = {'path': label or path, 'puzzle': puzzle_name}
+        runs = []
+        try:
+            for _ in range(self.repetitions):
+                runs.append(self.run_once(puzzle_name, path))
+            result['status'] = 'solved'
+        except ValueError as error:
+            result['status'] = 'failed'
+            result['error'] = str(error)
+            return result
+        except Exception as error:
+            result['status'] = 'error'
+            result['error'] = f'{type(error).__name__}: {error}'
+            return result
+        result.update({key: runs[-1][key] for key in ['vars', 'constrs', 'nonzeros', 'counters']})
+        # Best and mean seconds of every phase, best is the steadiest to compare
+        result['timings'] = {}
+        for phase in PHASES + ('total',):
+            if phase == 'total':
+                times = [run['total_time'] for run in runs]
+            elif any(phase in run['timings'] for run in runs):
+                # Runs reusing a template skip the build phases
+                times = [run['timings'].get(phase, 0.0) for run in runs]
+            else:
+                continue
+            result['timings'][phase] = {
+                'min': round(min(times), 6), 'mean': round(statistics.mean(times), 6)
+            }
+        return result
+
+    def run(self, puzzles: list[tuple[str | None, str]], synthetic: bool = False, progress=None) -> dict:
+        results = {
+            'repetitions': self.repetitions, 'engines': self.engines, 'options': self.options,
+            'templates': self.templates is not None, 'puzzles': []
+        }
+        with tempfile.TemporaryDirectory() as folder:
+            entries = [(name, path, None) for name, path in puzzles]
+            if synthetic:
+                entries += [
+                    (name, path, f'synthetic/{Path(path).name}')
+                    for name, path in make_synthetic_puzzles(Path(folder))
+                ]
+            for puzzle_name, path, label in entries:
+                if puzzle_name is None:
+                    result = {'path': path, 'puzzle': None, 'status': 'error', 'error': 'Can not infer puzzle type from path'}
+                else:
+                    result = self.run_puzzle(puzzle_name, path, label)
+                results['puzzles'].append(result)
+                if progress is not None:
+                    progress(result)
+        return results
+
+
+def measure_imports(puzzle_names: list[str], repetitions: int = 3, budget: float | None = None) -> dict:
+    # Cold start cost of every puzzle, each run in a new process so nothing
+    # is imported yet. Puzzles whose best time is over budget (seconds) are
+    # listed in over_budget.
+    results = {'repetitions': repetitions, 'budget': budget, 'imports': [], 'over_budget': []}
+    for puzzle_name in puzzle_names:
+        runs = []
+        for _ in range(repetitions):
+            output = subprocess.run(
+                [sys.executable, '-c', IMPORT_SCRIPT, puzzle_name, *HEAVY_MODULES],
+                cwd=Path(__file__).absolute().parents[2], capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output))
+        times = [run['time'] for run in runs]
+        results['imports'].append({
+            'puzzle': puzzle_name, 'min': round(min(times), 6), 'mean': round(statistics.mean(times), 6),
+            'modules': runs[-1]['modules']
+        })
+        if budget is not None and min(times) > budget:
+            results['over_budget'].append(puzzle_name)
+    return results
+
+
+def compare_results(results: dict, baseline: dict, threshold: float = 0.2, min_time: float = 0.005) -> list[dict]:
+    # Phases whose best time grew more than threshold (a fraction) over the
+    # baseline. Phases faster than min_time in both runs are timer noise.
+    baseline_results = {(result['puzzle'], result['path']): result for result in baseline['puzzles']}
+    regressions = []
+    for result in results['puzzles']:
+        previous = baseline_results.get((result['puzzle'], result['path']))
+        if previous is None or 'timings' not in result or 'timings' not in previous:
+            continue
+        for phase, timing in result['timings'].items():
+            if phase not in previous['timings']:
+                continue
+            current, reference = timing['min'], previous['timings'][phase]['min']
+            if max(current, reference) < min_time or current <= reference * (1 + threshold):
+                continue
+            regressions.append({
+                'puzzle': result['puzzle'], 'path': result['path'], 'phase': phase,
+                'baseline': reference, 'current': current,
+                'ratio': round(current / reference, 2) if reference > 0 else None
+            })
+    return regressions
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import signal
+import time
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, urlsplit
+
+from .batch import solve_data, warm_up_worker
+
+
+def get_worker_id() -> int:
+    return os.getpid()
+
+
+class SolveService:
+    # Long lived solver behind an asyncio HTTP front end, on TCP or a Unix
+    # socket, one request per connection:
+    #   POST /solve/<P>  body is the puzzle data (schema of ./data/<type>/),
+    #                    P a short (SB) or class (StarBattle) puzzle name,
+    #                    ?timeout=<seconds> overrides the default deadline
+    #   GET /stats       queue depth, counts and latency percentiles
+    # At most workers + queue_size solves are queued or running, the next
+    # requests get 503 until one ends. One dispatcher per worker process hands
+    # it the next solve once its previous one ended, so a request past its
+    # deadline (504) or whose client went away is dropped while queued. A
+    # running solve gets the time left to its deadline as its solver time
+    # limit. If it is still running GRACE_PERIOD seconds after its request was
+    # dropped, e.g. while building the model, its worker is killed and a new
+    # one takes its place.
+    STATUS_CODES = {'solved': 200, 'failed': 422, 'error': 500, 'timeout': 504}
+    REASONS = {
+        200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+        413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error',
+        503: 'Service Unavailable', 504: 'Gateway Timeout'
+    }
+    PERCENTILES = (50, 90, 99)
+    MAX_BODY_SIZE = 16 * 1024 * 1024
+    GRACE_PERIOD = 1.0
+
+    def __init__(
+        self, workers: int | None = None, queue_size: int = 64, timeout: float = 30.0,
+        cache_path: str | None = None, cache_size: int = 64 * 1024 * 1024,
+        engines: dict | None = None, stats: bool = False, templates: bool = False, latency_window: int = 1000,
+        **options
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        # Default deadline of a request in seconds
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        # Engine by puzzle class name, 'mip' if missing
+        self.engines = engines or {}
+        # Add the stats of every model to its result
+        self.stats = stats
+        # Keep a template cache in every worker
+        self.templates = templates
+        # Keyword arguments passed to every puzzle model, e.g. presolve=True
+        self.options = options
+        # Single process executor of every worker
+        self.executors = []
+        self.queue = None
+        self.dispatchers = []
+        # Solves queued or running, and running on a worker
+        self.admitted = 0
+        self.running = 0
+        self.counts = {
+            'solved': 0, 'failed': 0, 'error': 0, 'timeout': 0, 'cancelled': 0, 'rejected': 0, 'recycled': 0
+        }
+        # Seconds from request to response of the last solves
+        self.latencies = deque(maxlen=latency_window)
+        return None
+
+    async def start(self) -> None:
+        workers = await asyncio.gather(*[self.start_worker() for _ in range(self.workers)])
+        self.executors = [executor for executor, _ in workers]
+        self.queue = asyncio.Queue()
+        self.dispatchers = [
+            asyncio.create_task(self.dispatch(index, executor, pid)) for index, (executor, pid) in enumerate(workers)
+        ]
+        return None
+
+    async def start_worker(self) -> tuple[ProcessPoolExecutor, int]:
+        # Not forked from this process, its other executors run threads
+        executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context('forkserver'),
+            initializer=warm_up_worker,
+            initargs=(self.cache_path, self.cache_size, self.options, self.engines, self.stats, self.templates)
+        )
+        # The first task starts the process, it runs warm_up_worker() before
+        pid = await asyncio.get_running_loop().run_in_executor(executor, get_worker_id)
+        return executor, pid
+
+    async def dispatch(self, index: int, executor: ProcessPoolExecutor, pid: int) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            puzzle_name, data, result, deadline = await self.queue.get()
+            # Deadline passed or client gone while queued
+            if result.done():
+                self.admitted -= 1
+                continue
+            self.running += 1
+            try:
+                solving = loop.run_in_executor(
+                    executor, solve_data, puzzle_name, data, deadline - time.perf_counter()
+                )
+                await asyncio.wait({solving, result}, return_when=asyncio.FIRST_COMPLETED)
+                if not solving.done():
+                    await asyncio.wait({solving}, timeout=self.GRACE_PERIOD)
+                if not solving.done():
+                    os.kill(pid, signal.SIGKILL)
+                try:
+                    output = await solving
+                except BrokenProcessPool as error:
+                    # Killed above or crashed
+                    output = error
+                    executor.shutdown(wait=False)
+                    executor, pid = await self.start_worker()
+                    self.executors[index] = executor
+                    self.counts['recycled'] += 1
+                except Exception as error:
+                    output = error
+                if not result.done():
+                    if isinstance(output, Exception):
+                        result.set_exception(output)
+                    else:
+                        result.set_result(output)
+            finally:
+                self.running -= 1
+                self.admitted -= 1
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8000, unix_path: str | None = None) -> None:
+        await self.start()
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for dispatcher in self.dispatchers:
+                dispatcher.cancel()
+            for executor in self.executors:
+                executor.shutdown(wait=False, cancel_futures=True)
+        return None
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            response = await self.handle_request(reader)
+            if response is not None:
+                writer.write(self.make_response(*response))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+        return None
+
+    async def handle_request(self, reader: asyncio.StreamReader) -> tuple[int, dict] | None:
+        # None when the client went away before its response
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            return 400, {'error': 'Malformed request line'}
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if len(line) == 0:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        if parts == ['stats']:
+            if method != 'GET':
+                return 405, {'error': 'Use GET /stats'}
+            return 200, self.get_stats()
+        if len(parts) != 2 or parts[0] != 'solve':
+            return 404, {'error': f'No route {url.path}, use POST /solve/<puzzle> or GET /stats'}
+        if method != 'POST':
+            return 405, {'error': 'Use POST /solve/<puzzle>'}
+        try:
+            size = int(headers.get('content-length', 0))
+        except ValueError:
+            return 400, {'error': 'Content-Length is not a number'}
+        if size > self.MAX_BODY_SIZE:
+            return 413, {'error': f'Puzzle data over {self.MAX_BODY_SIZE} bytes'}
+        body = await reader.readexactly(size)
+        query = parse_qs(url.query)
+        try:
+            timeout = float(query['timeout'][0]) if 'timeout' in query else self.timeout
+        except ValueError:
+            return 400, {'error': f"Timeout {query['timeout'][0]} is not a number"}
+        if timeout <= 0:
+            return 400, {'error': 'Timeout must be positive'}
+        return await self.solve(parts[1], body, timeout, reader)
+
+    async def solve(
+        self, puzzle: str, body: bytes, timeout: float, reader: asyncio.StreamReader
+    ) -> tuple[int, dict] | None:
+        from src.puzzles import PUZZLE_NAME
+
+        puzzle_name = PUZZLE_NAME.get(puzzle, puzzle)
+        if puzzle_name not in PUZZLE_NAME.values():
+            return 404, {'error': f'Puzzle {puzzle} is not supported, use one of {list(PUZZLE_NAME.keys())}'}
+        try:
+            data = json.loads(body)
+        except ValueError as error:
+            return 400, {'error': f'Puzzle data is not JSON: {error}'}
+        if not isinstance(data, dict):
+            return 400, {'error': 'Puzzle data must be a JSON object'}
+        if self.admitted >= self.workers + self.queue_size:
+            self.counts['rejected'] += 1
+            return 503, {'error': 'Queue is full, retry later', 'queue_depth': self.queue.qsize()}
+        start_time = time.perf_counter()
+        solving = asyncio.get_running_loop().create_future()
+        self.admitted += 1
+        self.queue.put_nowait((puzzle_name, data, solving, start_time + timeout))
+        closing = asyncio.ensure_future(self.wait_closed(reader))
+        done, _ = await asyncio.wait({solving, closing}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        closing.cancel()
+        if solving in done:
+            try:
+                result = solving.result()
+            except Exception as error:
+                # The worker crashed, e.g. out of memory
+                self.counts['error'] += 1
+                return 500, {'puzzle': puzzle_name, 'status': 'error', 'error': f'{type(error).__name__}: {error}'}
+            self.counts[result['status']] += 1
+            self.latencies.append(time.perf_counter() - start_time)
+            return self.STATUS_CODES[result['status']], {'puzzle': puzzle_name, **result}
+        # The dispatcher skips it if still queued
+        solving.cancel()
+        if closing in done:
+            self.counts['cancelled'] += 1
+            return None
+        self.counts['timeout'] += 1
+        self.latencies.append(time.perf_counter() - start_time)
+        return 504, {'puzzle': puzzle_name, 'status': 'timeout', 'error': f'No solution within {timeout}s'}
+
+    async def wait_closed(self, reader: asyncio.StreamReader) -> None:
+        # Ends once the client closes its side. Bytes sent after the body,
+        # e.g. a pipelined request, are read and dropped, one request per
+        # connection is answered.
+        while len(await reader.read(4096)) > 0:
+            pass
+        return None
+
+    def get_stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            'workers': self.workers, 'queue_size': self.queue_size, 'running': self.running,
+            'queue_depth': self.queue.qsize(), 'counts': dict(self.counts),
+            'latency': {
+                f'p{percentile}': round(latencies[math.ceil(percentile / 100 * len(latencies)) - 1], 6)
+                for percentile in self.PERCENTILES
+            } if len(latencies) else {}
+        }
+
+    def make_response(self, status: int, body: dict) -> bytes:
+        payload = json.dumps(body).encode('utf-8')
+        headers = [
+            f'HTTP/1.1 {status} {self.REASONS[status]}',
+            'Content-Type: application/json',
+            f'Content-Length: {len(payload)}',
+            'Connection: close'
+        ]
+        if status == 503:
+            headers.append('Retry-After: 1')
+        return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + payload
@@ -1,8 +1,12 @@
 from .colors import Backgrounds, Colors
 from .data_io import DataIO
 from .data_model import DataModel
+from .grid_renderer import GridRenderer
 from .enumeration import (
     Mirror,
     Monster,
     Position
 )
+from .profiler import Profiler
+from .solution import Solution
+from .solution_cache import SolutionCache
@@ -0,0 +1,104 @@
+import sys
+
+from .colors import Colors
+
+
+class GridRenderer:
+    # Draws a board of cells between lines of nodes and edges:
+    #   +---+---+   node, horizontal edge, node, ...
+    #   | X | O |   vertical edge, cell, vertical edge, ...
+    # Nodes and vertical edges are 1 character wide, cells and horizontal
+    # edges 3. Every piece is a key of a table of (text, style) pairs drawn
+    # once for the mode: 'ansi' wraps the text in its style, 'plain' keeps
+    # the text, 'none' draws nothing. Lines of a board are joined in one
+    # buffer and written at once.
+    MODES = ('ansi', 'plain', 'none')
+    # Pieces between the cells, border ones for edges on a border and the
+    # nodes they meet
+    STYLES = {
+        'node': ('+', Colors.GRAY),
+        'h_edge': ('---', Colors.GRAY),
+        'v_edge': ('|', Colors.GRAY),
+        'border_node': ('+', Colors.BOLD + Colors.PURPLE),
+        'border_h_edge': ('---', Colors.BOLD + Colors.PURPLE),
+        'border_v_edge': ('|', Colors.BOLD + Colors.PURPLE),
+        'empty': ('   ', '')
+    }
+
+    def __init__(self, styles: dict | None = None, mode: str = 'ansi') -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"Render mode {mode} is not supported, use one of {self.MODES}.")
+        self.mode = mode
+        self.pieces = {key: self.paint(text, style) for key, (text, style) in {**self.STYLES, **(styles or {})}.items()}
+        return None
+
+    def paint(self, text: str, style: str) -> str:
+        if self.mode == 'ansi' and style:
+            return f'{style}{text}{Colors.ENDC}'
+        return text
+
+    @staticmethod
+    def get_region_borders(regions: list[list]) -> tuple[list[list[bool]], list[list[bool]]]:
+        # Borders around the board and between cells of different regions
+        rows, cols = len(regions), len(regions[0])
+        h_borders = [
+            [row == 0 or row == rows or regions[row][col] != regions[row - 1][col] for col in range(cols)]
+            for row in range(rows + 1)
+        ]
+        v_borders = [
+            [col == 0 or col == cols or regions[row][col] != regions[row][col - 1] for col in range(cols + 1)]
+            for row in range(rows)
+        ]
+        return h_borders, v_borders
+
+    def render(
+        self, cells: list[list], h_borders: list[list[bool]], v_borders: list[list[bool]], marks: dict | None = None
+    ) -> list[str]:
+        # cells[row][col] is the key of a cell, h_borders[row][col] tells if
+        # the edge above cell (row, col) is a border (row up to the number of
+        # rows), v_borders[row][col] the edge on its left. marks gives keys
+        # drawn instead of the pieces off the borders, by ('node', row, col),
+        # ('h_edge', row, col) or ('v_edge', row, col).
+        pieces = self.pieces
+        node, h_edge, v_edge = pieces['node'], pieces['h_edge'], pieces['v_edge']
+        border_node, border_h_edge, border_v_edge = pieces['border_node'], pieces['border_h_edge'], pieces['border_v_edge']
+        rows, cols = len(cells), len(cells[0])
+        marked = {}
+        for (kind, row, col), key in (marks or {}).items():
+            marked.setdefault((kind, row), []).append((col, pieces[key]))
+        no_borders = [False] * (cols + 1)
+        lines = []
+        for row in range(rows + 1):
+            h_row = h_borders[row]
+            # A node is on a border if one of its 4 edges is
+            node_flags = [
+                left or right or up or down for left, right, up, down in zip(
+                    [False] + h_row, h_row + [False],
+                    v_borders[row - 1] if row > 0 else no_borders, v_borders[row] if row < rows else no_borders
+                )
+            ]
+            nodes = [border_node if flag else node for flag in node_flags]
+            edges = [border_h_edge if flag else h_edge for flag in h_row]
+            for col, piece in marked.get(('node', row), []):
+                if not node_flags[col]:
+                    nodes[col] = piece
+            for col, piece in marked.get(('h_edge', row), []):
+                if not h_row[col]:
+                    edges[col] = piece
+            lines.append(''.join([piece for pair in zip(nodes, edges) for piece in pair]) + nodes[-1])
+            if row == rows:
+                break
+            v_row = v_borders[row]
+            edges = [border_v_edge if flag else v_edge for flag in v_row]
+            for col, piece in marked.get(('v_edge', row), []):
+                if not v_row[col]:
+                    edges[col] = piece
+            lines.append(''.join([
+                piece for pair in zip(edges, [pieces[key] for key in cells[row]]) for piece in pair
+            ]) + edges[-1])
+        return lines
+
+    def write(self, lines: list[str], file=None) -> None:
+        if self.mode != 'none':
+            (file or sys.stdout).write('\n'.join(lines) + '\n')
+        return None
@@ -0,0 +1,60 @@
+import cProfile
+import functools
+import tracemalloc
+
+from pathlib import Path
+
+
+class Profiler:
+    # Runs model phases under cProfile and/or tracemalloc. Every call of a
+    # phase writes <name>.<phase>.pstats (read with pstats or snakeviz) and
+    # <name>.<phase>.memory.txt with the peak memory and the top allocating
+    # lines, next to the tracemalloc snapshot <name>.<phase>.snapshot.
+    PHASES = ('init_model', 'solve', 'visualize')
+    TOP_LINES = 25
+
+    def __init__(self, path: Path, cpu: bool = True, memory: bool = False) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.cpu = cpu
+        self.memory = memory
+        # Files written so far
+        self.outputs = []
+        return None
+
+    def wrap(self, name: str, phase: str, method):
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            return self.run(name, phase, method, *args, **kwargs)
+        return profiled
+
+    def run(self, name: str, phase: str, method, *args, **kwargs):
+        prefix = self.path / f'{name}.{phase}'
+        # Another phase may already trace, e.g. solve() called in init_model()
+        trace_memory = self.memory and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+        profile = cProfile.Profile() if self.cpu else None
+        if profile is not None:
+            profile.enable()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(f'{prefix}.pstats')
+                self.outputs.append(Path(f'{prefix}.pstats'))
+            if trace_memory:
+                self.write_memory(prefix)
+                tracemalloc.stop()
+
+    def write_memory(self, prefix: Path) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        snapshot.dump(f'{prefix}.snapshot')
+        with open(f'{prefix}.memory.txt', 'w') as f:
+            f.write(f'peak: {peak} B\ncurrent: {current} B\n')
+            for statistic in snapshot.statistics('lineno')[:self.TOP_LINES]:
+                f.write(f'{statistic}\n')
+        self.outputs += [Path(f'{prefix}.memory.txt'), Path(f'{prefix}.snapshot')]
+        return None
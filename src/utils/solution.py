@@ -0,0 +1,103 @@
+import json
+import struct
+import sys
+
+from array import array
+
+
+class Solution:
+    # Solved board of a puzzle, kept without the solver model: the value of
+    # every cell in one flat array (row by row, EMPTY for cells without one,
+    # e.g. mirrors), symbols[value] is the symbol of a value when values
+    # stand for symbols (Binox X and O), and the lines of loop puzzles as
+    # edges between grid points, each (point, point) with the smaller point
+    # first.
+    EMPTY = -1
+    # Size of the JSON metadata at the start of to_bytes()
+    HEADER = struct.Struct('<I')
+
+    def __init__(
+        self, puzzle: str, shape: tuple[int, int], cells: list[int] | None = None,
+        symbols: tuple[str, ...] | None = None, edges: list[tuple[tuple, tuple]] | None = None
+    ) -> None:
+        self.puzzle = puzzle
+        self.shape = (shape[0], shape[1])
+        if cells is None:
+            cells = [self.EMPTY] * (self.shape[0] * self.shape[1])
+        if len(cells) != self.shape[0] * self.shape[1]:
+            raise ValueError(f"Solution of shape {self.shape} has {len(cells)} cells.")
+        self.cells = array('h', cells)
+        self.symbols = tuple(symbols) if symbols else None
+        self.edges = frozenset(
+            (point, other) if point <= other else (other, point) for point, other in edges or []
+        )
+        return None
+
+    def __getitem__(self, cell: tuple[int, int]) -> int:
+        return self.cells[cell[0] * self.shape[1] + cell[1]]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Solution):
+            return NotImplemented
+        return (
+            (self.puzzle, self.shape, self.cells, self.symbols, self.edges)
+            == (other.puzzle, other.shape, other.cells, other.symbols, other.edges)
+        )
+
+    def get_symbol(self, cell: tuple[int, int]) -> str | None:
+        value = self[cell]
+        if value == self.EMPTY:
+            return None
+        return self.symbols[value] if self.symbols else str(value)
+
+    def get_rows(self) -> list[list[int]]:
+        width = self.shape[1]
+        return [self.cells[row * width:(row + 1) * width].tolist() for row in range(self.shape[0])]
+
+    def has_edge(self, point: tuple[int, int], other: tuple[int, int]) -> bool:
+        return (min(point, other), max(point, other)) in self.edges
+
+    def to_dict(self) -> dict:
+        result = {'puzzle': self.puzzle, 'shape': list(self.shape), 'cells': self.get_rows()}
+        if self.symbols:
+            result['symbols'] = list(self.symbols)
+        if self.edges:
+            result['edges'] = [[*point, *other] for point, other in sorted(self.edges)]
+        return result
+
+    @classmethod
+    def from_dict(cls, values: dict) -> 'Solution':
+        return cls(
+            values['puzzle'], values['shape'], [cell for row in values['cells'] for cell in row],
+            values.get('symbols'), [((edge[0], edge[1]), (edge[2], edge[3])) for edge in values.get('edges', [])]
+        )
+
+    def to_bytes(self) -> bytes:
+        # Header, JSON metadata, then the cells and the edges (4 coordinates
+        # each) as little endian int16
+        edges = array('h', [value for point, other in sorted(self.edges) for value in (*point, *other)])
+        metadata = json.dumps({
+            'puzzle': self.puzzle, 'shape': self.shape, 'symbols': self.symbols, 'edges': len(self.edges)
+        }).encode('utf-8')
+        cells = array('h', self.cells)
+        if sys.byteorder == 'big':
+            cells.byteswap()
+            edges.byteswap()
+        return self.HEADER.pack(len(metadata)) + metadata + cells.tobytes() + edges.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Solution':
+        start = cls.HEADER.size + cls.HEADER.unpack_from(data)[0]
+        metadata = json.loads(data[cls.HEADER.size:start])
+        values = array('h')
+        values.frombytes(data[start:])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        size = metadata['shape'][0] * metadata['shape'][1]
+        edges = values[size:]
+        if len(edges) != 4 * metadata['edges']:
+            raise ValueError(f"Solution data has {len(edges)} edge values, not {4 * metadata['edges']}.")
+        return cls(
+            metadata['puzzle'], metadata['shape'], values[:size], metadata['symbols'],
+            [((edges[i], edges[i + 1]), (edges[i + 2], edges[i + 3])) for i in range(0, len(edges), 4)]
+        )
@@ -0,0 +1,123 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+
+from pathlib import Path
+
+
+class SolutionCache:
+    # Total size and number of entries are kept in an index file, updated
+    # by every put(). Entries are only scanned when the total goes over
+    # max_size, eviction then goes down to LOW_WATERMARK of it so the next
+    # scan waits for many puts.
+    LOW_WATERMARK = 0.9
+
+    def __init__(self, path: Path, max_size: int = 64 * 1024 * 1024) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        return None
+
+    @classmethod
+    def make_key(cls, puzzle_name: str, data: dict) -> str:
+        payload = json.dumps(
+            {'puzzle': puzzle_name, 'data': data}, sort_keys=True, separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / f'{key}.json'
+
+    def get(self, key: str) -> dict | None:
+        entry_path = self.get_entry_path(key)
+        try:
+            with open(entry_path, 'r') as f:
+                solution = json.load(f)
+            # Touch the entry so eviction sees it as recently used
+            os.utime(entry_path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return solution
+
+    def put(self, key: str, solution: dict) -> None:
+        entry_path = self.get_entry_path(key)
+        entry_path.parent.mkdir(exist_ok=True)
+        # Write to a temporary file then rename, readers in other processes
+        # only ever see a complete entry.
+        fd, temp_path = tempfile.mkstemp(dir=entry_path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(solution, f, separators=(',', ':'))
+        size = os.path.getsize(temp_path)
+        try:
+            old_size = entry_path.stat().st_size
+        except FileNotFoundError:
+            old_size = None
+        os.replace(temp_path, entry_path)
+        if old_size is None:
+            self.update_index(size, 1)
+        else:
+            self.update_index(size - old_size, 0)
+        return None
+
+    def update_index(self, size: int, entries: int) -> None:
+        # Adds to the totals of the index, O(1) unless they go over max_size
+        with open(self.path / '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            index = self.read_index()
+            if index is None:
+                # First put of the folder, or an unreadable index
+                index = self.evict()
+            else:
+                index = {'size': index['size'] + size, 'entries': index['entries'] + entries}
+                if index['size'] > self.max_size:
+                    index = self.evict()
+            self.write_index(index)
+        return None
+
+    def read_index(self) -> dict | None:
+        try:
+            with open(self.path / '.index', 'r') as f:
+                index = json.load(f)
+            return {'size': int(index['size']), 'entries': int(index['entries'])}
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+
+    def write_index(self, index: dict) -> None:
+        with open(self.path / '.index', 'w') as f:
+            json.dump(index, f)
+        return None
+
+    def evict(self) -> dict:
+        # Scans every entry and removes the least recently used ones while
+        # the total is over the low watermark, with the lock held. Exact
+        # totals of what is left.
+        entries = []
+        total_size = 0
+        for entry_path in self.path.glob('*/*.json'):
+            try:
+                entry_stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((entry_stat.st_mtime_ns, entry_stat.st_size, entry_path))
+            total_size += entry_stat.st_size
+        number = len(entries)
+        if total_size > self.max_size:
+            for _, size, entry_path in sorted(entries):
+                if total_size <= self.max_size * self.LOW_WATERMARK:
+                    break
+                try:
+                    entry_path.unlink()
+                except FileNotFoundError:
+                    pass
+                total_size -= size
+                number -= 1
+        return {'size': total_size, 'entries': number}
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, **(self.read_index() or {})}
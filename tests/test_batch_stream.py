@@ -0,0 +1,76 @@
+import io
+import json
+
+from pathlib import Path
+
+from src.runner import BatchSolver
+
+DATA = Path(__file__).parents[1] / 'data'
+
+
+def make_lines() -> list[str]:
+    # A slow puzzle ahead of fast ones, a blank line and a bad record
+    records = [
+        {'puzzle': 'G', 'data': json.loads((DATA / 'galaxies' / 'puzzle_3.json').read_text()), 'id': 'slow'},
+        *[
+            {'puzzle': 'Sudoku', 'data': json.loads((DATA / 'sudoku' / 'puzzle_1.json').read_text()), 'id': index}
+            for index in range(4)
+        ]
+    ]
+    lines = [json.dumps(record) + '\n' for record in records]
+    return lines[:2] + ['\n', '{"puzzle": "Nope", "data": {}}\n'] + lines[2:]
+
+
+def test_ordered_stream_keeps_input_order():
+    output = io.StringIO()
+    summary = BatchSolver(workers=2).stream(make_lines(), output, ordered=True)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [result['line'] for result in results] == [1, 2, 4, 5, 6, 7]
+    assert [result.get('id') for result in results] == ['slow', 0, None, 1, 2, 3]
+    assert [result['status'] for result in results] == ['solved', 'solved', 'error', 'solved', 'solved', 'solved']
+    assert (summary['total'], summary['solved'], summary['error']) == (6, 5, 1)
+
+
+def test_unordered_stream_writes_every_result():
+    output = io.StringIO()
+    BatchSolver(workers=2).stream(make_lines(), output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(result['line'] for result in results) == [1, 2, 4, 5, 6, 7]
+
+
+class Recorder(io.StringIO):
+    # Lines read ahead of the results written, at every write
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.read_number = 0
+        self.read_ahead = []
+        return None
+
+    def write(self, text: str) -> int:
+        self.read_ahead.append(self.read_number - self.getvalue().count('\n'))
+        return super().write(text)
+
+
+def test_stream_reads_at_most_window_records_ahead():
+    output = Recorder()
+
+    def read_lines():
+        for line in make_lines():
+            output.read_number += 1
+            yield line
+
+    BatchSolver(workers=1).stream(read_lines(), output, ordered=True, window=2)
+    assert len(output.read_ahead) == 6
+    # The blank line is read but never written
+    assert max(output.read_ahead) <= 2 + 1
+
+
+def test_summary_counts_every_status():
+    solver = BatchSolver(workers=1, cache_path='cache')
+    summary = solver.make_summary()
+    for status, cache in [('solved', 'hit'), ('failed', 'miss'), ('error', None), ('timeout', 'miss')]:
+        solver.record_result(summary, {'status': status, **({'cache': cache} if cache else {})})
+    assert summary == {
+        'total': 4, 'solved': 1, 'failed': 1, 'error': 1, 'timeout': 1, 'cache': {'hit': 1, 'miss': 2}
+    }
@@ -0,0 +1,52 @@
+import json
+
+from pathlib import Path
+
+import pytest
+
+from src.engines import BinoxBitboard
+from src.puzzles import Binox
+
+PUZZLES = sorted((Path(__file__).parents[1] / 'data' / 'binox').glob('*.json'))
+
+
+def check_board(board: list[list[int]], symbol_number: int, fixed_cells: dict) -> None:
+    for lines in [board, [list(column) for column in zip(*board)]]:
+        assert len(set(map(tuple, lines))) == len(lines)
+        for line in lines:
+            assert 2 * sum(line) == len(line)
+            for start in range(len(line) - symbol_number):
+                assert len(set(line[start: start + symbol_number + 1])) > 1
+    for (row, col), val in fixed_cells.items():
+        assert board[row][col] == int(val == 'X')
+    return None
+
+
+@pytest.mark.parametrize('path', PUZZLES, ids=lambda path: path.stem)
+def test_bitboard_matches_mip(path):
+    model = Binox(path, engine='bitboard')
+    model.init_model()
+    model.solve()
+    solution = model.get_solution()
+    fixed_cells = {(cell['row'], cell['col']): cell['val'] for cell in model.data.fixed}
+    check_board(solution.get_rows(), model.data.symbol_number, fixed_cells)
+    mip_model = Binox(path)
+    mip_model.init_model()
+    mip_model.solve()
+    if mip_model.check_unique()['status'] == 'unique':
+        assert solution == mip_model.get_solution()
+
+
+@pytest.mark.parametrize('length', [6, 10, 20, 26])
+def test_count_line_patterns(length):
+    assert BinoxBitboard.count_line_patterns(length, 2) == len(BinoxBitboard([length, length], 2, {}).patterns[length])
+
+
+def test_large_grid_falls_back_to_mip(tmp_path):
+    assert BinoxBitboard.can_enumerate([26, 26], 2)
+    assert not BinoxBitboard.can_enumerate([28, 28], 2)
+    path = tmp_path / 'binox.json'
+    path.write_text(json.dumps({'shape': [28, 28], 'symbol_number': 2, 'fixed': []}))
+    model = Binox(path, engine='bitboard')
+    assert model.engine == 'mip'
+    assert model.stats.counters['engine_fallback'] == 1
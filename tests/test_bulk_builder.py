@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import mip
+import pytest
+
+from src.model.bulk_builder import BulkBuilder
+from src.puzzles import Binox, Galaxies, Sudoku
+
+DATA = Path(__file__).parents[1] / 'data'
+
+
+@pytest.mark.parametrize('puzzle,path', [
+    (Sudoku, DATA / 'sudoku' / 'puzzle_1.json'),
+    (Binox, DATA / 'binox' / 'puzzle_2.json'),
+    (Galaxies, DATA / 'galaxies' / 'puzzle_2.json'),
+], ids=lambda value: getattr(value, '__name__', None) or value.stem)
+def test_raw_and_api_build_the_same_model(monkeypatch, puzzle, path):
+    models = []
+    for raw_versions in [BulkBuilder.RAW_VERSIONS, ()]:
+        monkeypatch.setattr(BulkBuilder, 'RAW_VERSIONS', raw_versions)
+        model = puzzle(path, backend='cbc')
+        model.init_model()
+        assert model.builder.is_raw == (raw_versions != ())
+        model.solve()
+        models.append(model)
+    raw_model, api_model = models
+    assert raw_model._model.num_cols == api_model._model.num_cols
+    assert raw_model._model.num_rows == api_model._model.num_rows
+    assert raw_model.get_solution() == api_model.get_solution()
+
+
+def test_raw_path_needs_cbc_and_a_checked_version(monkeypatch):
+    assert BulkBuilder.can_use_raw(mip.Model(solver_name=mip.CBC))
+    monkeypatch.setattr(mip, '__version__', '2.0.0')
+    assert not BulkBuilder.can_use_raw(mip.Model(solver_name=mip.CBC))
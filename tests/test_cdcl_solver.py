@@ -0,0 +1,110 @@
+import itertools
+import random
+
+import mip
+import pytest
+
+from src.engines import CdclSolver
+from src.model import SatModel
+
+
+def make_solver(var_number: int, clauses: list[list[int]]) -> CdclSolver:
+    solver = CdclSolver(var_number)
+    for clause in clauses:
+        solver.add_clause(clause)
+    return solver
+
+
+def is_satisfied(clauses: list[list[int]], values: list[bool]) -> bool:
+    return all(any(values[abs(literal)] == (literal > 0) for literal in clause) for clause in clauses)
+
+
+def brute_force(var_number: int, clauses: list[list[int]]) -> bool:
+    return any(
+        is_satisfied(clauses, [False, *values]) for values in itertools.product([False, True], repeat=var_number)
+    )
+
+
+def pigeonhole(pigeons: int, holes: int) -> list[list[int]]:
+    # Variable p * holes + h + 1: pigeon p sits in hole h
+    clauses = [[p * holes + h + 1 for h in range(holes)] for p in range(pigeons)]
+    for h in range(holes):
+        for p, q in itertools.combinations(range(pigeons), 2):
+            clauses.append([-(p * holes + h + 1), -(q * holes + h + 1)])
+    return clauses
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_random_3sat_matches_brute_force(seed):
+    generator = random.Random(seed)
+    var_number = 10
+    clauses = [
+        [generator.choice([-1, 1]) * var for var in generator.sample(range(1, var_number + 1), 3)]
+        for _ in range(43)
+    ]
+    solver = make_solver(var_number, clauses)
+    is_sat = solver.solve()
+    assert is_sat == brute_force(var_number, clauses)
+    if is_sat:
+        assert is_satisfied(clauses, solver.model)
+
+
+def test_pigeonhole_is_unsatisfiable():
+    assert make_solver(20, pigeonhole(5, 4)).solve() is False
+    solver = make_solver(20, pigeonhole(4, 5))
+    assert solver.solve() is True
+    assert is_satisfied(pigeonhole(4, 5), solver.model)
+
+
+def test_empty_clause_is_unsatisfiable():
+    solver = CdclSolver(1)
+    assert solver.add_clause([]) is False
+    assert solver.solve() is False
+
+
+def test_clauses_added_between_solves():
+    # Excluding every model in turn enumerates the 2^3 assignments
+    solver = CdclSolver(3)
+    models = set()
+    while solver.solve():
+        model = tuple(solver.value(var) for var in range(1, 4))
+        models.add(model)
+        solver.add_clause([-var if value else var for var, value in zip(range(1, 4), model)])
+    assert len(models) == 8
+
+
+def test_conflict_and_time_limits():
+    clauses = pigeonhole(8, 7)
+    assert make_solver(56, clauses).solve(max_conflicts=10) is None
+    solver = make_solver(56, clauses)
+    assert solver.solve(max_seconds=0.0) is None
+    # The solver is back at level 0 and can go on
+    assert solver.solve(max_conflicts=10) is None
+
+
+@pytest.mark.parametrize('sense', ['<', '>', '='])
+@pytest.mark.parametrize('coefficients,rhs', [
+    ([1, 1, 1, 1, 1], 2), ([1, 1, 1, 1, 1, 1, 1, 1], 3), ([1, 1, 1], 1), ([2, 1, 1, 3], 3), ([1, -1, 1, -1], 0)
+])
+def test_sat_model_rows_match_brute_force(sense, coefficients, rhs):
+    # Every assignment allowed by the CNF of a row is one of the row
+    model = SatModel()
+    variables = [model.add_var() for _ in coefficients]
+    expr = mip.xsum(coefficient * var for coefficient, var in zip(coefficients, variables))
+    model.add_constr({'<': expr <= rhs, '>': expr >= rhs, '=': expr == rhs}[sense])
+    expected = set()
+    for values in itertools.product([0, 1], repeat=len(coefficients)):
+        total = sum(coefficient * value for coefficient, value in zip(coefficients, values))
+        if {'<': total <= rhs, '>': total >= rhs, '=': total == rhs}[sense]:
+            expected.add(values)
+    found = set()
+    while model.optimize() == mip.OptimizationStatus.OPTIMAL:
+        values = tuple(round(var.x) for var in variables)
+        assert values not in found
+        found.add(values)
+        model.add_constr(
+            mip.xsum(var for var, value in zip(variables, values) if value == 0)
+            - mip.xsum(var for var, value in zip(variables, values) if value == 1)
+            >= 1 - sum(values)
+        )
+    assert found == expected
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pytest
+
+from src.engines import DancingLinks
+from src.puzzles import Sudoku
+
+PUZZLES = sorted((Path(__file__).parents[1] / 'data' / 'sudoku').glob('*.json'))
+
+
+def make_links(rows: list[list[int]], column_number: int) -> DancingLinks:
+    links = DancingLinks(column_number)
+    for columns in rows:
+        links.add_row(columns)
+    return links
+
+
+def test_finds_every_exact_cover():
+    # Knuth's example has one cover, rows 0, 3 and 4
+    rows = [[2, 4, 5], [0, 3, 6], [1, 2, 5], [0, 3], [1, 6], [3, 4, 6]]
+    assert [sorted(cover) for cover in make_links(rows, 7).solutions()] == [[0, 3, 4]]
+    # Single columns and their pairs cover two columns in 2 ways
+    rows = [[0], [1], [0, 1]]
+    assert sorted(sorted(cover) for cover in make_links(rows, 2).solutions()) == [[0, 1], [2]]
+
+
+def test_links_are_restored_after_search():
+    rows = [[0, 1], [1, 2], [2], [0]]
+    links = make_links(rows, 3)
+    state = (links.left.copy(), links.right.copy(), links.up.copy(), links.down.copy(), links.size.copy())
+    assert len(list(links.solutions())) == 2
+    assert state == (links.left, links.right, links.up, links.down, links.size)
+
+
+def test_no_cover_of_an_empty_column():
+    assert list(make_links([[0], [0, 1]], 3).solutions()) == []
+
+
+def test_deep_search_does_not_recurse():
+    # 2000 columns covered one row at a time, one search level per column
+    links = make_links([[column] for column in range(2000)], 2000)
+    assert [sorted(cover) for cover in links.solutions()] == [list(range(2000))]
+
+
+@pytest.mark.parametrize('path', PUZZLES, ids=lambda path: path.stem)
+def test_dlx_matches_mip(path):
+    model = Sudoku(path, engine='dlx')
+    model.init_model()
+    model.solve()
+    mip_model = Sudoku(path)
+    mip_model.init_model()
+    mip_model.solve()
+    assert mip_model.check_unique()['status'] == 'unique'
+    assert model.get_solution() == mip_model.get_solution()
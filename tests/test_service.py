@@ -0,0 +1,76 @@
+import asyncio
+import json
+import time
+
+from pathlib import Path
+
+from src.runner.service import SolveService
+
+DATA = Path(__file__).parents[1] / 'data'
+
+
+async def post(socket_path: Path, puzzle: str, body: bytes, query: str = '', trailer: bytes = b'') -> tuple[int, dict]:
+    # trailer is sent after the body, the connection stays open
+    reader, writer = await asyncio.open_unix_connection(str(socket_path))
+    writer.write(
+        f'POST /solve/{puzzle}{query} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body + trailer
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_timed_out_solve_frees_its_worker(tmp_path):
+    # Galaxies puzzle_4 takes about 50s to build, far past its deadline. With
+    # one worker and no queue the next request only gets in once it is killed.
+    socket_path = tmp_path / 'service.sock'
+
+    async def run() -> None:
+        service = SolveService(workers=1, queue_size=0)
+        serving = asyncio.create_task(service.serve(unix_path=str(socket_path)))
+        try:
+            while not socket_path.exists():
+                await asyncio.sleep(0.1)
+            galaxies = (DATA / 'galaxies' / 'puzzle_4.json').read_bytes()
+            status, body = await post(socket_path, 'Galaxies', galaxies, '?timeout=1')
+            assert status == 504 and body['status'] == 'timeout'
+            # 503 while the worker is killed and replaced, as a client would
+            # retry after Retry-After
+            start_time = time.perf_counter()
+            status = 503
+            while status == 503 and time.perf_counter() - start_time < 10:
+                status, body = await post(socket_path, 'Sudoku', (DATA / 'sudoku' / 'puzzle_1.json').read_bytes())
+                await asyncio.sleep(0.2)
+            assert status == 200 and body['status'] == 'solved'
+            assert service.counts['recycled'] == 1
+        finally:
+            serving.cancel()
+            await asyncio.gather(serving, return_exceptions=True)
+        return None
+
+    asyncio.run(run())
+
+
+def test_bytes_after_the_body_do_not_cancel_the_solve(tmp_path):
+    # A pipelined request or a body longer than Content-Length, the client
+    # is still there and gets its response
+    socket_path = tmp_path / 'service.sock'
+
+    async def run() -> None:
+        service = SolveService(workers=1, queue_size=0)
+        serving = asyncio.create_task(service.serve(unix_path=str(socket_path)))
+        try:
+            while not socket_path.exists():
+                await asyncio.sleep(0.1)
+            sudoku = (DATA / 'sudoku' / 'puzzle_1.json').read_bytes()
+            status, body = await post(socket_path, 'Sudoku', sudoku, trailer=b'GET /stats HTTP/1.1\r\n\r\n')
+            assert status == 200 and body['status'] == 'solved'
+            assert service.counts['cancelled'] == 0
+        finally:
+            serving.cancel()
+            await asyncio.gather(serving, return_exceptions=True)
+        return None
+
+    asyncio.run(run())
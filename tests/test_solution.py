@@ -0,0 +1,63 @@
+import json
+
+from pathlib import Path
+
+import pytest
+
+from src.puzzles import Binox, Slitherlink
+from src.utils import Solution
+
+DATA = Path(__file__).parents[1] / 'data'
+
+
+def make_solutions() -> list[Solution]:
+    return [
+        Solution('Sudoku', (2, 3), [1, 2, 3, 4, 5, 6]),
+        Solution('Binox', (2, 2), [0, 1, 1, 0], symbols=('O', 'X')),
+        Solution('HauntedMirrorMaze', (1, 3), [0, Solution.EMPTY, 2], symbols=('V', 'G', 'Z')),
+        Solution('Slitherlink', (1, 1), edges=[((0, 1), (0, 0)), ((0, 0), (1, 0)), ((1, 0), (1, 1)), ((0, 1), (1, 1))])
+    ]
+
+
+@pytest.mark.parametrize('solution', make_solutions(), ids=lambda solution: solution.puzzle)
+def test_round_trips(solution):
+    assert Solution.from_dict(json.loads(json.dumps(solution.to_dict()))) == solution
+    assert Solution.from_bytes(solution.to_bytes()) == solution
+
+
+def test_edges_and_cells():
+    solution = make_solutions()[3]
+    assert solution.has_edge((0, 1), (0, 0)) and solution.has_edge((0, 0), (0, 1))
+    assert not solution.has_edge((0, 0), (1, 1))
+    assert solution.get_rows() == [[Solution.EMPTY]]
+    maze = make_solutions()[2]
+    assert [maze.get_symbol((0, col)) for col in range(3)] == ['V', None, 'Z']
+    assert make_solutions()[0].get_symbol((1, 0)) == '4'
+
+
+def test_equality():
+    solution = make_solutions()[1]
+    assert solution == Solution('Binox', (2, 2), [0, 1, 1, 0], symbols=('O', 'X'))
+    assert solution != Solution('Binox', (2, 2), [1, 0, 0, 1], symbols=('O', 'X'))
+    assert solution != Solution('Troix', (2, 2), [0, 1, 1, 0], symbols=('O', 'X'))
+    assert solution != solution.to_dict()
+
+
+def test_invalid_data():
+    with pytest.raises(ValueError):
+        Solution('Sudoku', (2, 2), [1, 2, 3])
+    data = make_solutions()[3].to_bytes()
+    with pytest.raises(ValueError):
+        Solution.from_bytes(data[:-2])
+
+
+@pytest.mark.parametrize('puzzle,path', [
+    (Binox, DATA / 'binox' / 'puzzle_1.json'), (Slitherlink, DATA / 'slitherlink' / 'puzzle_1.json')
+], ids=lambda value: getattr(value, '__name__', None) or value.stem)
+def test_solved_board_round_trips(puzzle, path):
+    model = puzzle(path)
+    model.init_model()
+    model.solve()
+    solution = model.get_solution()
+    assert Solution.from_bytes(solution.to_bytes()) == solution
+    assert Solution.from_dict(solution.to_dict()) == solution
@@ -0,0 +1,55 @@
+import os
+
+from src.utils import SolutionCache
+
+
+def put_entries(cache: SolutionCache, number: int) -> list[str]:
+    keys = [SolutionCache.make_key('Sudoku', {'index': index}) for index in range(number)]
+    for index, key in enumerate(keys):
+        cache.put(key, {'x_vars': [[index] * 10]})
+        # Distinct and ordered access times, whatever the file system clock
+        os.utime(cache.get_entry_path(key), ns=(index * 10 ** 9, index * 10 ** 9))
+    return keys
+
+
+def test_get_returns_put_solution(tmp_path):
+    cache = SolutionCache(tmp_path)
+    key = SolutionCache.make_key('Binox', {'shape': [2, 2]})
+    assert cache.get(key) is None
+    cache.put(key, {'x_vars': [[1, 0], [0, 1]]})
+    assert cache.get(key) == {'x_vars': [[1, 0], [0, 1]]}
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_index_counts_entries_without_scanning(tmp_path):
+    cache = SolutionCache(tmp_path)
+    keys = put_entries(cache, 5)
+    size = sum(cache.get_entry_path(key).stat().st_size for key in keys)
+    assert cache.read_index() == {'size': size, 'entries': 5}
+    # Replacing an entry changes its size, not the number of entries
+    cache.put(keys[0], {'x_vars': []})
+    size = sum(cache.get_entry_path(key).stat().st_size for key in keys)
+    assert cache.read_index() == {'size': size, 'entries': 5}
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = SolutionCache(tmp_path, max_size=10 ** 6)
+    keys = put_entries(cache, 6)
+    entry_size = cache.get_entry_path(keys[0]).stat().st_size
+    # Entry 0 is read last, entries 1 to 4 are then the oldest
+    cache.get(keys[0])
+    cache.max_size = 4 * entry_size
+    # 7 entries over a bound of 4, down to 3 (low watermark of 3.6)
+    cache.put(SolutionCache.make_key('Sudoku', {'index': 6}), {'x_vars': [[6] * 10]})
+    kept = [key for key in keys if cache.get_entry_path(key).exists()]
+    assert kept == [keys[0], keys[5]]
+    assert cache.read_index() == {'size': 3 * entry_size, 'entries': 3}
+
+
+def test_scans_folder_without_index(tmp_path):
+    keys = put_entries(SolutionCache(tmp_path), 3)
+    os.remove(tmp_path / '.index')
+    cache = SolutionCache(tmp_path)
+    put_entries(cache, 1)
+    size = sum(cache.get_entry_path(key).stat().st_size for key in keys)
+    assert cache.read_index() == {'size': size, 'entries': 3}
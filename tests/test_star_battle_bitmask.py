@@ -0,0 +1,55 @@
+import sys
+
+from pathlib import Path
+
+import pytest
+
+from src.engines import StarBattleBitmask
+from src.puzzles import StarBattle
+
+PUZZLES = sorted((Path(__file__).parents[1] / 'data' / 'star_battle').glob('*.json'))
+
+
+def get_stack_depth() -> int:
+    frame, depth = sys._getframe(), 0
+    while frame is not None:
+        frame, depth = frame.f_back, depth + 1
+    return depth
+
+
+@pytest.mark.parametrize('path', PUZZLES, ids=lambda path: path.stem)
+def test_bitmask_matches_mip(path):
+    model = StarBattle(path, engine='bitmask')
+    model.init_model()
+    model.solve()
+    mip_model = StarBattle(path)
+    mip_model.init_model()
+    mip_model.solve()
+    assert mip_model.check_unique()['status'] == 'unique'
+    assert model.get_solution() == mip_model.get_solution()
+
+
+def test_bitmask_search_does_not_recurse():
+    # Rows as cages: a 40x40 board takes about 50 decisions, the recursive
+    # search needed as many frames
+    size = 40
+    cages = [[{'row': row, 'col': col} for col in range(size)] for row in range(size)]
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(get_stack_depth() + 30)
+    try:
+        board = StarBattleBitmask([size, size], 1, cages).solve()
+    finally:
+        sys.setrecursionlimit(limit)
+    assert [sum(row) for row in board] == [1] * size
+    assert [sum(col) for col in zip(*board)] == [1] * size
+    stars = [(row, col) for row in range(size) for col in range(size) if board[row][col]]
+    # One star per row, so only stars of consecutive rows can touch
+    assert all(
+        abs(col - other_col) > 1 for (_, col), (_, other_col) in zip(stars, stars[1:])
+    )
+
+
+def test_bitmask_finds_no_board_for_contradiction():
+    # Two stars in a 2x2 board always touch
+    cages = [[{'row': 0, 'col': 0}, {'row': 0, 'col': 1}], [{'row': 1, 'col': 0}, {'row': 1, 'col': 1}]]
+    assert StarBattleBitmask([2, 2], 1, cages).solve() is None
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import pytest
+
+from src.engines import TroixSearch
+from src.puzzles import Troix
+
+PUZZLES = sorted((Path(__file__).parents[1] / 'data' / 'troix').glob('*.json'))
+
+
+def check_board(board: list[list[str]], symbol_number: int, fixed_cells: dict) -> None:
+    lines = board + [list(column) for column in zip(*board)]
+    for line in lines:
+        for symbol in TroixSearch.SYMBOLS:
+            assert line.count(symbol) == len(line) // 3
+        for start in range(len(line) - symbol_number):
+            assert len(set(line[start: start + symbol_number + 1])) > 1
+    for (row, col), val in fixed_cells.items():
+        assert board[row][col] == val
+    return None
+
+
+@pytest.mark.parametrize('path', PUZZLES, ids=lambda path: path.stem)
+def test_search_matches_mip(path):
+    model = Troix(path, engine='search')
+    model.init_model()
+    model.solve()
+    mip_model = Troix(path)
+    mip_model.init_model()
+    mip_model.solve()
+    solution = model.get_solution()
+    fixed_cells = {(cell['row'], cell['col']): cell['val'] for cell in model.data.fixed}
+    check_board(
+        [[solution.symbols[value] for value in row] for row in solution.get_rows()],
+        model.data.symbol_number, fixed_cells
+    )
+    if mip_model.check_unique()['status'] == 'unique':
+        assert solution == mip_model.get_solution()
+
+
+@pytest.mark.parametrize('size', [36, 45])
+def test_search_solves_large_empty_grid(size):
+    # One search frame per decision, deeper than the recursion limit
+    board = TroixSearch([size, size], 2, {}).solve()
+    check_board(board, 2, {})
+
+
+def test_search_finds_no_board_for_contradiction():
+    assert TroixSearch([3, 3], 2, {(0, 0): 'X', (0, 1): 'X', (0, 2): 'X'}).solve() is None